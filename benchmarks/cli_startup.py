@@ -0,0 +1,97 @@
+"""
+命令行启动耗时检查
+
+用 python -X importtime 运行 zbot.services.main 的若干命令，统计导入耗时和总耗时，
+并检查不需要的重量级依赖(Web UI、回测框架、交易所SDK等)是否被提前导入。
+超出耗时预算或导入了禁止的模块时以非0状态退出，可作为回归检查。
+
+使用方法(在项目根目录执行):
+    python benchmarks/cli_startup.py
+    python benchmarks/cli_startup.py --budget-ms 200 --repeat 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 需要检查的命令，这些命令在执行前都不应加载重量级依赖
+COMMANDS = [
+    ['--help'],
+    ['download-data', '--help'],
+    ['config', '--help'],
+]
+# 启动阶段禁止导入的顶层模块
+FORBIDDEN_MODULES = [
+    'dash', 'feffery_antd_components', 'backtesting', 'ccxt', 'binance_sdk_spot',
+    'binance_sdk_derivatives_trading_usds_futures', 'pandas', 'pyarrow', 'aiohttp', 'peewee',
+]
+# 默认的导入耗时预算(毫秒)
+DEFAULT_BUDGET_MS = 150
+
+
+def parse_importtime(stderr: str):
+    """
+    解析 -X importtime 的输出
+
+    :return: (顶层模块累计导入耗时(微秒)字典, 全部已导入模块名集合)
+    """
+    top_level = {}
+    modules = set()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.add(name.strip().split('.')[0])
+        # 缩进表示被其他模块导入，只累加最外层的模块
+        if not name[1:].startswith(' '):
+            top_level[name.strip()] = int(cumulative)
+    return top_level, modules
+
+
+def run_command(args):
+    """以 -X importtime 运行一次命令，返回 (总耗时秒数, 顶层模块耗时, 导入的模块)"""
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-m', 'zbot.services.main', *args],
+        cwd=ROOT, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"命令执行失败 {args}: {proc.stderr[-2000:]}")
+    top_level, modules = parse_importtime(proc.stderr)
+    return elapsed, top_level, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description='zbot命令行启动耗时检查')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS, help='导入耗时预算(毫秒)')
+    parser.add_argument('--repeat', type=int, default=3, help='每个命令运行次数，取中位数')
+    parser.add_argument('--top', type=int, default=10, help='显示耗时最多的顶层模块数量')
+    args = parser.parse_args()
+
+    failed = False
+    for command in COMMANDS:
+        runs = [run_command(command) for _ in range(args.repeat)]
+        wall_ms = statistics.median(run[0] for run in runs) * 1000
+        import_ms = statistics.median(sum(run[1].values()) for run in runs) / 1000
+        top_level, modules = runs[-1][1], runs[-1][2]
+        forbidden = sorted(m for m in FORBIDDEN_MODULES if m in modules)
+
+        print(f"zbot {' '.join(command)}")
+        print(f"  总耗时: {wall_ms:.1f}ms  导入耗时: {import_ms:.1f}ms  (预算 {args.budget_ms:.0f}ms)")
+        for name, cumulative in sorted(top_level.items(), key=lambda x: -x[1])[:args.top]:
+            print(f"    {cumulative / 1000:8.1f}ms  {name}")
+        if forbidden:
+            print(f"  错误: 启动时导入了 {', '.join(forbidden)}")
+            failed = True
+        if import_ms > args.budget_ms:
+            print(f"  错误: 导入耗时超出预算")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
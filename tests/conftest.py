@@ -0,0 +1,10 @@
+"""
+测试公共配置
+
+数据库和列式存储写入临时目录，测试不会读写项目 data 目录下的数据
+"""
+import tempfile
+
+import zbot.services.db
+
+zbot.services.db.base_path = tempfile.mkdtemp(prefix='zbot-test-')
@@ -0,0 +1,132 @@
+"""
+归档下载管道测试
+
+本地aiohttp服务模拟 data.binance.vision，分别返回正常、缺失和损坏的zip文件，
+验证单个文件失败不会阻塞写入任务，下载管道能够正常结束
+"""
+import asyncio
+import hashlib
+import io
+import queue
+import tempfile
+import zipfile
+from types import SimpleNamespace
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from zbot.exchange.binance.archive_cache import ArchiveCache
+from zbot.exchange.binance.data import History
+
+CANDLE_NAMES = [
+    'open_time', 'open', 'high', 'low', 'close', 'volume', 'close_time', 'quote_volume',
+    'count', 'taker_buy_volume', 'taker_buy_quote_volume', 'ignore',
+]
+# 2025-01-01 00:00:00 UTC，毫秒
+DAY_START_MS = 1735689600000
+
+
+def make_zip(name, rows):
+    """生成与币安归档格式一致的zip文件内容"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zipf:
+        zipf.writestr(name.replace('.zip', '.csv'), ''.join(','.join(map(str, row)) + '\n' for row in rows))
+    return buffer.getvalue()
+
+
+def make_rows(count):
+    return [[DAY_START_MS + i * 60000, 1.0, 2.0, 0.5, 1.5, 10.0, DAY_START_MS + i * 60000 + 59999,
+             15.0, 3, 5.0, 7.5, 0] for i in range(count)]
+
+
+def make_app():
+    """good 日期返回正常文件，corrupt 日期返回无法解压的文件，其余日期返回404"""
+    files = {
+        'BTCUSDT-1m-2025-01-01.zip': make_zip('BTCUSDT-1m-2025-01-01.zip', make_rows(5)),
+        'BTCUSDT-1m-2025-01-03.zip': b'not a zip file',
+    }
+
+    async def handle(request):
+        name = request.match_info['name']
+        if name.endswith('.CHECKSUM'):
+            content = files.get(name[:-len('.CHECKSUM')])
+            if content is None:
+                raise web.HTTPNotFound()
+            return web.Response(text=f'{hashlib.sha256(content).hexdigest()}  {name[:-len(".CHECKSUM")]}\n')
+        if name not in files:
+            raise web.HTTPNotFound()
+        return web.Response(body=files[name])
+
+    app = web.Application()
+    app.router.add_get('/data/spot/daily/klines/BTCUSDT/1m/{name}', handle)
+    return app
+
+
+def make_history(base_url, cache):
+    exchange = SimpleNamespace(exchange=SimpleNamespace(), candle_names=CANDLE_NAMES)
+    history = History(exchange, archive_cache=cache)
+    history.archive_base_url = f'{base_url}/data'
+    history.saved = []
+    history.save_candles = lambda symbol, timeframe, columns: history.saved.append(columns)
+    return history
+
+
+def run_pipeline(cache):
+    progress = queue.Queue()
+    files = [('daily', '2025-01-01'), ('daily', '2025-01-02'), ('daily', '2025-01-03')]
+
+    async def main():
+        async with TestServer(make_app()) as server:
+            history = make_history(str(server.make_url('')).rstrip('/'), cache)
+            await asyncio.wait_for(
+                history.download_archives('BTCUSDT', '1m', 'spot', files, progress, concurrency=2), timeout=30)
+            return history
+
+    history = asyncio.run(main())
+    messages = []
+    while not progress.empty():
+        messages.append(progress.get())
+    return history, messages
+
+
+def check_result(history, messages):
+    # 只有正常文件入库，时间戳转为微秒
+    assert len(history.saved) == 1
+    assert list(history.saved[0]['open_time']) == [(DAY_START_MS + i * 60000) * 1000 for i in range(5)]
+    # 每个文件都有进度(按完成顺序)，最后是完成信号
+    assert sorted(message['date'] for message in messages[:-1]) == ['2025-01-01', '2025-01-02', '2025-01-03']
+    assert messages[-1] is None
+
+
+def test_download_archives_without_cache():
+    check_result(*run_pipeline(None))
+
+
+def test_download_archives_with_cache():
+    cache = ArchiveCache(tempfile.mkdtemp())
+    check_result(*run_pipeline(cache))
+    # 第二次运行直接使用缓存中的正常文件
+    check_result(*run_pipeline(cache))
+
+
+def test_archive_cache_without_checksum():
+    """没有官方校验值的文件可以使用，但不会作为已校验的缓存命中"""
+    cache = ArchiveCache(tempfile.mkdtemp())
+    url = 'https://data.binance.vision/data/spot/daily/klines/BTCUSDT/1m/BTCUSDT-1m-2025-01-01.zip'
+    content = make_zip('BTCUSDT-1m-2025-01-01.zip', make_rows(1))
+    digest = hashlib.sha256(content).hexdigest()
+
+    temp_path = cache.get_temp_path(url)
+    with open(temp_path, 'wb') as f:
+        f.write(content)
+    path = cache.commit(url, temp_path, digest)
+    with open(path, 'rb') as f:
+        assert f.read() == content
+    assert cache.get(url) is None
+
+    # 再次下载时获取到官方校验值，缓存转为已校验
+    temp_path = cache.get_temp_path(url)
+    with open(temp_path, 'wb') as f:
+        f.write(content)
+    cache.commit(url, temp_path, digest, f'{digest}  BTCUSDT-1m-2025-01-01.zip\n')
+    assert cache.get(url) == path
@@ -0,0 +1,69 @@
+"""
+批量下载测试
+
+验证交易对列表与通配符的解析，以及 BatchDownloader 汇总各任务的进度和失败状态
+"""
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from zbot.exchange.binance.batch import BatchDownloader, resolve_symbols
+from zbot.exchange.binance.data import History
+from tests.test_binance_archives import CANDLE_NAMES
+
+
+def write_cache(tmp_path, symbols):
+    path = tmp_path / 'exchange_cache_binance.json'
+    path.write_text(json.dumps({'exchange': 'binance', 'symbols': symbols}), encoding='utf-8')
+    return str(path)
+
+
+def test_resolve_symbols_list():
+    assert resolve_symbols(['BTC/USDT', 'ETHUSDT', 'BTCUSDT']) == ['BTCUSDT', 'ETHUSDT']
+    assert resolve_symbols(None, None) == []
+
+
+def test_resolve_symbols_pattern(tmp_path):
+    cache_file = write_cache(tmp_path, ['BTC/USDT', 'ETH/USDT', 'ETH/BTC', 'BNB/USDC'])
+    assert resolve_symbols(None, '*/USDT', cache_file=cache_file) == ['BTCUSDT', 'ETHUSDT']
+    # 不带斜杠的写法同样匹配，显式指定的交易对排在前面并去重
+    assert resolve_symbols(['ETHBTC', 'BTCUSDT'], 'BTC*', cache_file=cache_file) == ['ETHBTC', 'BTCUSDT']
+    assert resolve_symbols(None, 'XRP*', cache_file=cache_file) == []
+
+
+def test_resolve_symbols_missing_cache(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        resolve_symbols(None, '*/USDT', cache_file=str(tmp_path / 'missing.json'))
+    # 不使用通配符时不读取缓存
+    assert resolve_symbols(['BTC/USDT'], None, cache_file=str(tmp_path / 'missing.json')) == ['BTCUSDT']
+
+
+def test_batch_downloader_progress(monkeypatch):
+    async def sync_async(self, symbol, timeframe, candle_type, start_time, end_time, progress_queue=None,
+                         limit=500, session=None, semaphore=None):
+        if symbol == 'FAILUSDT':
+            raise RuntimeError('download failed')
+        progress_queue.put({'symbol': symbol, 'progress': 0.5})
+        progress_queue.put(None)
+        return [('rest', start_time, end_time)] * 2
+
+    monkeypatch.setattr(History, 'sync_async', sync_async)
+    exchange = SimpleNamespace(exchange=SimpleNamespace(), candle_names=CANDLE_NAMES, trading_mode='spot')
+    updates = []
+    downloader = BatchDownloader(exchange, workers=2, on_progress=lambda job, summary: updates.append(
+        (job.symbol, job.interval, job.status, job.progress, summary)))
+    jobs = downloader.run(['BTC/USDT', 'FAILUSDT'], ['1m', '1h'], '2025-01-01', '2025-01-02')
+
+    assert [(job.symbol, job.interval) for job in jobs] == [
+        ('BTCUSDT', '1m'), ('BTCUSDT', '1h'), ('FAILUSDT', '1m'), ('FAILUSDT', '1h')]
+    assert [job.status for job in jobs] == ['completed', 'completed', 'error', 'error']
+    assert [job.missing for job in jobs[:2]] == [2, 2]
+    assert jobs[2].error == 'download failed'
+    # 下载过程中上报任务自身的进度
+    assert ('BTCUSDT', '1m', 'running', 0.5) in [update[:4] for update in updates]
+    progress = [update[4]['progress'] for update in updates]
+    assert progress == sorted(progress)
+    assert updates[-1][4] == {
+        'total': 4, 'pending': 0, 'running': 0, 'completed': 2, 'error': 2, 'progress': 1.0}
+    assert downloader.progress()['progress'] == 1.0
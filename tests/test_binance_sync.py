@@ -0,0 +1,80 @@
+"""
+增量同步规划测试
+
+数据库中写入带缺口的K线，验证 plan_sync 只规划缺失区间、按REST窗口拆分归档与REST区间、
+不包含未收盘的K线，并按日线、月线的自然边界对齐
+"""
+from types import SimpleNamespace
+
+import numpy as np
+
+from zbot.exchange.binance.data import History
+from zbot.exchange.binance.models import Candle
+from tests.test_binance_archives import CANDLE_NAMES, DAY_START_MS
+
+MINUTE_MS = 60 * 1000
+DAY_MS = 24 * 60 * MINUTE_MS
+
+
+def us(ms):
+    return ms * 1000
+
+
+def make_history():
+    return History(SimpleNamespace(exchange=SimpleNamespace(), candle_names=CANDLE_NAMES), archive_cache=None)
+
+
+def insert_candles(symbol, timeframe, open_times_ms, step_ms):
+    open_time = np.asarray([us(t) for t in open_times_ms], dtype=np.int64)
+    ones = np.ones(len(open_time))
+    Candle.upsert_many(symbol, timeframe, {
+        'open_time': open_time, 'open': ones, 'high': ones, 'low': ones, 'close': ones, 'volume': ones,
+        'close_time': open_time + us(step_ms) - 1,
+    })
+
+
+def test_plan_gaps():
+    minutes = [DAY_START_MS + i * MINUTE_MS for i in [*range(0, 60), *range(120, 180)]]
+    insert_candles('GAPUSDT', '1m', minutes, MINUTE_MS)
+    plan = make_history().plan_sync('GAPUSDT', '1m', DAY_START_MS, DAY_START_MS + 239 * MINUTE_MS,
+                                    now=DAY_START_MS + 30 * DAY_MS)
+    assert plan == [
+        ('archive', us(DAY_START_MS + 60 * MINUTE_MS), us(DAY_START_MS + 119 * MINUTE_MS)),
+        ('archive', us(DAY_START_MS + 180 * MINUTE_MS), us(DAY_START_MS + 239 * MINUTE_MS)),
+    ]
+    # 已完整覆盖的范围无需下载
+    assert make_history().plan_sync('GAPUSDT', '1m', DAY_START_MS, DAY_START_MS + 59 * MINUTE_MS,
+                                    now=DAY_START_MS + 30 * DAY_MS) == []
+
+
+def test_plan_rest_window():
+    now = DAY_START_MS + 10 * DAY_MS + 12 * 60 * MINUTE_MS + 30 * 1000
+    plan = make_history().plan_sync('NEWUSDT', '1m', DAY_START_MS + 2 * DAY_MS, now, now=now)
+    # REST窗口从7天前的UTC日开始，最后一根K线为上一分钟，当前分钟尚未收盘
+    rest_start = us(DAY_START_MS + 3 * DAY_MS)
+    assert plan == [
+        ('archive', us(DAY_START_MS + 2 * DAY_MS), rest_start - 1),
+        ('rest', rest_start, us(DAY_START_MS + 10 * DAY_MS + 719 * MINUTE_MS)),
+    ]
+    # 范围内没有已收盘的K线
+    assert make_history().plan_sync('NEWUSDT', '1m', now, now, now=now) == []
+
+
+def test_plan_daily_alignment():
+    insert_candles('DAYUSDT', '1d', [DAY_START_MS + 2 * DAY_MS, DAY_START_MS + 3 * DAY_MS], DAY_MS)
+    # 开始时间在日中时从下一天开始
+    plan = make_history().plan_sync('DAYUSDT', '1d', DAY_START_MS + DAY_MS // 2, DAY_START_MS + 5 * DAY_MS,
+                                    now=DAY_START_MS + 60 * DAY_MS)
+    assert plan == [
+        ('archive', us(DAY_START_MS + DAY_MS), us(DAY_START_MS + DAY_MS)),
+        ('archive', us(DAY_START_MS + 4 * DAY_MS), us(DAY_START_MS + 5 * DAY_MS)),
+    ]
+
+
+def test_plan_monthly_alignment():
+    def month(day):
+        return int(np.datetime64(day, 'ms').astype(np.int64))
+
+    plan = make_history().plan_sync('MONUSDT', '1M', month('2025-01-15'), month('2025-04-10'),
+                                    now=month('2025-06-01'))
+    assert plan == [('archive', us(month('2025-02-01')), us(month('2025-04-01')))]
@@ -0,0 +1,115 @@
+"""
+列式K线存储测试
+
+验证追加分片、乱序数据合并、按时间范围读取，
+以及连续写入数据库的K线批次只以追加分片写入列式存储
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from zbot.exchange.binance.models import Candle
+from zbot.services.candle_store import CandleStore, candle_store
+from zbot.services.model import save_candles_to_store
+
+# 2025-01-01 00:00:00 UTC，微秒
+DAY_START_US = 1735689600000000
+MINUTE_US = 60_000_000
+
+
+def make_candles(start, stop, close=1.0):
+    """生成第start到第stop-1分钟的1m K线"""
+    open_time = DAY_START_US + np.arange(start, stop, dtype=np.int64) * MINUTE_US
+    ones = np.ones(len(open_time))
+    return pd.DataFrame({
+        'open_time': open_time, 'open': ones, 'high': ones, 'low': ones,
+        'close': np.full(len(open_time), close), 'volume': ones, 'close_time': open_time + MINUTE_US - 1,
+    })
+
+
+def test_append_creates_parts(tmp_path):
+    store = CandleStore(str(tmp_path))
+    store.write('binance', 'BTC/USDT', '1m', make_candles(0, 100))
+    store.write('binance', 'BTC/USDT', '1m', make_candles(100, 120))
+    store.write('binance', 'BTC/USDT', '1m', make_candles(120, 130))
+    files = sorted(os.listdir(store.series_dir('binance', 'BTC/USDT', '1m')))
+    assert files == ['2025-01.1.parquet', '2025-01.2.parquet', '2025-01.parquet']
+    df = store.read('binance', 'BTC/USDT', '1m')
+    assert df['open_time'].tolist() == make_candles(0, 130)['open_time'].tolist()
+
+
+def test_merge_out_of_order(tmp_path):
+    store = CandleStore(str(tmp_path))
+    store.write('binance', 'BTC/USDT', '1m', make_candles(0, 100))
+    store.write('binance', 'BTC/USDT', '1m', make_candles(100, 120))
+    # 早于已有数据的K线合并为一个月份分区，重复的 open_time 保留新数据
+    store.write('binance', 'BTC/USDT', '1m', make_candles(50, 60, close=2.0))
+    files = os.listdir(store.series_dir('binance', 'BTC/USDT', '1m'))
+    assert files == ['2025-01.parquet']
+    df = store.read('binance', 'BTC/USDT', '1m')
+    assert len(df) == 120
+    assert df['open_time'].is_monotonic_increasing
+    assert df['close'].sum() == 130.0
+
+
+def test_merge_after_max_parts(tmp_path):
+    store = CandleStore(str(tmp_path), max_parts=4)
+    for i in range(6):
+        store.write('binance', 'BTC/USDT', '1m', make_candles(i * 10, i * 10 + 10))
+    files = os.listdir(store.series_dir('binance', 'BTC/USDT', '1m'))
+    assert len(files) <= 4
+    assert len(store.read('binance', 'BTC/USDT', '1m')) == 60
+
+
+def test_read_filters(tmp_path):
+    store = CandleStore(str(tmp_path))
+    # 跨越月份，读取时按月份裁剪分区并按时间过滤
+    store.write('binance', 'BTC/USDT', '1m', make_candles(0, 100))
+    store.write('binance', 'BTC/USDT', '1m', make_candles(31 * 1440 - 50, 31 * 1440 + 50))
+    start = DAY_START_US + 10 * MINUTE_US
+    end = DAY_START_US + 19 * MINUTE_US
+    df = store.read('binance', 'BTC/USDT', '1m', start, end, columns=['open_time', 'close'])
+    assert list(df.columns) == ['open_time', 'close']
+    assert df['open_time'].tolist() == make_candles(10, 20)['open_time'].tolist()
+    february = DAY_START_US + 31 * 1440 * MINUTE_US
+    df = store.read('binance', 'BTC/USDT', '1m', start=february)
+    assert len(df) == 50
+    assert df['open_time'].iloc[0] == february
+    assert store.read('binance', 'ETH/USDT', '1m').empty
+
+
+def test_save_consecutive_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(candle_store, '_root', str(tmp_path))
+    series_dir = candle_store.series_dir('binance', 'SAVEUSDT', '1m')
+    parts = []
+    for i in range(4):
+        df = make_candles(i * 500, i * 500 + 500)
+        Candle.upsert_many('SAVEUSDT', '1m', df.to_dict('list'))
+        assert save_candles_to_store('binance', 'SAVEUSDT', '1m', df) == 500
+        parts.append(sorted(f for f in os.listdir(series_dir) if f.endswith('.parquet')))
+    # 每个批次只新增一个追加分片，已有文件不被重写
+    assert parts == [
+        ['2025-01.parquet'],
+        ['2025-01.1.parquet', '2025-01.parquet'],
+        ['2025-01.1.parquet', '2025-01.2.parquet', '2025-01.parquet'],
+        ['2025-01.1.parquet', '2025-01.2.parquet', '2025-01.3.parquet', '2025-01.parquet'],
+    ]
+    assert len(pd.read_parquet(os.path.join(series_dir, '2025-01.parquet'))) == 500
+    assert candle_store.synced_until('binance', 'SAVEUSDT', '1m') == DAY_START_US + 1999 * MINUTE_US
+    assert len(candle_store.read('binance', 'SAVEUSDT', '1m')) == 2000
+
+
+def test_save_backfill_merges(tmp_path, monkeypatch):
+    monkeypatch.setattr(candle_store, '_root', str(tmp_path))
+    df = make_candles(100, 200)
+    Candle.upsert_many('FILLUSDT', '1m', df.to_dict('list'))
+    save_candles_to_store('binance', 'FILLUSDT', '1m', df)
+    # 早于水位线补写的K线合并到已有分区
+    df = make_candles(0, 100)
+    Candle.upsert_many('FILLUSDT', '1m', df.to_dict('list'))
+    save_candles_to_store('binance', 'FILLUSDT', '1m', df)
+    series_dir = candle_store.series_dir('binance', 'FILLUSDT', '1m')
+    assert sorted(f for f in os.listdir(series_dir) if f.endswith('.parquet')) == ['2025-01.parquet']
+    result = candle_store.read('binance', 'FILLUSDT', '1m')
+    assert result['open_time'].tolist() == make_candles(0, 200)['open_time'].tolist()
@@ -0,0 +1,228 @@
+"""
+事件总线测试
+
+验证有界队列的溢出策略、发布统计中的投递和丢弃计数，
+分层主题的前缀和通配符匹配，以及处理函数订阅和一次性处理函数
+"""
+import asyncio
+
+import pytest
+
+from zbot.services.events import BoundedQueue, OverflowPolicy, PubSub, make_topic, topic_matches
+
+
+def drain(queue):
+    return [queue.get_nowait() for _ in range(queue.qsize())]
+
+
+def test_drop_oldest():
+    queue = BoundedQueue(3, OverflowPolicy.DROP_OLDEST)
+    assert [queue.put_nowait(i) for i in range(5)] == [True, True, True, False, False]
+    assert drain(queue) == [2, 3, 4]
+    assert queue.dropped == 2
+
+
+def test_drop_newest():
+    queue = BoundedQueue(3, OverflowPolicy.DROP_NEWEST)
+    for i in range(5):
+        queue.put_nowait(i)
+    assert drain(queue) == [0, 1, 2]
+    assert queue.dropped == 2
+
+
+def test_coalesce_latest():
+    queue = BoundedQueue(2, OverflowPolicy.COALESCE_LATEST)
+    queue.put_nowait({'symbol': 'BTCUSDT', 'interval': '1m', 'close': 1})
+    queue.put_nowait({'symbol': 'ETHUSDT', 'interval': '1m', 'close': 2})
+    # 同一交易对和周期只保留最新一条，位置不变
+    queue.put_nowait({'symbol': 'BTCUSDT', 'interval': '1m', 'close': 3})
+    assert [m['close'] for m in drain(queue)] == [3, 2]
+    # 队列满时丢弃最早的键
+    for i, symbol in enumerate(['A', 'B', 'C']):
+        queue.put_nowait({'symbol': symbol, 'interval': '1m', 'close': i})
+    assert [m['symbol'] for m in drain(queue)] == ['B', 'C']
+    assert queue.dropped == 2
+
+
+def test_invalid_queue():
+    with pytest.raises(ValueError):
+        BoundedQueue(3, 'block')
+    with pytest.raises(ValueError):
+        BoundedQueue(0)
+
+
+def test_publish_stats():
+    async def main():
+        bus = PubSub(maxsize=2, policy=OverflowPolicy.DROP_NEWEST)
+        queue = await bus.subscribe('market_data')
+        for i in range(3):
+            await bus.publish('market_data.binance.BTCUSDT.1m', i)
+        assert drain(queue) == [0, 1]
+        stats = bus.stats()['market_data.binance.BTCUSDT.1m']
+        assert (stats['published'], stats['delivered'], stats['dropped']) == (3, 2, 1)
+        # 等待中的消费者在发布时被唤醒
+        getter = asyncio.create_task(queue.get())
+        await asyncio.sleep(0)
+        bus.publish_nowait('market_data.binance.BTCUSDT.1m', 'next')
+        assert await asyncio.wait_for(getter, 1) == 'next'
+        await bus.close()
+
+    asyncio.run(main())
+
+
+def test_make_topic():
+    assert make_topic('market_data', 'binance', 'BTC/USDT', '1m') == 'market_data.binance.BTCUSDT.1m'
+    # 末尾的空值被忽略，中间的空值视为通配符
+    assert make_topic('market_data', 'binance', 'BTC/USDT', None) == 'market_data.binance.BTCUSDT'
+    assert make_topic('market_data', None, None, '1m') == 'market_data.*.*.1m'
+
+
+def test_topic_matches():
+    topic = 'market_data.binance.BTCUSDT.1m'
+    assert topic_matches('market_data', topic)
+    assert topic_matches('market_data.binance.BTCUSDT', topic)
+    assert topic_matches('market_data.*.*.1m', topic)
+    assert not topic_matches('market_data.binance.ETHUSDT', topic)
+    assert not topic_matches('market_data.*.*.5m', topic)
+    assert not topic_matches('market_data.binance.BTCUSDT.1m.extra', topic)
+    assert not topic_matches('market', topic)
+
+
+def test_topic_routing():
+    async def main():
+        bus = PubSub()
+        everything = await bus.subscribe('market_data')
+        btc = await bus.subscribe('market_data.binance.BTCUSDT')
+        minute = await bus.subscribe('market_data.*.*.1m')
+        for topic in ('market_data.binance.BTCUSDT.1m', 'market_data.binance.BTCUSDT.5m',
+                      'market_data.binance.ETHUSDT.1m', 'order_filled.binance.BTCUSDT'):
+            bus.publish_nowait(topic, topic)
+        assert len(drain(everything)) == 3
+        assert drain(btc) == ['market_data.binance.BTCUSDT.1m', 'market_data.binance.BTCUSDT.5m']
+        assert drain(minute) == ['market_data.binance.BTCUSDT.1m', 'market_data.binance.ETHUSDT.1m']
+
+        # 订阅变化后已缓存的分发索引失效
+        await bus.unsubscribe('market_data.binance.BTCUSDT', btc)
+        eth = await bus.subscribe('market_data.binance.ETHUSDT.1m')
+        bus.publish_nowait('market_data.binance.BTCUSDT.1m', 'btc')
+        bus.publish_nowait('market_data.binance.ETHUSDT.1m', 'eth')
+        assert drain(btc) == []
+        assert drain(eth) == ['eth']
+        await bus.close()
+
+    asyncio.run(main())
+
+
+def test_handler_routing():
+    async def main():
+        bus = PubSub()
+        received = []
+        # 同一处理函数匹配多个订阅主题时只调用一次
+        await bus.subscribe_handler('market_data.binance', received.append, direct=True)
+        await bus.subscribe_handler('market_data.*.BTCUSDT', received.append, direct=True)
+        bus.publish_nowait('market_data.binance.BTCUSDT.1m', 1)
+        bus.publish_nowait('market_data.okx.BTCUSDT.1m', 2)
+        bus.publish_nowait('market_data.okx.ETHUSDT.1m', 3)
+        assert received == [1, 2]
+        await bus.unsubscribe_handler('market_data.binance', received.append)
+        bus.publish_nowait('market_data.binance.ETHUSDT.1m', 4)
+        bus.publish_nowait('market_data.binance.BTCUSDT.1m', 5)
+        assert received == [1, 2, 5]
+        await bus.close()
+
+    asyncio.run(main())
+
+
+def test_subscription_handler():
+    async def main():
+        bus = PubSub()
+        received, batches = [], []
+
+        async def handle(event):
+            if event == 'bad':
+                raise ValueError(event)
+            received.append(event)
+
+        subscription = await bus.subscribe_handler('market_data', handle)
+        await bus.subscribe_handler('market_data', batches.append, batch_size=10, batch=True)
+        for event in (1, 'bad', 2, 3):
+            bus.publish_nowait('market_data.binance.BTCUSDT.1m', event)
+        await asyncio.sleep(0.01)
+        # 同一订阅内按发布顺序处理，处理函数出错不影响后续事件
+        assert received == [1, 2, 3]
+        assert batches == [[1, 'bad', 2, 3]]
+        assert subscription.stats.errors == 1
+        assert subscription.stats.events == 4
+
+        await bus.unsubscribe_handler('market_data', handle)
+        assert subscription._task.done()
+        bus.publish_nowait('market_data.binance.BTCUSDT.1m', 4)
+        await asyncio.sleep(0.01)
+        assert received == [1, 2, 3]
+        assert batches == [[1, 'bad', 2, 3], [4]]
+        await bus.close()
+
+    asyncio.run(main())
+
+
+def test_subscribe_once():
+    async def main():
+        bus = PubSub()
+        received, async_received = [], []
+
+        async def handle_async(event):
+            async_received.append(event)
+
+        await bus.subscribe_once('order_filled', received.append)
+        await bus.subscribe_once('order_filled', handle_async)
+        bus.publish_nowait('order_filled.binance.BTCUSDT', 1)
+        bus.publish_nowait('order_filled.binance.BTCUSDT', 2)
+        await asyncio.sleep(0)
+        assert received == [1]
+        assert async_received == [1]
+        assert not bus.event_handlers
+
+        # 同一处理函数在多个主题上的一次性登记合并为一次调用并一起移除
+        await bus.subscribe_once('order_filled', received.append)
+        await bus.subscribe_once('order_filled.binance', received.append)
+        bus.publish_nowait('order_filled.binance.BTCUSDT', 3)
+        bus.publish_nowait('order_filled.binance.BTCUSDT', 4)
+        assert received == [1, 3]
+        assert not bus.event_handlers
+        await bus.close()
+
+    asyncio.run(main())
+
+
+def test_subscribe_once_with_persistent():
+    async def main():
+        bus = PubSub()
+        received = []
+        await bus.subscribe_handler('order_filled', received.append, direct=True)
+        await bus.subscribe_once('order_filled', received.append)
+        # 常驻登记与一次性登记的同一处理函数每个事件只调用一次，一次性登记触发后常驻登记保留
+        bus.publish_nowait('order_filled.binance.BTCUSDT', 1)
+        bus.publish_nowait('order_filled.binance.BTCUSDT', 2)
+        assert received == [1, 2]
+        assert len(bus.event_handlers['order_filled']) == 1
+        await bus.close()
+
+    asyncio.run(main())
+
+
+def test_subscribe_once_nested_publish():
+    async def main():
+        bus = PubSub()
+        received = []
+
+        def handle(event):
+            received.append(event)
+            # 处理函数中再次发布时，已触发的一次性登记不会再被调用
+            bus.publish_nowait('order_filled.binance.BTCUSDT', event + 1)
+
+        await bus.subscribe_once('order_filled', handle)
+        bus.publish_nowait('order_filled.binance.BTCUSDT', 1)
+        assert received == [1]
+        await bus.close()
+
+    asyncio.run(main())
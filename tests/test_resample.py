@@ -0,0 +1,53 @@
+"""
+K线重采样测试
+
+验证由1m K线合成更大周期时各列的聚合方式，以及 drop_partial 丢弃不完整的K线
+"""
+import numpy as np
+import pandas as pd
+
+from zbot.services.resample import get_bucket_bounds, resample_candles
+
+# 2025-01-01 00:00:00 UTC(周三)，微秒
+DAY_START_US = 1735689600000000
+MINUTE_US = 60_000_000
+
+
+def make_candles(minutes):
+    open_time = DAY_START_US + np.asarray(minutes, dtype=np.int64) * MINUTE_US
+    values = np.arange(len(open_time), dtype=np.float64)
+    return pd.DataFrame({
+        'open_time': open_time, 'open': values, 'high': values + 10, 'low': values - 10, 'close': values + 0.5,
+        'volume': np.ones(len(open_time)), 'close_time': open_time + MINUTE_US - 1,
+    })
+
+
+def test_aggregations():
+    df = resample_candles(make_candles(range(10)), '5m')
+    assert df['open_time'].tolist() == [DAY_START_US, DAY_START_US + 5 * MINUTE_US]
+    assert df['open'].tolist() == [0.0, 5.0]
+    assert df['high'].tolist() == [14.0, 19.0]
+    assert df['low'].tolist() == [-10.0, -5.0]
+    assert df['close'].tolist() == [4.5, 9.5]
+    assert df['volume'].tolist() == [5.0, 5.0]
+    assert df['close_time'].tolist() == [DAY_START_US + 5 * MINUTE_US - 1, DAY_START_US + 10 * MINUTE_US - 1]
+
+
+def test_drop_partial():
+    # 00:00-00:04 完整；00:05 桶缺少 00:07；00:10 桶从中间开始；00:15 桶只有前两根
+    candles = make_candles([0, 1, 2, 3, 4, 5, 6, 8, 9, 12, 13, 14, 15, 16])
+    df = resample_candles(candles, '5m')
+    assert df['open_time'].tolist() == [DAY_START_US]
+    df = resample_candles(candles, '5m', drop_partial=False)
+    assert (df['open_time'] - DAY_START_US).tolist() == [0, 5 * MINUTE_US, 10 * MINUTE_US, 15 * MINUTE_US]
+    assert df['volume'].tolist() == [5.0, 4.0, 3.0, 2.0]
+
+
+def test_calendar_buckets():
+    # 周线从周一开始，月线按自然月
+    start, end = get_bucket_bounds([DAY_START_US], '1w')
+    assert start[0] == DAY_START_US - 2 * 1440 * MINUTE_US
+    assert end[0] - start[0] == 7 * 1440 * MINUTE_US
+    df = resample_candles(make_candles(range(0, 62 * 1440, 1440)), '1M', base_timeframe='1d')
+    assert df['open_time'].tolist() == [DAY_START_US, DAY_START_US + 31 * 1440 * MINUTE_US]
+    assert df['volume'].tolist() == [31.0, 28.0]
@@ -0,0 +1,136 @@
+"""
+异步策略执行测试
+
+验证事件驱动模式下行情事件直接唤醒策略、合并窗口内的事件只处理一次，
+以及策略任务意外结束后由引擎重启、被移除的策略不再重启
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from zbot.services import engine as engine_module
+from zbot.services import strategy as strategy_module
+from zbot.services.engine import Engine
+from zbot.services.events import EventType, event_bus, make_topic
+from zbot.services.strategy import AsyncBaseStrategy
+
+
+class RecordingStrategy(AsyncBaseStrategy):
+    # backtesting.Strategy.data 是只读属性，BaseStrategy.__init__ 需要为其赋值，实盘策略不使用回测数据
+    data = None
+
+    def __init__(self, params=None):
+        super().__init__(params)
+        self.events = []
+        self.ticks = 0
+        self.stops = 0
+
+    async def on_strategy_event(self, symbol):
+        self.events.append(symbol)
+
+    async def on_strategy_tick(self):
+        self.ticks += 1
+
+    async def on_strategy_stop(self):
+        self.stops += 1
+
+
+@pytest.fixture(autouse=True)
+def fake_exchange(monkeypatch):
+    monkeypatch.setattr(strategy_module.ExchangeFactory, 'create_exchange',
+                        staticmethod(lambda *args, **kwargs: SimpleNamespace(set_account_config=lambda params: None)))
+
+
+class FakeConnector(object):
+    exchange_name = 'binance'
+
+    async def close(self):
+        pass
+
+
+def make_connector():
+    return FakeConnector()
+
+
+async def wait_until(condition, timeout=1.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, '等待超时'
+        await asyncio.sleep(0.001)
+
+
+def publish_candle(symbol):
+    event_bus.publish_nowait(make_topic(EventType.MARKET_DATA, 'binance', symbol, '1m'),
+                             {'symbol': symbol, 'interval': '1m'})
+
+
+def test_event_driven_wakeup():
+    async def main():
+        strategy = RecordingStrategy({'symbols': ['BTCUSDT', 'ETHUSDT'], 'interval': '1m', 'event_driven': True})
+        await strategy.initialize(make_connector(), None)
+        await strategy.start()
+        try:
+            publish_candle('BTCUSDT')
+            await wait_until(lambda: strategy.events == ['BTCUSDT'])
+            # 其他交易对的行情不唤醒策略
+            publish_candle('BNBUSDT')
+            publish_candle('ETHUSDT')
+            await wait_until(lambda: len(strategy.events) == 2)
+            await asyncio.sleep(0.01)
+            assert strategy.events == ['BTCUSDT', 'ETHUSDT']
+            # 事件驱动模式默认不定时调用
+            assert strategy.ticks == 0
+        finally:
+            await strategy.stop()
+        assert not event_bus.handler_subscriptions
+
+    asyncio.run(main())
+
+
+def test_event_driven_debounce():
+    async def main():
+        strategy = RecordingStrategy({'symbol': 'BTCUSDT', 'interval': '1m', 'event_driven': True,
+                                      'debounce': 0.05})
+        await strategy.initialize(make_connector(), None)
+        await strategy.start()
+        try:
+            for _ in range(20):
+                publish_candle('BTCUSDT')
+                await asyncio.sleep(0.001)
+            await wait_until(lambda: strategy.events)
+            await asyncio.sleep(0.1)
+            assert strategy.events == ['BTCUSDT']
+        finally:
+            await strategy.stop()
+
+    asyncio.run(main())
+
+
+def test_engine_restarts_strategy(monkeypatch):
+    monkeypatch.setattr(engine_module, 'RESTART_DELAY', 0)
+
+    async def main():
+        engine = Engine({})
+        connector = make_connector()
+        engine.connectors['default'] = engine.data_providers['default'] = connector
+        await engine.start()
+        await engine.add_strategy('recording', RecordingStrategy, params={'symbol': 'BTCUSDT'})
+        strategy = engine.strategies['recording']
+        task = strategy._task
+        # 策略任务意外结束后，先清理再重新启动
+        task.cancel()
+        await wait_until(lambda: strategy._task is not task)
+        assert strategy.stops == 1
+        assert strategy._running and not strategy._task.done()
+
+        # 被移除的策略停止后不再重启
+        task = strategy._task
+        assert await engine.remove_strategy('recording')
+        await asyncio.sleep(0.01)
+        assert strategy._task is task and task.done()
+        assert not strategy._running
+        await engine.stop()
+
+    asyncio.run(main())
@@ -1,39 +1,165 @@
+import copy
 import os
+import threading
+from dataclasses import dataclass, field, fields
+from typing import Optional
+
 import yaml
 
 base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-def read_config(key='', file_path='') -> dict:
+# read_config 未传入 default 时，缺少配置项直接抛出 KeyError
+_MISSING = object()
+# 已解析的配置文件，键为文件路径，值为 ((修改时间, 文件大小), 配置内容)
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _get_config_path(file_path='') -> str:
+    return file_path or os.path.join(base_path, 'config.yml')
+
+
+def _load_config(file_path='') -> Optional[dict]:
+    """读取并缓存配置文件，文件不存在或解析失败时返回None"""
+    file_path = _get_config_path(file_path)
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        print(f"错误：未找到配置文件 {file_path}")
+        return None
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _cache_lock:
+        cached = _cache.get(file_path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        try:
+            with open(file_path, 'r', encoding='utf-8') as file:
+                data = yaml.safe_load(file) or {}
+        except yaml.YAMLError as e:
+            print(f"错误：解析配置文件 {file_path} 时出错 - {e}")
+            return None
+        _cache[file_path] = (version, data)
+        return data
+
+
+def load_config(file_path='') -> dict:
+    """
+    读取配置文件，只在首次读取或文件修改时间、大小变化后重新解析
+
+    返回的是缓存中的对象，调用方不能修改；需要修改时使用 read_config
+    :param file_path: 配置文件路径，默认为 'config.yml'
+    :return: 配置文件内容的字典，文件不存在或解析失败时返回空字典
+    """
+    return _load_config(file_path) or {}
+
+
+def reload(file_path=''):
+    """清除配置缓存，下次读取时重新解析配置文件"""
+    with _cache_lock:
+        if file_path:
+            _cache.pop(_get_config_path(file_path), None)
+        else:
+            _cache.clear()
+
+
+def read_config(key='', file_path='', default=_MISSING) -> dict:
     """
     读取配置文件内容
-    
+
+    配置文件只在首次读取或文件变化后解析，每次返回独立的副本，调用方可以直接修改
+
+    :param key: 配置项名称，为空时返回全部配置
     :param file_path: 配置文件路径，默认为 'config.yml'
-    :return: 配置文件内容的字典
+    :param default: 配置项不存在时的返回值，未指定时抛出 KeyError
+    :return: 配置文件内容的字典，文件不存在或解析失败时返回空字典
     """
-    try:
-        file_path = file_path or os.path.join(base_path, 'config.yml')
-        with open(file_path, 'r', encoding='utf-8') as file:
-            if key:
-                return yaml.safe_load(file)[key]
-            return yaml.safe_load(file)
-    except FileNotFoundError:
-        print(f"错误：未找到配置文件 {file_path}")
-        return {}
-    except yaml.YAMLError as e:
-        print(f"错误：解析配置文件 {file_path} 时出错 - {e}")
+    data = _load_config(file_path)
+    if data is None:
         return {}
+    if key:
+        if key not in data:
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        data = data[key]
+    return copy.deepcopy(data)
+
 
 def write_config(data, file_path=''):
     """
     写入配置文件内容
-    
+
     :param data: 要写入的配置数据
     :param file_path: 配置文件路径，默认为 'config.yml'
     """
     try:
-        file_path = file_path or os.path.join(base_path, 'config.yml')
+        file_path = _get_config_path(file_path)
         with open(file_path, 'w', encoding='utf-8') as file:
             yaml.dump(data, file, default_flow_style=False)
     except Exception as e:
         print(f"错误：写入配置文件 {file_path} 时出错 - {e}")
+    finally:
+        reload(file_path)
+
+
+def _from_dict(cls, data: dict, **kwargs):
+    """按数据类的字段从字典中取值，忽略多余的配置项"""
+    names = {f.name for f in fields(cls)}
+    values = {k: v for k, v in (data or {}).items() if k in names and v is not None}
+    values.update(kwargs)
+    return cls(**values)
+
+
+@dataclass(frozen=True)
+class ExchangeConfig:
+    """交易所配置，对应 config.yml 中的 exchange.<name>"""
+    name: str
+    api_key: Optional[str] = None
+    secret_key: Optional[str] = None
+    trading_mode: Optional[str] = None
+    proxy_url: Optional[str] = None
+    testnet: bool = False
+
+
+@dataclass(frozen=True)
+class ServerConfig:
+    """Web服务配置，对应 config.yml 中的 server"""
+    host: str = '0.0.0.0'
+    port: int = 8000
+
+
+@dataclass(frozen=True)
+class DatabaseConfig:
+    """数据库配置，对应 config.yml 中的 database，未配置的项使用 services.db 中的默认值"""
+    pragmas: dict = field(default_factory=dict)
+    max_connections: Optional[int] = None
+    stale_timeout: Optional[int] = None
+    timeout: Optional[int] = None
+
+
+def get_exchange_config(exchange_name: str = '', file_path='', overrides: Optional[dict] = None) -> ExchangeConfig:
+    """
+    获取交易所配置
+    :param exchange_name: 交易所名称，为空时使用 exchange.name 指定的交易所
+    :param overrides: 覆盖配置文件的配置项，值为None的项不覆盖
+    """
+    section = load_config(file_path).get('exchange') or {}
+    name = exchange_name or section.get('name')
+    data = dict(section.get(name) or {})
+    data.update((key, value) for key, value in (overrides or {}).items() if value is not None)
+    return _from_dict(ExchangeConfig, data, name=name)
+
+
+def get_server_config(file_path='') -> ServerConfig:
+    """获取Web服务配置，兼容 host/port 与 server_host/server_port 两种写法"""
+    section = load_config(file_path).get('server') or {}
+    return _from_dict(ServerConfig, {
+        'host': section.get('host', section.get('server_host')),
+        'port': section.get('port', section.get('server_port')),
+    })
+
 
+def get_database_config(file_path='') -> DatabaseConfig:
+    """获取数据库配置"""
+    section = copy.deepcopy(load_config(file_path).get('database') or {})
+    return _from_dict(DatabaseConfig, section)
@@ -1,7 +1,5 @@
 from typing import Optional
-from .connector import BinanceExchange
 # from .connector import AsyncBinanceExchange
-from .websocket_connector import BinanceWebSocketConnector
 
 
 # def create_async_connector(api_key: Optional[str] = None, secret_key: Optional[str] = None, proxy_url: Optional[str] = None, testnet: Optional[bool] = None) -> AsyncBinanceExchange:
@@ -21,4 +19,16 @@ from .websocket_connector import BinanceWebSocketConnector
 #         secret_key=secret_key,
 #         proxy_url=proxy_url,
 #         testnet=testnet
-#     )
\ No newline at end of file
+#     )
+
+
+def __getattr__(name):
+    # 连接器依赖ccxt和交易所SDK，只在使用时导入；导入 data、batch、archive_cache 等子模块时无需加载
+    if name == 'BinanceExchange':
+        from .connector import BinanceExchange
+        return BinanceExchange
+    # WebSocket连接器依赖合约SDK的流式模块，只在使用时导入，下载数据等命令无需加载
+    if name == 'BinanceWebSocketConnector':
+        from .websocket_connector import BinanceWebSocketConnector
+        return BinanceWebSocketConnector
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
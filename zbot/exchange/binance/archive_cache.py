@@ -0,0 +1,125 @@
+# coding=utf-8
+"""
+币安归档文件(data.binance.vision)本地缓存
+
+以下载地址的SHA256作为键保存原始zip文件及其 .CHECKSUM 校验文件，
+复用前校验zip内容的SHA256，校验失败的缓存会被删除并重新下载。
+下载时未能获取 .CHECKSUM 的文件只写入zip不写校验文件，视为未校验，下次使用时重新下载。
+归档文件发布后内容不再变化，因此缓存不设过期时间。
+
+目录结构:
+    <root>/<key[:2]>/<key>.zip
+    <root>/<key[:2]>/<key>.zip.CHECKSUM
+"""
+import hashlib
+import os
+from typing import Optional
+
+from zbot.common.config import base_path
+
+
+class ArchiveCache(object):
+    """归档zip文件的本地缓存"""
+
+    def __init__(self, root: Optional[str] = None):
+        """
+        :param root: 缓存根目录，默认为 zbot/data/archive_cache
+        """
+        self.root = root or os.path.join(base_path, 'data', 'archive_cache')
+
+    @staticmethod
+    def key(url: str) -> str:
+        """根据下载地址生成缓存键"""
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def get_path(self, url: str) -> str:
+        """获取下载地址对应的缓存zip文件路径"""
+        key = self.key(url)
+        return os.path.join(self.root, key[:2], f'{key}.zip')
+
+    @staticmethod
+    def get_checksum_path(path: str) -> str:
+        """获取zip文件对应的校验文件路径"""
+        return f'{path}.CHECKSUM'
+
+    @staticmethod
+    def parse_checksum(text: str) -> Optional[str]:
+        """
+        解析 .CHECKSUM 文件内容，格式为 "<sha256>  <文件名>"
+        :return: 小写的SHA256十六进制字符串，内容无效时返回None
+        """
+        parts = text.strip().split()
+        if not parts or len(parts[0]) != 64:
+            return None
+        return parts[0].lower()
+
+    @staticmethod
+    def file_digest(path: str) -> str:
+        """分块计算文件的SHA256"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def get(self, url: str) -> Optional[str]:
+        """
+        获取已缓存且校验通过的zip文件路径
+        :return: 缓存文件路径，未缓存或校验失败时返回None
+        """
+        path = self.get_path(url)
+        checksum_path = self.get_checksum_path(path)
+        if not os.path.exists(path) or not os.path.exists(checksum_path):
+            return None
+        with open(checksum_path, 'r', encoding='utf-8') as f:
+            expected = self.parse_checksum(f.read())
+        if expected is None or self.file_digest(path) != expected:
+            print(f"警告: 缓存文件校验失败，重新下载 {url}")
+            self.remove(url)
+            return None
+        return path
+
+    def get_temp_path(self, url: str) -> str:
+        """获取下载中的临时文件路径，下载完成后通过 commit 写入缓存"""
+        path = self.get_path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return f'{path}.part'
+
+    def commit(self, url: str, temp_path: str, digest: str, checksum: Optional[str] = None) -> str:
+        """
+        将下载完成的临时文件写入缓存
+
+        :param temp_path: get_temp_path 返回的临时文件路径
+        :param digest: 下载过程中计算的SHA256
+        :param checksum: 官方 .CHECKSUM 文件内容，为None时文件不写校验值，get 不会命中
+        :return: 缓存文件路径
+        :raises ValueError: 文件内容与官方校验值不一致
+        """
+        if checksum is not None:
+            expected = self.parse_checksum(checksum)
+            if expected != digest:
+                os.remove(temp_path)
+                raise ValueError(f"文件校验失败 {url}: 期望 {expected}, 实际 {digest}")
+
+        path = self.get_path(url)
+        checksum_path = self.get_checksum_path(path)
+        # 先删除旧的校验文件再替换zip，校验文件存在即表示缓存完整且已校验
+        if os.path.exists(checksum_path):
+            os.remove(checksum_path)
+        os.replace(temp_path, path)
+        if checksum is None:
+            return path
+        with open(f'{checksum_path}.tmp', 'w', encoding='utf-8') as f:
+            f.write(checksum)
+        os.replace(f'{checksum_path}.tmp', checksum_path)
+        return path
+
+    def remove(self, url: str):
+        """删除缓存文件"""
+        path = self.get_path(url)
+        for p in (self.get_checksum_path(path), path):
+            if os.path.exists(p):
+                os.remove(p)
+
+
+archive_cache = ArchiveCache()
@@ -0,0 +1,181 @@
+# coding=utf-8
+"""
+多交易对、多时间周期批量下载
+
+将 交易对 x 时间周期 展开为多个下载任务，由固定数量的工作协程依次领取执行：
+- 所有任务共享一个aiohttp会话，网络请求(归档文件和REST接口)受全局信号量限制
+- 写库受全局线程信号量限制，避免多个任务同时写SQLite造成锁竞争
+- 所有任务共享一个ccxt实例，REST请求在线程中串行执行，由该实例的限速器统一控制频率
+- 每个任务单独记录状态和进度，并可汇总为整体进度
+"""
+import asyncio
+import fnmatch
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass
+from typing import Callable, Iterable, List, Optional
+
+from zbot.exchange.binance.data import ARCHIVE_CONCURRENCY, History
+from zbot.exchange.markets_cache import markets_cache
+from zbot.utils.dateutils import str_to_timestamp
+
+
+# 默认同时执行的任务数
+BATCH_WORKERS = 4
+# 默认同时写库的任务数
+BATCH_WRITE_CONCURRENCY = 1
+
+
+def resolve_symbols(symbols: Optional[Iterable[str]] = None, pattern: Optional[str] = None,
+                    cache_name: str = 'binance', cache_file: Optional[str] = None) -> List[str]:
+    """
+    解析需要下载的交易对列表
+
+    :param symbols: 交易对列表，例如 ['BTC/USDT', 'ETHUSDT']
+    :param pattern: 通配符，匹配交易对缓存中的交易对，例如 '*/USDT'、'BTC*'
+    :param cache_name: 市场信息缓存名，见 BinanceExchange.markets_cache_name 和 get_cache_name
+    :param cache_file: 交易对缓存文件，默认为 cache_name 对应的市场信息缓存文件
+    :return: 去掉斜杠并去重后的交易对列表，保持输入顺序
+    """
+    result = list(symbols or [])
+    if pattern:
+        cache_file = cache_file or markets_cache.get_path(cache_name)
+        if not os.path.exists(cache_file):
+            raise FileNotFoundError(f"交易对缓存文件不存在: {cache_file}")
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cached = json.load(f).get('symbols') or []
+        # 同时匹配带斜杠和不带斜杠的写法
+        result += [s for s in cached
+                   if fnmatch.fnmatchcase(s, pattern) or fnmatch.fnmatchcase(s.replace('/', ''), pattern)]
+    return list(dict.fromkeys(s.replace('/', '') for s in result))
+
+
+@dataclass
+class DownloadJob:
+    """单个 交易对/时间周期 的下载任务"""
+    symbol: str
+    interval: str
+    status: str = 'pending'  # pending/running/completed/error
+    progress: float = 0.0
+    missing: int = 0  # 补齐的缺失区间数
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class JobProgress(object):
+    """
+    将 History 的进度消息转换为任务进度，
+    实现 put 方法以替代 download_archives 使用的进度队列
+    """
+
+    def __init__(self, job: DownloadJob, callback: Optional[Callable] = None):
+        self.job = job
+        self.callback = callback
+
+    def put(self, message):
+        # None 为同步完成信号，任务状态由 BatchDownloader 更新
+        if message is None:
+            return
+        self.job.progress = message['progress']
+        if self.callback:
+            self.callback(self.job)
+
+
+class BatchDownloader(object):
+    """批量下载K线数据"""
+
+    def __init__(self, exchange, workers: int = BATCH_WORKERS, network_concurrency: int = ARCHIVE_CONCURRENCY,
+                 write_concurrency: int = BATCH_WRITE_CONCURRENCY, on_progress: Optional[Callable] = None):
+        """
+        :param exchange: BinanceExchange实例
+        :param workers: 同时执行的任务数
+        :param network_concurrency: 全部任务合计的最大并发网络请求数
+        :param write_concurrency: 全部任务合计的最大并发写库数
+        :param on_progress: 进度回调，参数为 (当前任务, 汇总进度字典)
+        """
+        self.exchange = exchange
+        self.workers = workers
+        self.network_concurrency = network_concurrency
+        self.write_limit = threading.Semaphore(write_concurrency)
+        # ccxt的限速器不是线程安全的，多个线程中的REST请求依次执行
+        self.rest_lock = threading.Lock()
+        self.on_progress = on_progress
+        self.jobs: List[DownloadJob] = []
+
+    def progress(self) -> dict:
+        """汇总全部任务的进度"""
+        total = len(self.jobs)
+        counts = {status: 0 for status in ('pending', 'running', 'completed', 'error')}
+        for job in self.jobs:
+            counts[job.status] += 1
+        finished = counts['completed'] + counts['error']
+        return {
+            'total': total,
+            **counts,
+            # 已结束的任务按1计，执行中的任务按自身进度计
+            'progress': (finished + sum(job.progress for job in self.jobs if job.status == 'running')) / total
+            if total else 1.0,
+        }
+
+    def _notify(self, job: DownloadJob):
+        if self.on_progress:
+            self.on_progress(job, self.progress())
+
+    def run(self, symbols: Iterable[str], intervals: Iterable[str], start_time, end_time,
+            candle_type: Optional[str] = None, limit: int = 500) -> List[DownloadJob]:
+        """
+        执行批量下载
+
+        :param symbols: 交易对列表
+        :param intervals: 时间周期列表
+        :param start_time: 开始时间，格式为 '2025-01-01' 或毫秒时间戳
+        :param end_time: 结束时间，格式同上
+        :param candle_type: 交易模式，spot 或 future，默认使用交易所配置
+        :param limit: REST接口每页K线数量
+        :return: 全部任务，失败的任务 status 为 error 并记录错误信息
+        """
+        return asyncio.run(self.run_async(symbols, intervals, start_time, end_time, candle_type, limit))
+
+    async def run_async(self, symbols, intervals, start_time, end_time, candle_type=None, limit=500):
+        """run 的异步版本"""
+        if isinstance(start_time, str):
+            start_time = str_to_timestamp(start_time)
+        if isinstance(end_time, str):
+            end_time = str_to_timestamp(end_time)
+        candle_type = candle_type or self.exchange.trading_mode
+        self.jobs = [DownloadJob(symbol.replace('/', ''), interval)
+                     for symbol in symbols for interval in intervals]
+        pending = asyncio.Queue()
+        for job in self.jobs:
+            pending.put_nowait(job)
+
+        session = History.create_session(self.network_concurrency)
+        semaphore = asyncio.Semaphore(self.network_concurrency)
+
+        async def work():
+            while not pending.empty():
+                job = pending.get_nowait()
+                job.status = 'running'
+                self._notify(job)
+                history = History(self.exchange, write_limit=self.write_limit, rest_lock=self.rest_lock)
+                try:
+                    plan = await history.sync_async(
+                        job.symbol, job.interval, candle_type, start_time, end_time,
+                        JobProgress(job, self._notify), limit, session=session, semaphore=semaphore)
+                    job.missing = len(plan)
+                    job.progress = 1.0
+                    job.status = 'completed'
+                except Exception as e:
+                    # 单个任务失败不影响其他任务
+                    job.status = 'error'
+                    job.error = str(e)
+                self._notify(job)
+
+        try:
+            await asyncio.gather(*(work() for _ in range(min(self.workers, len(self.jobs)))))
+        finally:
+            await session.close()
+        return self.jobs
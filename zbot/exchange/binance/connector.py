@@ -1,13 +1,11 @@
 from datetime import datetime
+import threading
 import time
 
 import ccxt
 import pandas as pd
-from binance_common.configuration import ConfigurationRestAPI
-from binance_common.constants import SPOT_REST_API_TESTNET_URL, SPOT_REST_API_PROD_URL, DERIVATIVES_TRADING_COIN_FUTURES_REST_API_TESTNET_URL, DERIVATIVES_TRADING_USDS_FUTURES_REST_API_PROD_URL
-from binance_sdk_spot.spot import Spot
-from binance_sdk_derivatives_trading_usds_futures.derivatives_trading_usds_futures import DerivativesTradingUsdsFutures as Future
 from zbot.exchange import Exchange
+from zbot.exchange.markets_cache import markets_cache
 from zbot.exchange.binance.data import History
 from zbot.exchange.binance.models import Candle
 from zbot.services.model import get_candles_from_db
@@ -48,6 +46,10 @@ class BinanceExchange(Exchange):
             self.exchange.set_sandbox_mode(True)
         # 设置自定义的 ohlcv 解析方法
         self.exchange.parse_ohlcv = self.prase_ohlcv_custom
+        # 市场信息优先从本地缓存加载，ccxt 内部首次需要市场信息时同样经过缓存
+        self._load_markets = self.exchange.load_markets
+        self._markets_lock = threading.Lock()
+        self.exchange.load_markets = self.load_markets
 
         # 定义 K 线数据的字段名称
         self.candle_names = [
@@ -56,12 +58,72 @@ class BinanceExchange(Exchange):
             'taker_buy_quote_volume', 'ignore'
         ]
         self.trading_mode = trading_mode
-        self.exchange.load_markets()
         self._symbols = None
-        self.spot_api = Spot(ConfigurationRestAPI(api_key, secret_key, SPOT_REST_API_TESTNET_URL if testnet else SPOT_REST_API_PROD_URL))
-        self.future_api = Future(ConfigurationRestAPI(api_key, secret_key, DERIVATIVES_TRADING_COIN_FUTURES_REST_API_TESTNET_URL if testnet else DERIVATIVES_TRADING_USDS_FUTURES_REST_API_PROD_URL))
+        self._spot_api = None
+        self._future_api = None
+
+    @property
+    def spot_api(self):
+        """现货SDK客户端，首次使用时创建"""
+        if self._spot_api is None:
+            from binance_common.configuration import ConfigurationRestAPI
+            from binance_common.constants import SPOT_REST_API_TESTNET_URL, SPOT_REST_API_PROD_URL
+            from binance_sdk_spot.spot import Spot
+            self._spot_api = Spot(ConfigurationRestAPI(
+                self.api_key, self.secret_key, SPOT_REST_API_TESTNET_URL if self.testnet else SPOT_REST_API_PROD_URL))
+        return self._spot_api
+
+    @property
+    def future_api(self):
+        """U本位合约SDK客户端，首次使用时创建"""
+        if self._future_api is None:
+            from binance_common.configuration import ConfigurationRestAPI
+            from binance_common.constants import DERIVATIVES_TRADING_COIN_FUTURES_REST_API_TESTNET_URL, DERIVATIVES_TRADING_USDS_FUTURES_REST_API_PROD_URL
+            from binance_sdk_derivatives_trading_usds_futures.derivatives_trading_usds_futures import DerivativesTradingUsdsFutures as Future
+            self._future_api = Future(ConfigurationRestAPI(
+                self.api_key, self.secret_key,
+                DERIVATIVES_TRADING_COIN_FUTURES_REST_API_TESTNET_URL if self.testnet else DERIVATIVES_TRADING_USDS_FUTURES_REST_API_PROD_URL))
+        return self._future_api
+
+    @property
+    def markets_cache_name(self) -> str:
+        """市场信息缓存的名称，测试网络与正式网络的市场不同"""
+        return f'{self.exchange_name}_testnet' if self.testnet else self.exchange_name
+
+    def load_markets(self, reload=False, params={}):
+        """
+        加载市场信息，替换 ccxt 实例的 load_markets
+
+        未加载时优先使用本地缓存，缓存不存在时从交易所获取并写入缓存；
+        缓存过期时先使用旧数据，同时在后台线程刷新
+        :param reload: 是否强制从交易所重新获取
+        :return: 市场信息字典
+        """
+        if reload or self.exchange.markets:
+            return self._load_markets(reload, params)
+        with self._markets_lock:
+            if self.exchange.markets:
+                return self.exchange.markets
+            entry = markets_cache.load(self.markets_cache_name)
+            if entry is None:
+                self._load_markets(False, params)
+                self.save_markets()
+                return self.exchange.markets
+            self.exchange.set_markets(entry['markets'], entry.get('currencies') or None)
+        if markets_cache.is_expired(entry):
+            markets_cache.refresh_in_background(self.markets_cache_name, self.refresh_markets)
+        return self.exchange.markets
+
+    def refresh_markets(self):
+        """从交易所重新获取市场信息并写入缓存"""
+        self._load_markets(True)
+        self.save_markets()
+
+    def save_markets(self):
+        """将当前市场信息写入缓存"""
+        self._symbols = None
+        markets_cache.save(self.markets_cache_name, self.exchange.markets, self.exchange.currencies, self.symbols)
 
-    
     def health_check(self) -> bool:
         """
         策略健康检查，确保市场数据和账户信息正常，是做市风险控制的第一道防线
@@ -144,7 +206,7 @@ class BinanceExchange(Exchange):
         :param end_time: 结束时间，格式为 '2025-01-01 10:00:00' 或 '2025-01-01'，默认为 None
         :param limit: 每次获取数据的最大条数，默认为 500
         :param candle_type: 交易模式，spot 或 future，默认为 None
-        :return: 保存到数据库的 K 线数据列表
+        :return: 本次补齐的缺失区间列表
         """
         # 解析时间参数
         if start_time:
@@ -152,24 +214,31 @@ class BinanceExchange(Exchange):
         if end_time:
             end_time = str_to_timestamp(end_time)
         symbol = symbol.replace('/', '')
-        # 如果提供了开始时间和结束时间
+        # 如果提供了开始时间和结束时间，只下载数据库中缺失的区间
         if start_time and end_time:
-            # 获取当前时间戳(毫秒)
-            current_time = int(time.time() * 1000)
-            # 计算 30 天前的时间戳(毫秒)
-            thirty_days_ago = current_time - 7 * 24 * 60 * 60 * 1000
             # 接口只能获取7天内数据,超过七天的数据从归档地址获取
-            if start_time < thirty_days_ago:
-                # 从历史归档地址下载历史数据
-                history = History(self)
-                res = history.download_from_archive(
-                    symbol, interval, candle_type or self.trading_mode, start_time, end_time, progress_queue)
-                return res
-            else:
-                h = History(self)
-                res = h.download_data(
-                    symbol, interval, start_time, end_time, limit)
-        return
+            history = History(self)
+            return history.sync(
+                symbol, interval, candle_type or self.trading_mode, start_time, end_time, progress_queue, limit)
+        return []
+
+    def download_batch(self, symbols, intervals, start_time, end_time, limit=500, candle_type=None, workers=4,
+                       network_concurrency=8, write_concurrency=1, on_progress=None):
+        """
+        批量下载多个交易对、多个时间周期的 K 线数据
+        :param symbols: 交易对列表
+        :param intervals: 时间间隔列表
+        :param start_time: 开始时间，格式为 '2025-01-01 10:00:00' 或 '2025-01-01'
+        :param end_time: 结束时间，格式同上
+        :param workers: 同时执行的任务数
+        :param network_concurrency: 全部任务合计的最大并发网络请求数
+        :param write_concurrency: 全部任务合计的最大并发写库数
+        :param on_progress: 进度回调，参数为 (当前任务, 汇总进度字典)
+        :return: DownloadJob 列表
+        """
+        from zbot.exchange.binance.batch import BatchDownloader
+        downloader = BatchDownloader(self, workers, network_concurrency, write_concurrency, on_progress)
+        return downloader.run(symbols, intervals, start_time, end_time, candle_type or self.trading_mode, limit)
 
     def load_data(self, symbol, interval, start_time=None, end_time=None):
         """
@@ -187,6 +256,7 @@ class BinanceExchange(Exchange):
     @property
     def symbols(self):
         if not self._symbols:
+            self.exchange.load_markets()
             self._symbols = [i for i in self.exchange.symbols if ':' not in i]
         return self._symbols
 
@@ -1,28 +1,71 @@
 # coding=utf-8
 import time
+import queue
+import threading
 from multiprocessing import Process, Queue
 import os
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import zipfile
+import hashlib
+import tempfile
+from contextlib import nullcontext
 from numpy.random import f
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 import aiohttp
 import asyncio
-import ccxt
 from tqdm import tqdm
-from io import BytesIO
 import ssl
 import certifi
 # 延迟导入以避免循环依赖
-from zbot.utils.dateutils import get_date_range, str_to_timestamp
+from zbot.utils.dateutils import (
+    detect_timestamp_unit, get_date_range, parse_timeframe, str_to_timestamp, timestamps_to_datetime_index)
+from zbot.exchange.binance.archive_cache import archive_cache
 from zbot.exchange.binance.models import Candle
+from zbot.services.model import get_candles_from_db, save_candles_to_store
+from zbot.services.resample import get_bucket_bounds
+
+
+# 币安历史数据归档地址
+ARCHIVE_BASE_URL = 'https://data.binance.vision/data'
+# 归档文件默认并发下载数
+ARCHIVE_CONCURRENCY = 8
+# 已下载待写入的归档文件队列长度
+ARCHIVE_QUEUE_SIZE = 16
+# 流式下载和解析归档文件的块大小
+ARCHIVE_CHUNK_SIZE = 1024 * 1024
+# 未启用缓存时，下载内容超过该大小才写入临时文件
+ARCHIVE_SPOOL_SIZE = 16 * 1024 * 1024
+# REST接口获取最近几天的数据，更早的数据从归档文件获取
+REST_WINDOW_DAYS = 7
+# K线各字段的数据类型
+CANDLE_DTYPES = {
+    'open_time': 'int64', 'open': 'float64', 'high': 'float64', 'low': 'float64',
+    'close': 'float64', 'volume': 'float64', 'close_time': 'int64', 'quote_volume': 'float64',
+    'count': 'int64', 'taker_buy_volume': 'float64', 'taker_buy_quote_volume': 'float64',
+    'ignore': 'int64',
+}
 
 
 class History(object):
-    def __init__(self, exchange):
+    # 归档地址，可替换为本地服务用于测试
+    archive_base_url = ARCHIVE_BASE_URL
+
+    def __init__(self, exchange, archive_cache=archive_cache, write_limit=None, rest_lock=None):
+        """
+        :param exchange: BinanceExchange实例
+        :param archive_cache: 归档文件本地缓存，为None时不使用缓存
+        :param write_limit: 多个任务共享的写库信号量(threading.Semaphore)，为None时不限制
+        :param rest_lock: 多个线程共享同一个ccxt实例时的REST请求锁(threading.Lock)，
+            ccxt的限速器不是线程安全的，为None时不加锁
+        """
         self.exchange = exchange.exchange
         self.candle_names = exchange.candle_names
+        self.archive_cache = archive_cache
+        self.write_limit = write_limit
+        self.rest_lock = rest_lock
 
         self.exchange.parse_ohlcv = self.prase_ohlcv_custom
 
@@ -84,21 +127,8 @@ class History(object):
         :param end_time: 结束时间（字符串或时间戳）
         :return: 清理后的DataFrame
         """
-        # 处理时间参数
-        # 查询数据库
-        start = str_to_timestamp(start_time, 'us')
-        end = str_to_timestamp(end_time, 'us')
-        # 查询指定条件的K线数据并按时间戳排序
-        candles = list(
-            Candle.select().where(
-                (Candle.symbol == symbol)
-                & (Candle.timeframe == timeframe)
-                & Candle.open_time.between(start, end)
-            ).order_by(Candle.open_time)
-        )
-
-        # 转换为DataFrame
-        df = pd.DataFrame([candle.__data__ for candle in candles])
+        # 从列式存储读取，不经过ORM
+        df = get_candles_from_db('binance', symbol, timeframe, start_time, end_time)
 
         if df.empty:
             return df
@@ -111,19 +141,16 @@ class History(object):
         df = df.dropna()
 
         # 3. 确保时间序列连续
-        expected_interval = self._get_interval_ms(timeframe) * 1000  # 转换为微秒
-        all_timestamps = pd.date_range(
-            start=pd.to_datetime(df['open_time'].min(), unit='us'),
-            end=pd.to_datetime(df['open_time'].max(), unit='us'),
-            freq=f'{expected_interval//1000000}S'  # 转换回秒用于设置频率
-        ).astype(np.int64)  # 转换为微秒级时间戳
+        open_time = df['open_time'].to_numpy(dtype=np.int64)
+        # 按数值大小识别时间戳单位，兼容尚未迁移为微秒的数据
+        unit = detect_timestamp_unit(open_time)
+        expected_interval = parse_timeframe(timeframe) // pd.Timedelta(1, unit=unit)
+        all_timestamps = np.arange(open_time.min(), open_time.max() + 1, expected_interval, dtype=np.int64)
 
         # 找出缺失的时间戳
-        existing_timestamps = set(df['open_time'])
-        missing_timestamps = [
-            ts for ts in all_timestamps if ts not in existing_timestamps]
+        missing_timestamps = np.setdiff1d(all_timestamps, open_time, assume_unique=True)
 
-        if missing_timestamps:
+        if len(missing_timestamps):
             print(f"警告: 检测到{len(missing_timestamps)}个缺失的K线数据点")
 
         # 转换列名为大写以兼容Backtesting.py
@@ -136,95 +163,175 @@ class History(object):
         })
 
         # 设置datetime索引
-        df['datetime'] = pd.to_datetime(df['open_time'], unit='ms')
-        df.set_index('datetime', inplace=True)
+        df.index = timestamps_to_datetime_index(open_time, unit=unit, name='datetime')
 
         return df
 
     def download_data(self, symbol, interval, start_time=None, end_time=None, limit=500):
-        # TODO: 未完,根据fetch_ohlcv返回结果,进行遍历,只取所有符合要求的 start_time 和 end_time时间戳数据返回
-        all_ohlcv = []
-        ohlcv = self.exchange.fetch_ohlcv(
-            symbol, interval, None, limit, params={})
-        all_ohlcv.extend(ohlcv)
-        self._process_ohlcv_data(symbol, interval, ohlcv)
-        # 查询数据库中已存在的K线时间戳
-        existing_times = set()
-        from zbot.exchange.binance.models import Candle
-        if Candle.table_exists():
-            # 确保数据库连接已打开
-            from zbot.services.db import database
-            database.open_connection()
-
-            # 查询该交易对和时间间隔下的所有已有记录
-            existing_records = Candle.select(Candle.open_time).where(
-                (Candle.symbol == symbol) &
-                (Candle.timeframe == interval)
-            )
-            existing_times = {record.open_time for record in existing_records}
-
-        bulk_create = []
-        bulk_update = []
-
-        # 遍历获取到的K线数据
-        for candle_data in ohlcv:
-            formatted_data = self.format_candle(candle_data)
-            open_time = formatted_data['open_time']
-
-            # 检查记录是否已存在
-            if open_time in existing_times:
-                # 准备更新数据
-                bulk_update.append({
-                    'symbol': symbol,
-                    'timeframe': interval,
-                    'open_time': open_time,
-                    'open': formatted_data['open'],
-                    'high': formatted_data['high'],
-                    'low': formatted_data['low'],
-                    'close': formatted_data['close'],
-                    'volume': formatted_data['volume'],
-                    'close_time': formatted_data['close_time'],
-                    'quote_volume': formatted_data['quote_volume'],
-                })
-            else:
-                # 准备创建新记录
-                bulk_create.append(
-                    Candle(symbol=symbol, timeframe=interval, **formatted_data)
-                )
+        """
+        通过REST接口分页下载K线数据并写入数据库
+
+        从start_time开始按limit分页向后获取，请求频率由ccxt的限速控制；
+        获取下一页的同时由写入线程将上一页批量入库，每根K线只写一次，内存中最多保留两页数据。
+        尚未收盘的K线不写入
+        :param symbol: 货币对
+        :param interval: 时间间隔
+        :param start_time: 开始时间戳(毫秒)，为None时只获取最近limit根K线
+        :param end_time: 结束时间戳(毫秒)，为None时获取到最新
+        :param limit: 每页K线数量
+        :return: 写入的K线数量
+        """
+        pages = queue.Queue(maxsize=2)
+        errors = []
+
+        def write():
+            while True:
+                page = pages.get()
+                if page is None:
+                    break
+                # 写入失败后继续取出剩余页，避免获取线程阻塞
+                if not errors:
+                    try:
+                        self.save_candles(symbol, interval, self.ohlcv_to_frame(page))
+                    except Exception as e:
+                        errors.append(e)
+
+        writer = threading.Thread(target=write, daemon=True)
+        writer.start()
+        count = 0
+        since = start_time
+        params = {'endTime': end_time} if end_time else {}
+        try:
+            while not errors:
+                if not self.exchange.enableRateLimit:
+                    time.sleep(self.exchange.rateLimit / 1000)
+                with self.rest_lock or nullcontext():
+                    ohlcv = self.exchange.fetch_ohlcv(symbol, interval, since, limit, params=params)
+                now = int(time.time() * 1000)
+                # 只保留请求范围内已收盘的K线(第7列为收盘时间)
+                page = [candle for candle in ohlcv
+                        if (end_time is None or candle[0] <= end_time) and int(candle[6]) < now]
+                if page:
+                    pages.put(page)
+                    count += len(page)
+                if start_time is None or len(ohlcv) < limit or len(page) < len(ohlcv):
+                    break
+                # 月线长度不固定，从最后一根K线之后的1毫秒继续请求
+                since = ohlcv[-1][0] + 1
+        finally:
+            pages.put(None)
+            writer.join()
+        if errors:
+            raise errors[0]
+        return count
+
+    def ohlcv_to_frame(self, ohlcv):
+        """
+        将REST接口返回的K线列表转换为DataFrame，价格等字段由字符串转为数值，时间戳转为微秒
+        :param ohlcv: K线数据列表
+        :return: K线数据DataFrame
+        """
+        return normalize_time_units(pd.DataFrame(ohlcv, columns=self.candle_names).astype(CANDLE_DTYPES))
+
+    def plan_sync(self, symbol, timeframe, start_time, end_time, now=None):
+        """
+        规划需要下载的缺失区间
+
+        根据数据库中已有K线的覆盖区间计算请求范围内缺失的部分，
+        早于REST窗口(最近7天，按UTC日对齐)的部分从归档文件下载，其余通过REST接口获取。
+        K线边界按 get_bucket_bounds 对齐，周线从周一开始，月线按自然月
+        :param start_time: 开始时间戳(毫秒)
+        :param end_time: 结束时间戳(毫秒)
+        :param now: 当前时间戳(毫秒)，默认为当前时间
+        :return: [(source, start, end)] 列表，source为 'archive' 或 'rest'，start/end为K线open_time(微秒，含)
+        """
+        step = int(parse_timeframe(timeframe).total_seconds() * 1000000)
+        now = (now or int(time.time() * 1000)) * 1000
+
+        def bounds(ts):
+            """ts所在K线的开盘时间和下一根K线的开盘时间"""
+            start, end = get_bucket_bounds([ts], timeframe)
+            return int(start[0]), int(end[0])
+
+        def ceil(ts):
+            """不早于ts的第一根K线的开盘时间"""
+            start, end = bounds(ts)
+            return start if start == ts else end
+
+        # 只规划已收盘的K线
+        first = ceil(start_time * 1000)
+        last = min(bounds(end_time * 1000)[0], bounds(bounds(now)[0] - 1)[0])
+        if first > last:
+            return []
+
+        missing = []
+        cursor = first
+        for covered_start, covered_end in Candle.get_coverage(symbol, timeframe, step, first, last):
+            if covered_start > cursor:
+                missing.append((cursor, bounds(covered_start - 1)[0]))
+            cursor = max(cursor, bounds(covered_end)[1])
+        if cursor <= last:
+            missing.append((cursor, last))
+
+        day = 24 * 60 * 60 * 1000000
+        rest_start = (now // day - REST_WINDOW_DAYS) * day
+        plan = []
+        for start, end in missing:
+            if start < rest_start:
+                plan.append(('archive', start, min(end, rest_start - 1)))
+            if end >= rest_start:
+                plan.append(('rest', max(start, ceil(rest_start)), end))
+        return plan
+
+    def sync(self, symbol, timeframe, candle_type, start_time, end_time, progress_queue=None, limit=500):
+        """
+        增量同步K线数据，只下载数据库中缺失的区间
+        :param start_time: 开始时间戳(毫秒)
+        :param end_time: 结束时间戳(毫秒)
+        :return: plan_sync 规划出的缺失区间列表
+        """
+        return asyncio.run(self.sync_async(
+            symbol, timeframe, candle_type, start_time, end_time, progress_queue, limit))
 
-        # 执行批量操作
-        if bulk_create:
-            Candle.bulk_create(bulk_create)
-            print(f"Created {len(bulk_create)} new candle records")
-
-        if bulk_update:
-            # 使用peewee的批量更新方式
-            from peewee import Case
-            update_query = Candle.update(
-                open=Case(Candle.open_time, [
-                          (item['open_time'], item['open']) for item in bulk_update]),
-                high=Case(Candle.open_time, [
-                          (item['open_time'], item['high']) for item in bulk_update]),
-                low=Case(Candle.open_time, [
-                         (item['open_time'], item['low']) for item in bulk_update]),
-                close=Case(Candle.open_time, [
-                           (item['open_time'], item['close']) for item in bulk_update]),
-                volume=Case(Candle.open_time, [
-                            (item['open_time'], item['volume']) for item in bulk_update]),
-                close_time=Case(Candle.open_time, [
-                                (item['open_time'], item['close_time']) for item in bulk_update]),
-                quote_volume=Case(Candle.open_time, [
-                                  (item['open_time'], item['quote_volume']) for item in bulk_update])
-            ).where(
-                (Candle.symbol == symbol) &
-                (Candle.timeframe == interval) &
-                (Candle.open_time << [item['open_time']
-                 for item in bulk_update])
-            )
-            update_count = update_query.execute()
-            print(f"Updated {update_count} existing candle records")
-
-        return all_ohlcv
+    async def sync_async(self, symbol, timeframe, candle_type, start_time, end_time, progress_queue=None,
+                         limit=500, session=None, semaphore=None):
+        """
+        sync 的异步版本，批量下载时多个任务共享同一个会话和网络并发信号量
+        :param session: 外部传入的aiohttp会话，为None时内部创建
+        :param semaphore: 网络请求信号量(asyncio.Semaphore)，同时限制归档下载和REST请求
+        :return: plan_sync 规划出的缺失区间列表
+        """
+        plan = await asyncio.to_thread(self.plan_sync, symbol, timeframe, start_time, end_time)
+        dates = sorted({date for source, start, end in plan if source == 'archive'
+                        for date in self.get_utc_dates(start, end)})
+        files = self.plan_archive_files(dates)
+        rest = [(start, end) for source, start, end in plan if source == 'rest']
+        progress = SyncProgress(progress_queue, symbol, len(files) + len(rest)) \
+            if progress_queue is not None else None
+        try:
+            await self.download_archives(symbol, timeframe, candle_type, files,
+                                         progress, session=session, semaphore=semaphore)
+            for start, end in rest:
+                async with semaphore or nullcontext():
+                    await asyncio.to_thread(
+                        self.download_data, symbol, timeframe, start // 1000, end // 1000, limit)
+                if progress is not None:
+                    progress.step(self.get_utc_dates(start, end)[-1])
+        finally:
+            # 归档和REST全部结束后才发送完成信号
+            if progress is not None:
+                progress.finish()
+        return plan
+
+    @staticmethod
+    def get_utc_dates(start, end):
+        """
+        获取微秒时间戳区间覆盖的UTC日期
+        :return: 日期字符串列表，格式为 %Y-%m-%d
+        """
+        first = datetime.fromtimestamp(start / 1000000, timezone.utc).date()
+        last = datetime.fromtimestamp(end / 1000000, timezone.utc).date()
+        return [(first + timedelta(days=i)).strftime('%Y-%m-%d') for i in range((last - first).days + 1)]
 
     def _get_interval_ms(self, interval):
         """将时间间隔字符串转换为毫秒数"""
@@ -239,76 +346,146 @@ class History(object):
         }
         return interval_map.get(interval, 60 * 1000)  # 默认1分钟
 
-    def _process_ohlcv_data(self, symbol, interval, ohlcv):
+    def save_candles(self, symbol, timeframe, columns):
         """
-        处理获取到的 K 线数据，插入或更新到数据库
+        将K线数据批量写入数据库并同步到列式存储
         :param symbol: 货币对
-        :param interval: 时间间隔
-        :param ohlcv: K 线数据列表
-        """
-        for candle in ohlcv:
-            candle_data = self.format_candle(candle)
-            # 根据 symbol、open_time 和 interval 查询是否已存在记录
-            from zbot.exchange.binance.models import Candle
-            existing_candle = Candle.select().where(
-                (Candle.symbol == symbol) &
-                (Candle.timeframe == interval) &
-                (Candle.open_time == candle_data['open_time'])
-            ).first()
-            if existing_candle:
-                # 如果存在则更新记录
-                for key, value in candle_data.items():
-                    setattr(existing_candle, key, value)
-                existing_candle.save()
-            else:
-                # 如果不存在则创建新记录
-                Candle.create(
-                    symbol=symbol,
-                    timeframe=interval,
-                    **candle_data
-                )
+        :param timeframe: 时间间隔
+        :param columns: DataFrame或 {列名: 数组} 字典
+        """
+        with self.write_limit or nullcontext():
+            Candle.upsert_many(symbol, timeframe, columns)
+            save_candles_to_store('binance', symbol, timeframe, pd.DataFrame(columns, copy=False))
 
-    def download_from_archive(self, symbol, timeframe, candle_type, start_date, end_date, progress_queue=None):
-        from zbot.exchange.binance.models import Candle
+    def download_from_archive(self, symbol, timeframe, candle_type, start_date, end_date, progress_queue=None,
+                              concurrency=ARCHIVE_CONCURRENCY):
+        """
+        从归档地址下载指定日期范围的K线数据并写入数据库
+        完整的历史月份使用月度归档文件，其余日期使用日度归档文件
+        :param concurrency: 同时下载的文件数
+        :return: 日期列表
+        """
         date_range = get_date_range(start_date, end_date)
-        total = len(date_range)
-        for i, date in enumerate(tqdm(date_range, desc=f"Downloading {symbol} {timeframe} data", total=total)):
-            res = asyncio.run(self.get_daily_klines(
-                symbol, timeframe, candle_type, date))
-            if res is not None and not res.empty:
-                bulk_data = []
-                for _, row in res.iterrows():
-                    candle_data = row.to_dict()
-                    # 根据 symbol、open_time 和 timeframe 查询是否已存在记录
-                    existing_candle = Candle.select().where(
-                        (Candle.symbol == symbol) &
-                        (Candle.timeframe == timeframe) &
-                        (Candle.open_time == candle_data['open_time'])
-                    ).first()
-                    if existing_candle:
-                        # 如果存在则更新记录
-                        for key, value in candle_data.items():
-                            setattr(existing_candle, key, value)
-                        existing_candle.save()
-                    else:
-                        # 如果不存在则创建新记录
-                        bulk_data.append(
-                            Candle(
-                                symbol=symbol,
-                                timeframe=timeframe,
-                                **candle_data
-                            )
-                        )
-
-                if bulk_data:
-                    Candle.bulk_create(bulk_data)
+        files = self.plan_archive_files(date_range)
+        asyncio.run(self.download_archives(
+            symbol, timeframe, candle_type, files, progress_queue, concurrency))
+        return date_range
+
+    @staticmethod
+    def plan_archive_files(dates, today=None):
+        """
+        将日期列表规划为最少的归档文件集合：
+        日期范围完整覆盖且已结束的月份使用一个月度文件，其余日期(包括当前月份)使用日度文件
+        :param dates: 日期字符串列表，格式为 %Y-%m-%d
+        :param today: 当前日期(UTC)，默认为当天
+        :return: [(period, date)] 列表，period为 'monthly' 或 'daily'，月度文件的date格式为 %Y-%m
+        """
+        today = today or datetime.now(timezone.utc).date()
+        current_month = today.strftime('%Y-%m')
+        date_set = set(dates)
+        files = []
+        planned_months = set()
+        for date in dates:
+            month = date[:7]
+            if month in planned_months:
+                continue
+            if month < current_month and all(day in date_set for day in History.get_month_dates(month)):
+                files.append(('monthly', month))
+                planned_months.add(month)
+            else:
+                files.append(('daily', date))
+        return files
+
+    @staticmethod
+    def get_month_dates(month):
+        """
+        获取月份内的全部日期
+        :param month: 月份字符串，格式为 %Y-%m
+        :return: 日期字符串列表
+        """
+        first_day = datetime.strptime(month, '%Y-%m')
+        next_month = (first_day + timedelta(days=32)).replace(day=1)
+        return [(first_day + timedelta(days=i)).strftime('%Y-%m-%d')
+                for i in range((next_month - first_day).days)]
+
+    async def download_archives(self, symbol, timeframe, candle_type, files, progress_queue=None,
+                                concurrency=ARCHIVE_CONCURRENCY, queue_size=ARCHIVE_QUEUE_SIZE, session=None,
+                                semaphore=None):
+        """
+        异步下载管道：共享连接池的会话并发下载多个归档文件，
+        解析后的DataFrame经有界队列交给单个写入任务依次入库
+        :param files: plan_archive_files 规划出的 [(period, date)] 列表
+        :param progress_queue: 进度队列
+        :param concurrency: 同时下载的文件数
+        :param queue_size: 已下载待写入的最大文件数，限制内存占用
+        :param session: 外部传入的aiohttp会话，为None时内部创建并在结束后关闭
+        :param semaphore: 外部传入的下载信号量，多个管道共享时限制总并发数，为None时按concurrency创建
+        """
+        total = len(files)
+        if not total:
             if progress_queue:
-                # progress_queue.put((i + 1, total))  # 发送当前进度和总数
-                progress_queue.put(
-                    {'symbol': symbol, 'date': date, 'progress': (i + 1) / total})
+                progress_queue.put(None)
+            return
+        own_session = session is None
+        if own_session:
+            session = self.create_session(concurrency)
+        semaphore = semaphore or asyncio.Semaphore(concurrency)
+        ready = asyncio.Queue(maxsize=queue_size)
+
+        async def load(period, date):
+            async with semaphore:
+                df = await self.get_archive_klines(symbol, timeframe, candle_type, date, period, session)
+            if df is None and period == 'monthly':
+                # 月度文件尚未发布(例如上月刚结束)，回退为逐日下载
+                frames = await asyncio.gather(
+                    *(load('daily', day) for day in self.get_month_dates(date)))
+                frames = [frame for frame in frames if frame is not None]
+                df = {name: np.concatenate([frame[name] for frame in frames])
+                      for name in frames[0]} if frames else None
+            return df
+
+        async def fetch(period, date):
+            df = None
+            try:
+                df = await load(period, date)
+            except Exception as e:
+                # 单个文件失败不影响其他日期，缺失的数据可在下次同步时补齐
+                print(f"下载 {symbol} {timeframe} {date} 失败: {e}")
+            finally:
+                await ready.put((date, df))
+
+        async def ingest():
+            with tqdm(desc=f"Downloading {symbol} {timeframe} data", total=total) as pbar:
+                for i in range(total):
+                    date, df = await ready.get()
+                    if df is not None and len(df['open_time']):
+                        # 写库在线程中执行，避免阻塞其他下载任务
+                        await asyncio.to_thread(self.save_candles, symbol, timeframe, df)
+                    pbar.update(1)
+                    if progress_queue:
+                        progress_queue.put(
+                            {'symbol': symbol, 'date': date, 'progress': (i + 1) / total})
+
+        fetchers = [asyncio.create_task(fetch(period, date)) for period, date in files]
+        try:
+            await ingest()
+        finally:
+            for task in fetchers:
+                task.cancel()
+            if own_session:
+                await session.close()
         if progress_queue:
             progress_queue.put(None)  # 发送完成信号
-        return date_range
+
+    @staticmethod
+    def create_session(limit=ARCHIVE_CONCURRENCY):
+        """
+        创建下载归档文件用的aiohttp会话，连接池复用TCP/TLS连接
+        :param limit: 连接池最大连接数
+        """
+        connector = aiohttp.TCPConnector(
+            limit=limit, ssl=ssl.create_default_context(cafile=certifi.where()))
+        return aiohttp.ClientSession(connector=connector)
 
     @staticmethod
     def get_url_by_candle_type(candle_type):
@@ -322,61 +499,173 @@ class History(object):
     def get_zip_name(self, symbol, timeframe, date):
         return f"{symbol}-{timeframe}-{date}.zip"
 
-    def get_zip_url(self, symbol, timeframe, candle_type, date):
+    def get_zip_url(self, symbol, timeframe, candle_type, date, period='daily'):
         """
         获取压缩文件下载地址
         https://data.binance.vision/data/spot/daily/klines/BTCUSDT/5m/BTCUSDT-5m-2024-10-27.zip
+        https://data.binance.vision/data/spot/monthly/klines/BTCUSDT/5m/BTCUSDT-5m-2024-10.zip
         https://data.binance.vision/data/futures/um/daily/klines/BTCUSDT/1h/BTCUSDT-1h-2024-10-27.zip
         :param symbol: 货币对
         :param timeframe: 时间间隔
         :param candle_type: 类型
-        :param date: 日期
+        :param date: 日期，月度文件为月份(%Y-%m)
+        :param period: 归档周期，'daily' 或 'monthly'
         :return:
         """
         symbol = symbol.replace('/', '')
         asset_type = self.get_url_by_candle_type(candle_type)
         zip_name = self.get_zip_name(symbol, timeframe, date)
         url = (
-            f"https://data.binance.vision/data/{
-                asset_type}/daily/klines/{symbol}"
+            f"{self.archive_base_url}/{asset_type}/{period}/klines/{symbol}"
             f"/{timeframe}/{zip_name}"
         )
         return url
 
-    # 异步获取指定日期的K线数据
-    async def get_daily_klines(self, symbol, timeframe, candle_type, date):
-        url = self.get_zip_url(symbol, timeframe, candle_type, date)
-        connector = aiohttp.TCPConnector(
-            ssl=ssl.create_default_context(cafile=certifi.where()))
-        async with aiohttp.ClientSession(connector=connector) as session:
-            async with session.get(url) as resp:
+    # 异步获取指定日期的K线数据，session为None时临时创建会话
+    async def get_daily_klines(self, symbol, timeframe, candle_type, date, session=None):
+        return await self.get_archive_klines(symbol, timeframe, candle_type, date, 'daily', session)
+
+    # 异步获取指定月份的K线数据
+    async def get_monthly_klines(self, symbol, timeframe, candle_type, month, session=None):
+        return await self.get_archive_klines(symbol, timeframe, candle_type, month, 'monthly', session)
+
+    async def get_archive_klines(self, symbol, timeframe, candle_type, date, period='daily', session=None):
+        """
+        异步获取一个归档文件中的K线数据
+        :param date: 日期，月度文件为月份(%Y-%m)
+        :param period: 归档周期，'daily' 或 'monthly'
+        :param session: aiohttp会话，为None时临时创建
+        :return: {列名: numpy数组}，文件不存在时返回None
+        """
+        if session is None:
+            async with self.create_session() as session:
+                return await self.get_archive_klines(symbol, timeframe, candle_type, date, period, session)
+        url = self.get_zip_url(symbol, timeframe, candle_type, date, period)
+        source = await self.fetch_archive(url, session)
+        if source is None:
+            return None
+        # 解压和CSV解析为CPU密集操作，放到线程中执行，避免阻塞事件循环上的其他下载
+        return await asyncio.to_thread(self.read_archive, source)
+
+    async def fetch_archive(self, url, session):
+        """
+        获取归档zip文件，优先使用本地缓存；未命中时按块流式写入磁盘，
+        同时计算SHA256，与 .CHECKSUM 文件校验后写入缓存；
+        无法获取 .CHECKSUM 时文件仍用于本次解析，但在缓存中标记为未校验
+        :param url: 归档文件地址
+        :param session: aiohttp会话
+        :return: 缓存文件路径(未启用缓存时为临时文件对象)，文件不存在时返回None
+        """
+        if self.archive_cache is not None:
+            path = self.archive_cache.get(url)
+            if path is not None:
+                return path
+        async with session.get(url) as resp:
+            if resp.status != 200:
+                return None
+            if self.archive_cache is None:
+                # 未启用缓存时写入临时文件，超过阈值才落盘
+                spool = tempfile.SpooledTemporaryFile(max_size=ARCHIVE_SPOOL_SIZE)
+                async for chunk in resp.content.iter_chunked(ARCHIVE_CHUNK_SIZE):
+                    spool.write(chunk)
+                spool.seek(0)
+                return spool
+            temp_path = self.archive_cache.get_temp_path(url)
+            digest = hashlib.sha256()
+            with open(temp_path, 'wb') as f:
+                async for chunk in resp.content.iter_chunked(ARCHIVE_CHUNK_SIZE):
+                    f.write(chunk)
+                    digest.update(chunk)
+        checksum = None
+        try:
+            async with session.get(f'{url}.CHECKSUM') as resp:
                 if resp.status == 200:
-                    content = await resp.read()
-                    # logger.debug(f"Successfully downloaded {url}")
-                    with zipfile.ZipFile(BytesIO(content)) as zipf:
-                        with zipf.open(zipf.namelist()[0]) as csvf:
-                            # https://github.com/binance/binance-public-data/issues/283
-                            first_byte = csvf.read(1)[0]
-                            if chr(first_byte).isdigit():
-                                header = None
-                            else:
-                                header = 0
-                            csvf.seek(0)
-
-                            df = pd.read_csv(
-                                csvf,
-                                usecols=[0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11],
-                                names=self.candle_names,
-                                header=header
-                            )
-                            # df["open_time"] = pd.to_datetime(
-                            #     np.where(df["open_time"] > 1e13, df["open_time"] // 1000, df["open_time"]),
-                            #     unit="ms",
-                            #     utc=True,
-                            # )
-                            return df
-        return None
+                    checksum = (await resp.read()).decode('utf-8', errors='replace')
+        except aiohttp.ClientError as e:
+            print(f"警告: 获取校验文件失败 {url}: {e}")
+        if checksum is None:
+            print(f"警告: {url} 没有官方校验值，本次使用但不视为已校验，下次重新下载")
+        try:
+            return self.archive_cache.commit(url, temp_path, digest.hexdigest(), checksum)
+        except ValueError as e:
+            print(f"警告: {e}")
+            return None
+
+    def read_archive(self, source):
+        """
+        流式解析归档zip文件中的K线数据
 
+        CSV成员按块解压，由pyarrow按固定类型(时间int64、价格float64)直接解析为列数组，
+        不经过pandas类型推断，也不产生逐行的Python对象
+        :param source: zip文件路径或文件对象
+        :return: {列名: numpy数组}，open_time/close_time 统一为微秒
+        """
+        with zipfile.ZipFile(source) as zipf:
+            with zipf.open(zipf.namelist()[0]) as csvf:
+                # https://github.com/binance/binance-public-data/issues/283
+                header = not csvf.peek(1)[:1].isdigit()
+                reader = pa_csv.open_csv(
+                    csvf,
+                    read_options=pa_csv.ReadOptions(
+                        column_names=self.candle_names, skip_rows=int(header), block_size=ARCHIVE_CHUNK_SIZE),
+                    convert_options=pa_csv.ConvertOptions(
+                        column_types={name: pa.from_numpy_dtype(np.dtype(CANDLE_DTYPES[name]))
+                                      for name in self.candle_names})
+                )
+                table = reader.read_all()
+        columns = {name: table.column(name).to_numpy() for name in self.candle_names}
+        return normalize_time_units(columns)
+
+
+class SyncProgress(object):
+    """
+    合并一次增量同步中归档下载和REST补齐的进度
+
+    实现 put 方法以替代 download_archives 使用的进度队列，每个归档文件和REST区间各计一步，
+    download_archives 结束时的完成信号被忽略，由 finish 在全部完成后发送
+    """
+
+    def __init__(self, queue, symbol, total):
+        """
+        :param queue: 进度队列
+        :param total: 归档文件数与REST区间数之和
+        """
+        self.queue = queue
+        self.symbol = symbol
+        self.total = total
+        self.done = 0
+
+    def put(self, message):
+        if message is not None:
+            self.step(message['date'])
+
+    def step(self, date):
+        """完成一步，date为该步对应的日期"""
+        self.done += 1
+        self.queue.put({'symbol': self.symbol, 'date': date, 'progress': self.done / self.total})
+
+    def finish(self):
+        """发送完成信号"""
+        self.queue.put(None)
+
+
+def normalize_time_units(columns):
+    """
+    将毫秒时间戳统一转换为微秒
+
+    币安现货归档自2025年起改用微秒时间戳，REST接口仍为毫秒，入库前统一为微秒
+    :param columns: DataFrame或 {列名: 数组} 字典，需包含 open_time，可包含 close_time
+    :return: 转换后的columns
+    """
+    open_time = np.asarray(columns['open_time'], dtype=np.int64)
+    is_ms = open_time < 10 ** 14
+    if is_ms.any():
+        columns['open_time'] = np.where(is_ms, open_time * 1000, open_time)
+        if 'close_time' in columns:
+            close_time = np.asarray(columns['close_time'], dtype=np.int64)
+            # 毫秒收盘时间以999结尾，转换后补齐为999999
+            columns['close_time'] = np.where(is_ms, close_time * 1000 + 999, close_time)
+    return columns
 
 def monitor_progress(queue, total):
     """监控进度的独立进程"""
@@ -413,7 +702,7 @@ if __name__ == '__main__':
     })
     h = History(exchange)
     # h.download_data('BTC/USDT', '15m')
-    h.download_data('BTCUSDT', '15m', '')
+    h.download_data('BTCUSDT', '15m')
     # h.download_from_archive('BTCUSDT', '15m', 'futures', '2024-10-27')
     # res = h.get_zip_url('BTCUSDT', '15m', 'spot', '2024-10-27')
     # print(res)
@@ -21,8 +21,3 @@ class Candle(CandleBase):
         table_name = "binance_candle"
         database = database.db
         indexes = ((("symbol", "timeframe", "open_time"), True),)
-
-
-database.open_connection()
-database.db.create_tables([Candle])
-database.db.close()
@@ -1,7 +1,9 @@
 
 import importlib
+import threading
+from typing import Dict
 
-from zbot.common.config import read_config
+from zbot.common.config import get_exchange_config
 from . import Exchange
 
 
@@ -32,23 +34,52 @@ from . import Exchange
 
 
 class ExchangeFactory:
+    # 进程内共享的交易所实例，键为交易所名称和连接参数
+    _instances: Dict[tuple, Exchange] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def create_exchange(cls, exchange_name, config: dict = {}, shared: bool = True) -> Exchange:
+        """
+        创建交易所实例
+
+        :param exchange_name: 交易所名称
+        :param config: 交易所配置，覆盖配置文件中的同名项
+        :param shared: 是否复用进程内相同参数的实例，复用的实例已加载市场信息，创建几乎没有开销
+        :return: 交易所实例
+        """
+        exchange_config = get_exchange_config(exchange_name, overrides=config)
+        kwargs = dict(
+            exchange_name=exchange_name,
+            api_key=exchange_config.api_key,
+            secret_key=exchange_config.secret_key,
+            trading_mode=exchange_config.trading_mode,
+            proxy_url=exchange_config.proxy_url,
+            testnet=exchange_config.testnet
+        )
+        if not shared:
+            return cls._new_exchange(**kwargs)
+        key = tuple(kwargs.values())
+        with cls._lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls._new_exchange(**kwargs)
+            return cls._instances[key]
+
+    @classmethod
+    def clear(cls):
+        """清空共享实例，例如修改交易所配置之后"""
+        with cls._lock:
+            cls._instances.clear()
+
     @staticmethod
-    def create_exchange(exchange_name, config: dict = {}) -> Exchange:
-        config = config or read_config('exchange').get(exchange_name)
+    def _new_exchange(exchange_name, **kwargs) -> Exchange:
         module_name = f"zbot.exchange.{exchange_name.lower()}"
         class_name = f"{exchange_name.capitalize()}Exchange"
         try:
             module = importlib.import_module(module_name)
             exchange_class = getattr(module, class_name)
-            return exchange_class(
-                exchange_name=exchange_name,
-                api_key=config.get('api_key'),
-                secret_key=config.get('secret_key'),
-                trading_mode=config.get('trading_mode'),
-                proxy_url=config.get('proxy_url'),
-                testnet=config.get('testnet', False)
-            )
         except ImportError:
             raise ValueError(f"Exchange {exchange_name} is not supported {module_name}")
         except AttributeError:
             raise ValueError(f"Class {class_name} not found in {module_name}")
+        return exchange_class(exchange_name=exchange_name, **kwargs)
@@ -0,0 +1,138 @@
+# coding=utf-8
+"""
+交易所市场信息缓存
+
+ccxt 的 load_markets 需要请求多个接口，耗时数秒。每个交易所的市场信息单独保存在
+zbot/data/exchange_cache_<缓存名>.json 中，缓存名为交易所名称，测试网络加 _testnet 后缀，
+测试网络与正式网络的缓存互不覆盖。进程内只读取一次文件；缓存过期后先使用旧数据，
+同时在后台线程重新获取并写回文件。
+
+文件格式(兼容Web UI原有的 symbols/update_time 字段):
+    {
+        "exchange": "binance",
+        "symbols": ["BTC/USDT", ...],
+        "update_time": "2025-01-01T00:00:00",
+        "markets": {...},
+        "currencies": {...}
+    }
+"""
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from zbot.common.config import base_path
+
+
+# 缓存有效期
+MARKETS_CACHE_TTL = timedelta(days=1)
+
+
+class MarketsCache(object):
+    """交易所市场信息的文件缓存"""
+
+    def __init__(self, root: Optional[str] = None, ttl: timedelta = MARKETS_CACHE_TTL):
+        """
+        :param root: 缓存文件目录，默认为 zbot/data
+        :param ttl: 缓存有效期，过期后在后台刷新
+        """
+        self.root = root or os.path.join(base_path, 'data')
+        self.ttl = ttl
+        # {缓存名: (文件修改时间, 缓存内容)}
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._refreshing = set()
+
+    def get_path(self, exchange_name: str) -> str:
+        """
+        获取缓存文件路径
+        :param exchange_name: 缓存名，交易所名称，测试网络为 <交易所>_testnet
+        """
+        return os.path.join(self.root, f'exchange_cache_{exchange_name}.json')
+
+    def load(self, exchange_name: str) -> Optional[dict]:
+        """
+        读取缓存内容，文件未变化时直接使用内存中的数据
+        :return: 缓存内容，文件不存在、损坏或不属于该交易所时返回None
+        """
+        path = self.get_path(exchange_name)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        with self._lock:
+            cached_mtime, entry = self._entries.get(exchange_name, (None, None))
+            if mtime != cached_mtime:
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        entry = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"读取交易所缓存失败: {e}")
+                    entry = None
+                self._entries[exchange_name] = (mtime, entry)
+        # 旧版本缓存只有交易对列表，没有市场信息
+        if not entry or entry.get('exchange') != exchange_name or not entry.get('markets'):
+            return None
+        return entry
+
+    def is_expired(self, entry: dict) -> bool:
+        """判断缓存是否已过期"""
+        try:
+            update_time = datetime.fromisoformat(entry['update_time'])
+        except (KeyError, TypeError, ValueError):
+            return True
+        return datetime.now() - update_time >= self.ttl
+
+    def save(self, exchange_name: str, markets: dict, currencies: Optional[dict] = None,
+             symbols: Optional[list] = None):
+        """写入缓存，先写临时文件再原子替换"""
+        entry = {
+            'exchange': exchange_name,
+            'symbols': symbols if symbols is not None else list(markets),
+            'update_time': datetime.now().isoformat(),
+            'markets': markets,
+            'currencies': currencies or {},
+        }
+        path = self.get_path(exchange_name)
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._entries[exchange_name] = (os.path.getmtime(path), entry)
+
+    def refresh_in_background(self, exchange_name: str, refresh: Callable[[], None]):
+        """
+        在后台线程中刷新缓存，同一交易所同时只有一个刷新任务
+        :param refresh: 重新获取市场信息并调用 save 的函数
+        """
+        with self._lock:
+            if exchange_name in self._refreshing:
+                return
+            self._refreshing.add(exchange_name)
+
+        def run():
+            try:
+                refresh()
+            except Exception as e:
+                print(f"后台刷新交易所市场信息失败: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(exchange_name)
+
+        threading.Thread(target=run, name=f'{exchange_name}-markets-refresh', daemon=True).start()
+
+
+def get_cache_name(exchange_name: str = '') -> str:
+    """
+    按配置文件获取交易所的市场信息缓存名，与 BinanceExchange.markets_cache_name 一致
+    :param exchange_name: 交易所名称，为空时使用 exchange.name 指定的交易所
+    """
+    from zbot.common.config import get_exchange_config
+    config = get_exchange_config(exchange_name)
+    return f'{config.name}_testnet' if config.testnet else config.name
+
+
+markets_cache = MarketsCache()
@@ -0,0 +1,14 @@
+import datetime
+
+import peewee
+from zbot.services.db import database
+
+
+class AppliedMigration(peewee.Model):
+    """已应用的数据库迁移，与业务表保存在同一个数据库中"""
+    name = peewee.CharField(max_length=255, primary_key=True, help_text="迁移文件名")
+    applied_at = peewee.DateTimeField(default=datetime.datetime.now, help_text="应用时间")
+
+    class Meta:
+        database = database.db
+        table_name = 'applied_migrations'
@@ -1,10 +1,23 @@
 import json
 from datetime import datetime
 import peewee
-from datetime import datetime
+from peewee import fn
 from zbot.services.db import database
 
 
+# 列表页面需要的摘要字段，不读取回测结果等大文本字段
+SUMMARY_FIELDS = ('id', 'strategy_name', 'start_time', 'end_time', 'file_name', 'status',
+                  'total_return', 'max_drawdown', 'created_at')
+# 允许排序的字段及为空时的排序值，排序值不为空才能用作分页游标
+SORT_FIELDS = {
+    'created_at': None,
+    'id': None,
+    'total_return': float('-inf'),
+    'max_drawdown': float('-inf'),
+    'strategy_name': '',
+}
+
+
 class BacktestRecord(peewee.Model):
     """回测记录模型，用于存储策略回测的历史记录"""
     id = peewee.AutoField(primary_key=True)
@@ -17,6 +30,8 @@ class BacktestRecord(peewee.Model):
     results = peewee.TextField(help_text="回测结果数据，JSON格式字符串", null=True)
     trades = peewee.TextField(help_text="回测交易记录，JSON格式字符串", null=True)
     result_file_path = peewee.CharField(max_length=255, help_text="回测结果文件路径", null=True)
+    artifact_path = peewee.CharField(
+        max_length=255, help_text="回测结果目录，保存策略K线、交易记录等Parquet文件", null=True)
     status = peewee.CharField(
         max_length=20, default="completed", help_text="回测状态: running/completed/failed", null=True)
     total_return = peewee.FloatField(help_text="总收益率", null=True)
@@ -43,6 +58,76 @@ class BacktestRecord(peewee.Model):
         """
         return cls.select().order_by(cls.created_at.desc()).limit(limit)
 
+    @classmethod
+    def delete_record(cls, record_id):
+        """删除回测记录及其结果目录"""
+        from zbot.services.backtest_artifacts import backtest_artifacts
+        record = cls.select(cls.id, cls.artifact_path).where(cls.id == record_id).first()
+        if record is None:
+            return 0
+        backtest_artifacts.delete(record.artifact_path)
+        return cls.delete().where(cls.id == record_id).execute()
+
+    @classmethod
+    def list_summaries(cls, limit: int = 20, cursor: str = None, sort: str = 'created_at',
+                       descending: bool = True, strategy_name: str = None, status: str = None,
+                       created_from: datetime = None, created_to: datetime = None):
+        """分页查询回测记录摘要
+
+        只查询 SUMMARY_FIELDS 中的字段并直接返回字典，不创建模型对象、不解析JSON；
+        使用游标(键集)分页，按 (排序字段, id) 定位上一页的最后一条记录，翻页耗时与页码无关
+        Args:
+            limit: 每页记录数
+            cursor: 上一页返回的游标，为空时查询第一页
+            sort: 排序字段，SORT_FIELDS 之一
+            descending: 是否降序
+            strategy_name: 按策略名称模糊过滤
+            status: 按回测状态过滤
+            created_from: 创建时间下限(含)
+            created_to: 创建时间上限(不含)
+        Returns:
+            (记录字典列表, 下一页游标)，没有下一页时游标为None
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"不支持的排序字段: {sort}")
+        field = getattr(cls, sort)
+        key = field if SORT_FIELDS[sort] is None else fn.IFNULL(field, SORT_FIELDS[sort])
+
+        query = cls.select(*[getattr(cls, name) for name in SUMMARY_FIELDS])
+        if strategy_name:
+            query = query.where(cls.strategy_name.contains(strategy_name))
+        if status:
+            query = query.where(cls.status == status)
+        if created_from is not None:
+            query = query.where(cls.created_at >= created_from)
+        if created_to is not None:
+            query = query.where(cls.created_at < created_to)
+        if cursor:
+            value, last_id = json.loads(cursor)
+            if sort == 'created_at':
+                value = datetime.fromisoformat(value)
+            if sort == 'id':
+                query = query.where(cls.id < last_id if descending else cls.id > last_id)
+            elif descending:
+                query = query.where((key < value) | ((key == value) & (cls.id < last_id)))
+            else:
+                query = query.where((key > value) | ((key == value) & (cls.id > last_id)))
+        order = [key.desc(), cls.id.desc()] if descending else [key.asc(), cls.id.asc()]
+        # 多取一条用于判断是否还有下一页
+        rows = list(query.order_by(*order).limit(limit + 1).dicts())
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            value = last[sort]
+            if value is None:
+                value = SORT_FIELDS[sort]
+            elif isinstance(value, datetime):
+                value = value.isoformat()
+            next_cursor = json.dumps([value, last['id']])
+        return rows, next_cursor
+
     def to_dict(self):
         """
         将BacktestRecord对象转换为字典
@@ -76,6 +161,7 @@ class BacktestRecord(peewee.Model):
             result['results'] = self.results
 
         result['result_file_path'] = self.result_file_path
+        result['artifact_path'] = self.artifact_path
 
         return result
 
@@ -87,8 +173,3 @@ class BacktestRecord(peewee.Model):
         )
         table_name = 'backtest_records'
         database = database.db
-
-
-database.open_connection()
-database.db.create_tables([BacktestRecord])
-database.db.close()
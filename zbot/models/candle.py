@@ -1,4 +1,11 @@
+import sqlite3
 import peewee
+from peewee import EXCLUDED, Select, chunked, fn
+from zbot.services.db import connection_scope
+
+
+# SQLite单条语句的绑定变量上限，3.32.0之前为999
+SQLITE_MAX_VARIABLES = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
 
 
 class Candle(peewee.Model):
@@ -17,6 +24,83 @@ class Candle(peewee.Model):
         formatted_symbol = symbol.replace('/', '')
         return formatted_symbol
 
+    @classmethod
+    def upsert_many(cls, symbol: str, timeframe: str, data) -> int:
+        """
+        批量写入K线数据，已存在的K线(symbol, timeframe, open_time相同)直接覆盖
+
+        在一个事务内按SQLite绑定变量上限分块执行 INSERT ... ON CONFLICT DO UPDATE，
+        依赖 (symbol, timeframe, open_time) 唯一索引
+        :param symbol: 交易对
+        :param timeframe: 时间周期
+        :param data: 按列组织的K线数据，DataFrame或 {列名: 数组} 字典，不在模型中的列会被忽略
+        :return: 写入的行数
+        """
+        names = [name for name in data.keys() if name in cls._meta.fields
+                 and name not in ('id', 'symbol', 'timeframe')]
+        if not names or len(data[names[0]]) == 0:
+            return 0
+        columns = [data[name].tolist() if hasattr(data[name], 'tolist') else list(data[name])
+                   for name in names]
+        count = len(columns[0])
+        columns += [[symbol] * count, [timeframe] * count]
+        fields = [cls._meta.fields[name] for name in names] + [cls.symbol, cls.timeframe]
+        update = {cls._meta.fields[name]: getattr(EXCLUDED, cls._meta.fields[name].column_name)
+                  for name in names if name != 'open_time'}
+
+        # 整批数据在一个事务内写入，只提交一次
+        db = cls._meta.database
+        with connection_scope(db), db.atomic():
+            for batch in chunked(zip(*columns), SQLITE_MAX_VARIABLES // len(fields)):
+                query = cls.insert_many(batch, fields=fields)
+                if update:
+                    query = query.on_conflict(
+                        conflict_target=[cls.symbol, cls.timeframe, cls.open_time],
+                        update=update)
+                else:
+                    query = query.on_conflict_ignore()
+                query.execute()
+        return count
+
+    @classmethod
+    def get_coverage(cls, symbol: str, timeframe: str, step: int, start: int = None, end: int = None) -> list:
+        """
+        查询已存储K线的覆盖区间，不加载具体时间戳
+
+        通过窗口函数LAG在数据库中找出相邻K线间隔超过一个周期的断点，
+        只返回连续区间的首尾时间戳，查询走 (symbol, timeframe, open_time) 索引
+        :param step: 一个K线周期的时长，与 open_time 单位一致
+        :param start: 查询范围开始时间戳(含)，为None时不限制
+        :param end: 查询范围结束时间戳(含)，为None时不限制
+        :return: [(区间首根K线open_time, 区间末根K线open_time)] 升序列表
+        """
+        condition = (cls.symbol == symbol) & (cls.timeframe == timeframe)
+        if start is not None:
+            condition &= cls.open_time >= start
+        if end is not None:
+            condition &= cls.open_time <= end
+        with connection_scope(cls._meta.database):
+            first, last = cls.select(fn.MIN(cls.open_time), fn.MAX(cls.open_time)).where(condition).scalar(as_tuple=True)
+            if first is None:
+                return []
+
+            # 月线等周期长度不固定，断点判断留出半个周期的容差
+            subquery = cls.select(
+                cls.open_time,
+                fn.LAG(cls.open_time).over(order_by=[cls.open_time]).alias('prev_time')
+            ).where(condition)
+            gaps = Select([subquery], [subquery.c.prev_time, subquery.c.open_time]).where(
+                subquery.c.open_time - subquery.c.prev_time > step + step // 2
+            ).order_by(subquery.c.open_time).bind(cls._meta.database).tuples()
+
+            intervals = []
+            interval_start = first
+            for prev_time, open_time in gaps:
+                intervals.append((interval_start, prev_time))
+                interval_start = open_time
+            intervals.append((interval_start, last))
+            return intervals
+
     class Meta:
         indexes = (
             (('symbol', 'timeframe', 'open_time'), True),
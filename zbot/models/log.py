@@ -28,7 +28,3 @@ class Log(peewee.Model):
         indexes = (
             (('task_id', 'type', 'timestamp'), False),
         )
-
-database.open_connection()
-database.db.create_tables([Log])
-database.db.close()
\ No newline at end of file
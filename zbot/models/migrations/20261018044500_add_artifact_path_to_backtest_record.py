@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+迁移文件: add_artifact_path_to_backtest_record
+生成时间: 2026-10-18 04:45:00
+"""
+import peewee
+from playhouse.migrate import migrate
+from zbot.services.db import database
+from playhouse.migrate import SqliteMigrator
+
+def up():
+    """应用迁移"""
+    db = database.db
+    migrator = SqliteMigrator(db)
+
+    # 新建的数据库由模型直接建表，已包含该字段
+    columns = [column.name for column in db.get_columns('backtest_records')]
+    if 'artifact_path' not in columns:
+        migrate(migrator.add_column('backtest_records', 'artifact_path', peewee.CharField(
+            max_length=255, help_text="回测结果目录，保存策略K线、交易记录等Parquet文件", null=True)))
+
+def down():
+    """回滚迁移"""
+    db = database.db
+    migrator = SqliteMigrator(db)
+
+    columns = [column.name for column in db.get_columns('backtest_records')]
+    if 'artifact_path' in columns:
+        migrate(migrator.drop_column('backtest_records', 'artifact_path'))
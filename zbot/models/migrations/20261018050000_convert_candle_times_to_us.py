@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+迁移文件: convert_candle_times_to_us
+生成时间: 2026-10-18 05:00:00
+
+K线时间戳统一为微秒后，将此前以毫秒保存的 open_time/close_time 转换为微秒，
+包括数据库中的K线表和列式存储中的Parquet分区。只转换 open_time 小于 1e14 的行，
+重复执行不会再次转换。同时删除列式存储的同步标记，下次读取时从数据库重新导出
+"""
+import os
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from playhouse.migrate import SqliteMigrator
+from zbot.services.db import database
+
+# 小于该值的时间戳为毫秒(1e14微秒约为1973年，1e14毫秒约为5138年)
+US_THRESHOLD = 10 ** 14
+CANDLE_TABLES = ['binance_candle']
+
+
+def convert_table(db, table):
+    """将K线表中的毫秒时间戳转换为微秒"""
+    if table not in db.get_tables():
+        return
+    with db.atomic():
+        # 同一根K线已有微秒数据时删除毫秒的重复行，避免违反 (symbol, timeframe, open_time) 唯一索引
+        db.execute_sql(
+            f'DELETE FROM {table} WHERE open_time < ? AND EXISTS ('
+            f'SELECT 1 FROM {table} AS us WHERE us.symbol = {table}.symbol '
+            f'AND us.timeframe = {table}.timeframe AND us.open_time = {table}.open_time * 1000)',
+            (US_THRESHOLD,))
+        # 毫秒收盘时间以999结尾，转换后补齐为999999，与 normalize_time_units 一致
+        db.execute_sql(
+            f'UPDATE {table} SET open_time = open_time * 1000, close_time = close_time * 1000 + 999 '
+            f'WHERE open_time < ?', (US_THRESHOLD,))
+
+
+def convert_parquet(path):
+    """将单个Parquet文件中的毫秒时间戳转换为微秒，按 open_time 去重排序后原子替换"""
+    df = pq.read_table(path).to_pandas()
+    open_time = df['open_time'].to_numpy(dtype=np.int64)
+    is_ms = open_time < US_THRESHOLD
+    if not is_ms.any():
+        return
+    df['open_time'] = np.where(is_ms, open_time * 1000, open_time)
+    if 'close_time' in df.columns:
+        close_time = df['close_time'].to_numpy(dtype=np.int64)
+        df['close_time'] = np.where(is_ms, close_time * 1000 + 999, close_time)
+    df = df.drop_duplicates(subset=['open_time'], keep='last').sort_values('open_time')
+    tmp_path = f'{path}.tmp'
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_path, compression='zstd')
+    os.replace(tmp_path, path)
+
+
+def up():
+    """应用迁移"""
+    db = database.db
+    migrator = SqliteMigrator(db)
+
+    for table in CANDLE_TABLES:
+        convert_table(db, table)
+
+    from zbot.services.candle_store import SYNC_MARKER, candle_store
+    for root, _, files in os.walk(candle_store.root):
+        for f in files:
+            if f.endswith('.parquet'):
+                convert_parquet(os.path.join(root, f))
+            elif f == SYNC_MARKER:
+                os.remove(os.path.join(root, f))
+
+def down():
+    """回滚迁移"""
+    db = database.db
+    migrator = SqliteMigrator(db)
+
+    # 转换后无法区分原有的微秒数据，不做回滚
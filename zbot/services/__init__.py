@@ -1,6 +1,17 @@
 # 实盘交易模块初始化
-from .engine import Engine
-from .events import PubSub
-from .strategy import AsyncBaseStrategy
+# 按需导入，避免导入 zbot.services 下的任意子模块(如db、main)时加载整个实盘交易栈
+from importlib import import_module
 
-__all__ = ['Engine', 'PubSub', 'AsyncBaseStrategy']
\ No newline at end of file
+_LAZY_IMPORTS = {
+    'Engine': '.engine',
+    'PubSub': '.events',
+    'AsyncBaseStrategy': '.strategy',
+}
+
+__all__ = ['Engine', 'PubSub', 'AsyncBaseStrategy']
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        return getattr(import_module(_LAZY_IMPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
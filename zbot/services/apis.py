@@ -12,9 +12,14 @@ import threading
 from multiprocessing import Manager, Queue
 from zbot.utils.dateutils import str_to_timestamp
 from zbot.exchange.exchange import ExchangeFactory
+from zbot.exchange.binance.batch import BatchDownloader, resolve_symbols
+from zbot.exchange.markets_cache import get_cache_name
 from zbot.services.backtest import Backtest
+from zbot.models.backtest import BacktestRecord
 from zbot.models.log import Log, LogType
+from zbot.services.db import database
 import time
+from datetime import datetime
 
 app = Flask(__name__)
 
@@ -23,10 +28,18 @@ app.config['SECRET_KEY'] = 'zbot-secret-key'
 CORS(app, resources={"/*": {"origins": "*"}})
 socketio = SocketIO(app, cors_allowed_origins="*")
 
+
+@app.teardown_request
+def close_database(exc):
+    # 请求结束后将当前线程的数据库连接归还连接池
+    database.closed()
+
 # 创建命名空间
 # 定义请求模型
 # 存储下载任务进度，键为任务ID，值为进度(0-1)或-1表示错误
 download_tasks: Dict[str, float] = {}
+# 批量下载任务的子任务状态，键为任务ID，值为各 交易对/时间周期 的状态列表
+batch_jobs: Dict[str, List[dict]] = {}
 task_lock = threading.Lock()  # 线程锁确保进度更新安全
 
 class ConnectionManager:
@@ -150,22 +163,23 @@ def download_task(request: dict, task_id: str):
 
         # 循环检查任务状态并处理进度日志
         while download_thread.is_alive():
-            # 从进度队列获取更新信息
-            while not queue.empty():
-                progress_msg = queue.get()
-                # 查找或创建日志记录并更新
-                log_entry, created = Log.get_or_create(
-                    task_id=task_id,
-                    defaults={
-                        'type': LogType.DATA,
-                        'message': progress_msg,
-                        'status': 'processing'
-                    }
-                )
-                if not created:
-                    log_entry.message = progress_msg
-                    log_entry.status = 'processing'
-                    log_entry.save()
+            # 从进度队列获取更新信息，同一批更新在一个事务内写入
+            with database.transaction():
+                while not queue.empty():
+                    progress_msg = queue.get()
+                    # 查找或创建日志记录并更新
+                    log_entry, created = Log.get_or_create(
+                        task_id=task_id,
+                        defaults={
+                            'type': LogType.DATA,
+                            'message': progress_msg,
+                            'status': 'processing'
+                        }
+                    )
+                    if not created:
+                        log_entry.message = progress_msg
+                        log_entry.status = 'processing'
+                        log_entry.save()
             time.sleep(1)  # 短暂等待后再次检查
 
         # 更新进度：下载完成(100%)
@@ -192,6 +206,92 @@ def download_task(request: dict, task_id: str):
             }, room=socket_id)
         print(f"Download task {task_id} failed: {str(e)}")
 
+@app.route('/download-history-data-batch', methods=['POST'])
+def download_history_data_batch():
+    """批量下载多个交易对、多个时间周期的历史数据，交易对可通过 symbols 列表或 pattern 通配符指定"""
+    data = request.get_json()
+    if not data:
+        return jsonify({"error": "Invalid request data"}), 400
+
+    required_fields = ["exchange", "intervals", "start_date", "end_date"]
+    for field in required_fields:
+        if field not in data:
+            return jsonify({"error": f"Missing required field: {field}"}), 400
+    # 字符串也可迭代，不检查类型时 "1m,5m" 会被逐个字符当作时间周期
+    for field in ("symbols", "intervals"):
+        if data.get(field) is not None and not isinstance(data[field], list):
+            return jsonify({"error": f"Field {field} must be a list"}), 400
+    if data.get("pattern") is not None and not isinstance(data["pattern"], str):
+        return jsonify({"error": "Field pattern must be a string"}), 400
+    intervals = [i for i in data["intervals"] if i]
+    if not intervals:
+        return jsonify({"error": "No intervals specified"}), 400
+
+    try:
+        symbols = resolve_symbols(data.get("symbols"), data.get("pattern"), get_cache_name(data["exchange"]))
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 400
+    if not symbols:
+        return jsonify({"error": "No symbols matched"}), 400
+
+    task_id = str(uuid.uuid4().hex)
+    with task_lock:
+        download_tasks[task_id] = 0.0
+        batch_jobs[task_id] = []
+
+    download_request = {
+        "exchange": data["exchange"],
+        "symbols": symbols,
+        "intervals": intervals,
+        "start_date": data["start_date"],
+        "end_date": data["end_date"],
+        "candle_type": data.get("candle_type", "spot"),
+        "workers": data.get("workers", 4),
+        "network_concurrency": data.get("network_concurrency", 8),
+        "write_concurrency": data.get("write_concurrency", 1),
+    }
+
+    thread = threading.Thread(target=download_batch_task, args=(download_request, task_id))
+    thread.daemon = True
+    thread.start()
+
+    return jsonify({
+        "task_id": task_id,
+        "status": "started",
+        "jobs": len(symbols) * len(intervals),
+        "message": "Batch download task has been started in background"
+    })
+
+def download_batch_task(request: dict, task_id: str):
+    """后台执行批量下载任务，更新汇总进度和各子任务状态"""
+    def on_progress(job, summary):
+        with task_lock:
+            download_tasks[task_id] = min(summary['progress'], 0.99)
+            batch_jobs[task_id] = [j.to_dict() for j in downloader.jobs]
+        socket_id = manager.get_socket_id(task_id)
+        if socket_id:
+            socketio.emit('progress', {
+                "task_id": task_id,
+                "progress": summary['progress'],
+                "summary": summary,
+                "job": job.to_dict(),
+                "status": "progress"
+            }, room=socket_id)
+
+    try:
+        exchange = ExchangeFactory.create_exchange(request["exchange"])
+        downloader = BatchDownloader(exchange, request["workers"], request["network_concurrency"],
+                                     request["write_concurrency"], on_progress)
+        jobs = downloader.run(request["symbols"], request["intervals"], request["start_date"],
+                              request["end_date"], request["candle_type"])
+        with task_lock:
+            download_tasks[task_id] = 1.0
+            batch_jobs[task_id] = [job.to_dict() for job in jobs]
+    except Exception as e:
+        with task_lock:
+            download_tasks[task_id] = -1.0
+        print(f"Batch download task {task_id} failed: {str(e)}")
+
 @app.route('/task-status/<task_id>', methods=['GET'])
 def get_task_status(task_id):
     if task_id not in download_tasks:
@@ -199,11 +299,15 @@ def get_task_status(task_id):
 
     progress = download_tasks[task_id]
     status = "completed" if progress == 1.0 else "error" if progress == -1 else "in_progress"
-    return jsonify({
+    result = {
         "task_id": task_id,
         "progress": progress,
         "status": status
-    })
+    }
+    if task_id in batch_jobs:
+        with task_lock:
+            result["jobs"] = list(batch_jobs[task_id])
+    return jsonify(result)
 
 @socketio.on('connect')
 def handle_connect():
@@ -265,5 +369,32 @@ def run_backtest():
     return jsonify({"task_id": "xxxx"})
 
 
+@app.route('/backtest-records', methods=['GET'])
+def list_backtest_records():
+    """
+    分页查询回测记录摘要
+
+    查询参数: limit(每页数量，最大200)、cursor(上一页返回的next_cursor)、
+    sort(created_at/total_return/max_drawdown/strategy_name/id)、order(asc/desc)、strategy_name、status
+    """
+    args = request.args
+    try:
+        records, next_cursor = BacktestRecord.list_summaries(
+            limit=min(int(args.get('limit', 20)), 200),
+            cursor=args.get('cursor') or None,
+            sort=args.get('sort', 'created_at'),
+            descending=args.get('order', 'desc') != 'asc',
+            strategy_name=args.get('strategy_name') or None,
+            status=args.get('status') or None,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    for record in records:
+        for key, value in record.items():
+            if isinstance(value, datetime):
+                record[key] = value.isoformat()
+    return jsonify({"records": records, "next_cursor": next_cursor})
+
+
 if __name__ == '__main__':
     socketio.run(app, host='0.0.0.0', port=8000, debug=True)
\ No newline at end of file
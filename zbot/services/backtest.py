@@ -4,12 +4,14 @@ import os
 import re
 import importlib
 # from backtesting import Backtest as BacktestBase
+import numpy as np
 import pandas as pd
 from backtesting.lib import crossover, FractionalBacktest as BacktestBase
 from zbot.services.model import get_candles_from_db
-from zbot.utils.dateutils import timestamp_to_datetime, format_datetime
+from zbot.utils.dateutils import timestamps_to_datetime_index, format_datetime
 from zbot.common.config import read_config
 from zbot.models.backtest import BacktestRecord
+from zbot.services.backtest_artifacts import backtest_artifacts
 import json
 import logging
 from datetime import datetime
@@ -96,7 +98,7 @@ class Backtest(object):
             if key in ['_strategy', '_equity_curve', '_trade_list', '_trades']:
                 continue
             # 如果键在翻译字典中存在，则使用中文键，否则保留原键
-            translated_value = self.translations.get(key, key)
+            translated_value = dict(self.translations.get(key, {'cn': key, 'en': key}))
             if isinstance(value, datetime):
                 value = value.strftime('%Y-%m-%d %H:%M:%S')
             elif isinstance(value, pd.Timedelta):
@@ -105,42 +107,19 @@ class Backtest(object):
             translated_result.append(translated_value)
         return translated_result
 
-    def run(self):
+    def load_candles(self) -> pd.DataFrame:
+        """读取回测K线，索引为开盘时间，列名为Backtesting.py要求的 Open/High/Low/Close/Volume"""
         candles = get_candles_from_db(
             self.exchange, self.symbol, self.interval, self.start, self.end)
-        del candles['id']
-        # 将open_time时间戳转换为时间字符串
-        candles['open_time'] = candles['open_time'].apply(
-            lambda x: timestamp_to_datetime(x))
+        # 将open_time时间戳整列转换为时间索引
+        candles.index = timestamps_to_datetime_index(candles.pop('open_time').to_numpy(), name='open_time')
         candles.rename(columns={'open': 'Open', 'close': 'Close',
                        'high': 'High', 'low': 'Low', 'volume': 'Volume'}, inplace=True)
-        candles.set_index('open_time', drop=True, inplace=True)
-        # 动态加载策略类
-        strategy_class = load_strategy_class(self.strategy)
-        self.bt = CustomBacktest(candles, strategy_class, cash=self.cash,
-                                 commission=self.commission, exclusive_orders=True)
-        self.stats = self.bt.run()
-        # 获取交易记录
-        trades = self.stats['_trades'].to_dict(orient='records')
-        for trade in trades:
-            for _k, _v in trade.items():
-                if isinstance(_v, datetime):
-                    trade[_k] = _v.strftime('%Y-%m-%d %H:%M:%S')
-                elif isinstance(_v, pd.Timedelta):
-                    trade[_k] = timedelta_to_localized_string(_v)
-            if trade.get('Size', 0) > 0:
-                trade['Direction'] = '多单'
-            else:
-                trade['Direction'] = '空单'
-        # 获取策略数据
-        strategy_data = self.stats['_strategy'].data.df.to_dict(orient='records')
-
-        # 收集回测记录数据并保存
-        strategy_classes = get_strategy_class_names()
-        file_name = next(
-            (item['filename'] for item in strategy_classes if item['name'] == self.strategy), 'unknown.py')
+        return candles
 
-        parameters = {
+    def get_parameters(self) -> dict:
+        """回测记录中保存的回测参数"""
+        return {
             'symbol': self.symbol,
             'interval': self.interval,
             'start': self.start,
@@ -150,35 +129,116 @@ class Backtest(object):
             'exchange': self.exchange
         }
 
-        # 创建结果文件目录并保存结果
-        result_dir = os.path.join(os.path.dirname(
-            os.path.abspath(__file__)), '../../tmp/backtest_results')
-        os.makedirs(result_dir, exist_ok=True)
-        result_filename = f"{self.strategy}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        result_file_path = os.path.join(result_dir, result_filename)
+    def get_file_name(self) -> str:
+        """策略类所在的文件名"""
+        strategy_classes = get_strategy_class_names()
+        return next(
+            (item['filename'] for item in strategy_classes if item['name'] == self.strategy), 'unknown.py')
+
+    def optimize(self, params: dict, method: str = 'grid', max_tries: int = None, maximize='Return [%]',
+                 constraint=None, workers: int = None, batch_size: int = 50, random_state: int = None,
+                 save: bool = True) -> pd.DataFrame:
+        """
+        并行优化策略参数
+
+        K线只读取一次并通过内存映射文件共享给进程池中的各个进程，详见 zbot.services.optimize
+
+        :param params: 参数空间，如 {'n1': range(5, 30, 5), 'n2': [20, 40, 60]}，参数名为策略类的类属性
+        :param method: 搜索方式 grid(网格)、random(随机)、bayes(贝叶斯/TPE)
+        :param max_tries: 最多尝试的组合数，网格搜索默认尝试全部组合，其他方式默认100
+        :param maximize: 最大化的统计指标名称，或接收统计指标字典返回数值的函数
+        :param constraint: 参数约束，如 lambda p: p['n1'] < p['n2']
+        :param workers: 进程数，默认为CPU核数
+        :param batch_size: 每累计多少条结果写入一次回测记录
+        :param random_state: 随机种子
+        :param save: 是否保存回测记录
+        :return: 全部结果，每行为一组参数及其统计指标，按目标值降序排列
+        """
+        from zbot.services.optimize import ParameterOptimizer, run_optimization
+        from zbot.services.db import database
 
-        with open(result_file_path, 'w', encoding='utf-8') as f:
-            json.dump(self.to_dict(self.stats), f,
-                      ensure_ascii=False, indent=2)
+        optimizer = ParameterOptimizer(params, method=method, max_tries=max_tries,
+                                       constraint=constraint, random_state=random_state)
+        candles = self.load_candles()
+        if candles.empty:
+            raise ValueError(f"没有K线数据: {self.symbol} {self.interval} {self.start} ~ {self.end}")
 
+        file_name = self.get_file_name()
+        parameters = self.get_parameters()
+        start_time = datetime.strptime(self.start, '%Y-%m-%d')
+        end_time = datetime.strptime(self.end, '%Y-%m-%d')
+        pending = []
+
+        def flush():
+            if not pending:
+                return
+            with database.transaction():
+                BacktestRecord.insert_many(pending).execute()
+            pending.clear()
+
+        def on_result(values, stats):
+            if not save:
+                return
+            pending.append({
+                'strategy_name': self.strategy,
+                'start_time': start_time,
+                'end_time': end_time,
+                'file_name': file_name,
+                'parameters': json.dumps({**parameters, 'params': values, 'method': method},
+                                         ensure_ascii=False, default=str),
+                'results': json.dumps(self.to_dict(stats), ensure_ascii=False, default=str),
+                'total_return': float(stats.get('Return [%]', 0.0)),
+                'max_drawdown': float(stats.get('Max. Drawdown [%]', 0.0)),
+                'created_at': datetime.now(),
+            })
+            if len(pending) >= batch_size:
+                flush()
+
+        try:
+            return run_optimization(candles, self.strategy, self.cash, self.commission, optimizer,
+                                    maximize=maximize, workers=workers, on_result=on_result)
+        finally:
+            flush()
+
+    @staticmethod
+    def format_trades(trades: pd.DataFrame) -> list:
+        """将交易记录转换为页面展示用的字典列表，时间格式化为字符串，持续时间转换为中文描述"""
+        records = trades.to_dict(orient='records')
+        for trade in records:
+            for _k, _v in trade.items():
+                if isinstance(_v, datetime):
+                    trade[_k] = _v.strftime('%Y-%m-%d %H:%M:%S')
+                elif isinstance(_v, pd.Timedelta):
+                    trade[_k] = timedelta_to_localized_string(_v)
+        return records
+
+    def run(self):
+        candles = self.load_candles()
+        # 动态加载策略类
+        strategy_class = load_strategy_class(self.strategy)
+        self.bt = CustomBacktest(candles, strategy_class, cash=self.cash,
+                                 commission=self.commission, exclusive_orders=True)
+        self.stats = self.bt.run()
+        # 交易记录、策略K线、资金曲线和指标保存为Parquet文件，数据库只保存汇总指标和目录
+        trades = self.stats['_trades'].copy()
+        trades['Direction'] = np.where(trades['Size'] > 0, '多单', '空单')
+        strategy = self.stats['_strategy']
+        artifact_path = backtest_artifacts.save(self.strategy, {
+            'strategy': strategy.data.df,
+            'trades': trades,
+            'equity': self.stats['_equity_curve'],
+            'indicators': backtest_artifacts.get_indicators(strategy),
+        })
+
+        # 收集回测记录数据并保存
+        file_name = self.get_file_name()
+        parameters = self.get_parameters()
         translated_result = self.to_dict(self.stats)
-        total_return = 0.0
-        max_drawdown = 0.0
-        for i in translated_result:
-            if i['cn'] == '收益率':
-                total_return = float(i['value'])
-            if i['cn'] == '最大回撤':
-                max_drawdown = float(i['value'])
+        total_return = float(self.stats.get('Return [%]', 0.0))
+        max_drawdown = float(self.stats.get('Max. Drawdown [%]', 0.0))
 
         # 保存回测记录到数据库
         try:
-            # 数据验证
-            if not isinstance(total_return, (int, float)):
-                raise ValueError(f"无效的总回报率: {total_return}")
-            if not isinstance(max_drawdown, (int, float)):
-                raise ValueError(f"无效的最大回撤: {max_drawdown}")
-
-            # 保存回测记录到数据库
             BacktestRecord.create(
                 strategy_name=self.strategy,
                 start_time=datetime.strptime(self.start, '%Y-%m-%d'),
@@ -187,14 +247,13 @@ class Backtest(object):
                 parameters=json.dumps(parameters, ensure_ascii=False),
                 results=json.dumps(translated_result,
                                    ensure_ascii=False, default=str),
-                trades=json.dumps(trades, ensure_ascii=False, default=str),
-                strategy=json.dumps(strategy_data, ensure_ascii=False),
-                result_file_path=result_file_path,
-                total_return=float(total_return),
-                max_drawdown=float(max_drawdown)
+                artifact_path=artifact_path,
+                total_return=total_return,
+                max_drawdown=max_drawdown
             )
             logger.info(f"回测记录保存成功: {file_name}")
         except Exception as e:
+            backtest_artifacts.delete(artifact_path)
             logger.error(f"保存回测记录失败: {str(e)}", exc_info=True)
             raise  # 重新抛出异常以便上层处理
 
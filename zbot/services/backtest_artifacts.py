@@ -0,0 +1,118 @@
+"""
+回测结果文件存储模块
+
+回测产生的大体积数据(策略K线、交易记录、资金曲线、指标序列)保存为压缩的Parquet文件，
+BacktestRecord 只保存汇总指标和文件目录，页面按需读取其中的部分列，不再整体解析JSON文本。
+
+目录结构:
+    <root>/<策略名>_<时间>/strategy.parquet      策略K线，索引为开盘时间
+    <root>/<策略名>_<时间>/trades.parquet        交易记录
+    <root>/<策略名>_<时间>/equity.parquet        资金曲线
+    <root>/<策略名>_<时间>/indicators.parquet    指标序列，与策略K线等长
+"""
+import os
+import shutil
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+# 回测结果包含的文件
+ARTIFACTS = ('strategy', 'trades', 'equity', 'indicators')
+
+
+class BacktestArtifactStore(object):
+    """回测结果文件存储，每次回测一个目录，每类数据一个Parquet文件"""
+
+    def __init__(self, root: Optional[str] = None, compression: str = 'zstd'):
+        """
+        :param root: 存储根目录，默认为数据库同级目录下的 backtests 目录
+        :param compression: Parquet压缩算法
+        """
+        self._root = root
+        self.compression = compression
+
+    @property
+    def root(self) -> str:
+        if self._root is None:
+            from zbot.services.db import base_path, database
+            self._root = os.path.join(base_path, 'data', f'{database.trading_mode}', 'backtests')
+        return self._root
+
+    @staticmethod
+    def get_indicators(strategy) -> pd.DataFrame:
+        """
+        将策略的指标转换为DataFrame，多维指标按行展开为 名称_序号 的多列
+
+        :param strategy: 回测完成后的策略实例(stats['_strategy'])
+        """
+        columns = {}
+        for indicator in getattr(strategy, '_indicators', []):
+            name = getattr(indicator, 'name', None) or f'indicator_{len(columns)}'
+            values = np.atleast_2d(np.asarray(indicator, dtype=np.float64))
+            for i, row in enumerate(values):
+                key = name if len(values) == 1 else f'{name}_{i}'
+                while key in columns:
+                    key = f'{key}_'
+                columns[key] = row
+        return pd.DataFrame(columns, index=strategy.data.index)
+
+    def save(self, name: str, frames: Dict[str, pd.DataFrame]) -> str:
+        """
+        保存一次回测的结果文件
+
+        :param name: 回测名称，用于生成目录名，如策略名
+        :param frames: {文件名: DataFrame}，文件名为 ARTIFACTS 之一
+        :return: 结果目录
+        """
+        path = os.path.join(self.root, f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}")
+        os.makedirs(path, exist_ok=True)
+        for key, df in frames.items():
+            if key not in ARTIFACTS:
+                raise ValueError(f"未知的回测结果文件: {key}")
+            if df is None:
+                continue
+            # 列名统一为字符串，保留索引(开盘时间)
+            df = df.rename(columns=str)
+            table = pa.Table.from_pandas(df, preserve_index=True)
+            pq.write_table(table, os.path.join(path, f'{key}.parquet'), compression=self.compression)
+        return path
+
+    def columns(self, path: str, key: str) -> List[str]:
+        """读取结果文件的数据列名(不含索引)，不读取数据"""
+        file_path = os.path.join(path, f'{key}.parquet')
+        if not os.path.exists(file_path):
+            return []
+        schema = pq.read_schema(file_path)
+        index_columns = set((schema.pandas_metadata or {}).get('index_columns', []))
+        return [name for name in schema.names if name not in index_columns]
+
+    def load(self, path: str, key: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        读取结果文件，只读取指定的列
+
+        :param path: 结果目录
+        :param key: 文件名，ARTIFACTS 之一
+        :param columns: 需要读取的列，默认全部；索引列始终读取
+        :return: DataFrame，文件不存在时返回空DataFrame
+        """
+        file_path = os.path.join(path, f'{key}.parquet')
+        if not os.path.exists(file_path):
+            return pd.DataFrame(columns=columns)
+        if columns is not None:
+            available = set(pq.read_schema(file_path).names)
+            columns = [c for c in columns if c in available]
+        # use_pandas_metadata 使只读部分列时也恢复索引
+        return pq.read_table(file_path, columns=columns, use_pandas_metadata=True).to_pandas()
+
+    def delete(self, path: Optional[str]):
+        """删除一次回测的结果目录"""
+        if path and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+backtest_artifacts = BacktestArtifactStore()
@@ -0,0 +1,163 @@
+# coding=utf-8
+"""
+批量回测
+
+将 策略 x 交易对 x 时间周期 x 时间范围 展开为多个回测任务，在进程池中并行执行：
+- 交易对、时间周期、时间范围相同的任务共用一份K线，按数据分组后每组只从列式存储读取一次，
+  同组的各个策略在同一个进程中依次回测
+- 提交任务前在主进程中将用到的K线从SQLite同步到列式存储，子进程只读取，不会同时写入同一分区
+- 每个任务只返回汇总指标，失败的任务记录错误信息，不影响其他任务
+- 全部结果汇总为一张表，保存为CSV文件
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import product
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+# 批量回测汇总表的默认保存目录；单次回测的结果由 backtest_artifacts 保存在 data/<交易模式>/backtests 下
+RESULT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                          'tmp', 'backtest_results')
+# 汇总表中保留的统计指标
+SUMMARY_STATS = [
+    'Return [%]', 'Buy & Hold Return [%]', 'Return (Ann.) [%]', 'Max. Drawdown [%]', 'Sharpe Ratio',
+    'Sortino Ratio', 'Calmar Ratio', 'Win Rate [%]', 'Profit Factor', '# Trades', 'Equity Final [$]',
+]
+# 汇总表的列
+SUMMARY_COLUMNS = ['strategy', 'symbol', 'interval', 'start', 'end', 'status', 'bars', *SUMMARY_STATS, 'error']
+
+
+@dataclass
+class BacktestJob:
+    """单个 策略/交易对/时间周期/时间范围 的回测任务"""
+    strategy: str
+    symbol: str
+    interval: str
+    start: str
+    end: str
+
+    @property
+    def data_key(self) -> Tuple[str, str, str, str]:
+        """K线数据的标识，相同标识的任务共用一份K线"""
+        return self.symbol, self.interval, self.start, self.end
+
+
+def _run_group(exchange: str, symbol: str, interval: str, start: str, end: str, strategies: List[str],
+               cash: float, commission: float) -> List[dict]:
+    """在子进程中读取一次K线，依次回测同一数据上的各个策略，返回汇总行"""
+    from zbot.services.backtest import Backtest, CustomBacktest
+    from zbot.strategies.strategy_loader import load_strategy_class
+
+    base = {'symbol': symbol, 'interval': interval, 'start': start, 'end': end}
+    try:
+        candles = Backtest(strategies[0], symbol, interval, start, end, cash, commission,
+                           exchange).load_candles()
+        if candles.empty:
+            raise ValueError("没有K线数据")
+    except Exception as e:
+        return [{'strategy': strategy, **base, 'status': 'error', 'error': f"读取K线失败: {e}"}
+                for strategy in strategies]
+
+    rows = []
+    for strategy in strategies:
+        row = {'strategy': strategy, **base, 'bars': len(candles)}
+        try:
+            bt = CustomBacktest(candles, load_strategy_class(strategy), cash=cash, commission=commission,
+                                exclusive_orders=True)
+            stats = bt.run()
+            row.update({name: stats.get(name) for name in SUMMARY_STATS}, status='completed', error='')
+        except Exception as e:
+            row.update(status='error', error=str(e))
+        rows.append(row)
+    return rows
+
+
+class BatchBacktester(object):
+    """批量回测执行器"""
+
+    def __init__(self, strategies: Iterable[str], symbols: Iterable[str], intervals: Iterable[str],
+                 timeranges: Iterable[Tuple[str, str]], cash: float, commission: float,
+                 exchange: Optional[str] = None, workers: Optional[int] = None,
+                 on_progress: Optional[Callable[[List[dict], int, int], None]] = None):
+        """
+        :param strategies: 策略类名列表
+        :param symbols: 交易对列表
+        :param intervals: 时间周期列表
+        :param timeranges: 时间范围列表，每项为 (开始日期, 结束日期)，格式 %Y-%m-%d
+        :param exchange: 交易所名称，默认为配置文件中的交易所
+        :param workers: 进程数，默认为CPU核数
+        :param on_progress: 每完成一组数据时在主进程中调用 on_progress(该组汇总行, 已完成组数, 总组数)
+        """
+        if exchange is None:
+            from zbot.common.config import read_config
+            exchange = read_config('exchange')['name']
+        self.exchange = exchange
+        self.cash = cash
+        self.commission = commission
+        self.workers = workers or os.cpu_count() or 1
+        self.on_progress = on_progress
+        self.jobs = [BacktestJob(strategy, symbol, interval, start, end) for strategy, symbol, interval, (start, end)
+                     in product(strategies, symbols, intervals, timeranges)]
+
+    def groups(self) -> Dict[Tuple[str, str, str, str], List[str]]:
+        """按K线数据分组，返回 {数据标识: 策略列表}"""
+        groups = {}
+        for job in self.jobs:
+            strategies = groups.setdefault(job.data_key, [])
+            if job.strategy not in strategies:
+                strategies.append(job.strategy)
+        return groups
+
+    def sync_candle_store(self):
+        """
+        在主进程中将各 交易对/时间周期 的K线增量导出到列式存储
+
+        该周期没有数据时同时导出1m数据，子进程将由1m数据合成该周期
+        """
+        from zbot.services.candle_store import candle_store
+        from zbot.services.model import sync_candle_store
+        from zbot.services.resample import BASE_TIMEFRAME
+        for symbol, interval in dict.fromkeys((job.symbol, job.interval) for job in self.jobs):
+            try:
+                sync_candle_store(self.exchange, symbol, interval)
+                if interval != BASE_TIMEFRAME and not candle_store.list_partitions(self.exchange, symbol, interval):
+                    sync_candle_store(self.exchange, symbol, BASE_TIMEFRAME)
+            except Exception as e:
+                # 子进程读取时会再次同步，失败的任务在汇总表中记录错误
+                print(f"同步 {symbol} {interval} K线到列式存储失败: {e}")
+
+    def run(self) -> pd.DataFrame:
+        """执行全部回测任务，返回汇总表，每行对应一个任务"""
+        groups = self.groups()
+        self.sync_candle_store()
+        rows = []
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(_run_group, self.exchange, *key, strategies, self.cash, self.commission): key
+                       for key, strategies in groups.items()}
+            for done, future in enumerate(as_completed(futures), 1):
+                key = futures[future]
+                try:
+                    group_rows = future.result()
+                except Exception as e:
+                    # 子进程异常退出等情况
+                    symbol, interval, start, end = key
+                    group_rows = [{'strategy': strategy, 'symbol': symbol, 'interval': interval, 'start': start,
+                                   'end': end, 'status': 'error', 'error': str(e)} for strategy in groups[key]]
+                rows.extend(group_rows)
+                if self.on_progress is not None:
+                    self.on_progress(group_rows, done, len(groups))
+
+        summary = pd.DataFrame(rows, columns=SUMMARY_COLUMNS)
+        return summary.sort_values(['strategy', 'symbol', 'interval', 'start']).reset_index(drop=True)
+
+    @staticmethod
+    def save(summary: pd.DataFrame, path: Optional[str] = None) -> str:
+        """保存汇总表为CSV文件，返回文件路径"""
+        if path is None:
+            os.makedirs(RESULT_DIR, exist_ok=True)
+            path = os.path.join(RESULT_DIR, f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+        summary.to_csv(path, index=False, encoding='utf-8-sig')
+        return path
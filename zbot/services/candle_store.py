@@ -0,0 +1,240 @@
+"""
+K线列式存储模块
+
+按 交易所/交易对/时间周期/月份 分区，将K线数据以Parquet文件保存在本地磁盘，
+回测读取时直接加载为NumPy列数据，并利用 open_time 的行组统计信息做谓词下推，
+完全跳过ORM。SQLite中的K线表仍作为写入路径，两者通过 services.model 中的同步函数保持一致。
+
+目录结构:
+    <root>/<exchange>/<symbol>/<timeframe>/<YYYY-MM>.parquet      月份分区
+    <root>/<exchange>/<symbol>/<timeframe>/<YYYY-MM>.<n>.parquet  追加到月末的分片，合并时并入月份分区
+"""
+import os
+import re
+import uuid
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from zbot.utils.dateutils import timestamps_to_datetime64
+
+
+# 分区文件名格式: 2025-01.parquet，追加分片为 2025-01.1.parquet
+PARTITION_PATTERN = re.compile(r'^(\d{4}-\d{2})(?:\.(\d+))?\.parquet$')
+# 同步标记文件，记录已从SQLite导出的最大 open_time(同步水位线)
+SYNC_MARKER = '.synced'
+# 物化标记文件，表示该序列由基础周期K线合成，基础周期写入新数据时需要重新合成
+RESAMPLED_MARKER = '.resampled'
+
+
+class CandleStore(object):
+    """K线列式存储，按月分区的Parquet文件"""
+
+    def __init__(self, root: Optional[str] = None, compression: str = 'zstd', row_group_size: int = 65536,
+                 max_parts: int = 32):
+        """
+        :param root: 存储根目录，默认为数据库同级目录下的 candles 目录
+        :param compression: Parquet压缩算法
+        :param row_group_size: 行组大小，越小谓词下推粒度越细
+        :param max_parts: 每个月份最多的文件数(含追加分片)，达到后下次写入时合并为一个文件
+        """
+        self._root = root
+        self.compression = compression
+        self.row_group_size = row_group_size
+        self.max_parts = max_parts
+
+    @property
+    def root(self) -> str:
+        if self._root is None:
+            from zbot.services.db import base_path, database
+            self._root = os.path.join(base_path, 'data', f'{database.trading_mode}', 'candles')
+        return self._root
+
+    @staticmethod
+    def format_symbol(symbol: str) -> str:
+        """交易对统一去掉斜杠，与数据库中的存储格式一致"""
+        return symbol.replace('/', '')
+
+    def series_dir(self, exchange: str, symbol: str, timeframe: str) -> str:
+        """获取某个K线序列的分区目录"""
+        return os.path.join(self.root, exchange, self.format_symbol(symbol), timeframe)
+
+    def list_partitions(self, exchange: str, symbol: str, timeframe: str) -> List[str]:
+        """列出某个K线序列的全部月份分区，按月份升序"""
+        series_dir = self.series_dir(exchange, symbol, timeframe)
+        if not os.path.isdir(series_dir):
+            return []
+        return sorted({match.group(1) for match in map(PARTITION_PATTERN.match, os.listdir(series_dir)) if match})
+
+    @staticmethod
+    def _month_files(series_dir: str, month: str) -> List[str]:
+        """列出某个月份的分区文件及其追加分片，按写入顺序排列"""
+        if not os.path.isdir(series_dir):
+            return []
+        parts = []
+        for f in os.listdir(series_dir):
+            match = PARTITION_PATTERN.match(f)
+            if match and match.group(1) == month:
+                parts.append((int(match.group(2) or 0), os.path.join(series_dir, f)))
+        return [path for _, path in sorted(parts)]
+
+    @staticmethod
+    def _max_open_time(path: str) -> int:
+        """从Parquet文件末尾行组的统计信息获取最大 open_time，不读取数据"""
+        metadata = pq.ParquetFile(path).metadata
+        column = metadata.schema.names.index('open_time')
+        return metadata.row_group(metadata.num_row_groups - 1).column(column).statistics.max
+
+    def list_timeframes(self, exchange: str, symbol: str) -> List[str]:
+        """列出某个交易对已存储的全部时间周期"""
+        symbol_dir = os.path.join(self.root, exchange, self.format_symbol(symbol))
+        if not os.path.isdir(symbol_dir):
+            return []
+        return sorted(f for f in os.listdir(symbol_dir) if os.path.isdir(os.path.join(symbol_dir, f)))
+
+    def is_resampled(self, exchange: str, symbol: str, timeframe: str) -> bool:
+        """判断该序列是否由基础周期K线合成"""
+        return os.path.exists(os.path.join(self.series_dir(exchange, symbol, timeframe), RESAMPLED_MARKER))
+
+    def mark_resampled(self, exchange: str, symbol: str, timeframe: str):
+        """标记该序列由基础周期K线合成"""
+        series_dir = self.series_dir(exchange, symbol, timeframe)
+        os.makedirs(series_dir, exist_ok=True)
+        with open(os.path.join(series_dir, RESAMPLED_MARKER), 'w', encoding='utf-8') as f:
+            f.write('')
+
+    def synced_until(self, exchange: str, symbol: str, timeframe: str) -> Optional[int]:
+        """
+        获取该序列的同步水位线
+
+        :return: 已从数据库导出的最大 open_time，从未同步或标记无法解析时返回None
+        """
+        try:
+            with open(os.path.join(self.series_dir(exchange, symbol, timeframe), SYNC_MARKER),
+                      encoding='utf-8') as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def mark_synced(self, exchange: str, symbol: str, timeframe: str, open_time: int):
+        """记录该序列已从数据库导出到 open_time(含)"""
+        series_dir = self.series_dir(exchange, symbol, timeframe)
+        os.makedirs(series_dir, exist_ok=True)
+        path = os.path.join(series_dir, SYNC_MARKER)
+        tmp_path = self._temp_path(path)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(str(int(open_time)))
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _month_keys(open_time: np.ndarray) -> np.ndarray:
+        """
+        计算每个时间戳所属的月份分区键
+
+        时间戳单位由 timestamps_to_datetime64 自动识别，
+        兼容币安2025年起微秒格式与历史毫秒格式混存的情况
+        """
+        return timestamps_to_datetime64(open_time).astype('datetime64[M]').astype(str)
+
+    @classmethod
+    def _month_bounds(cls, start: Optional[int], end: Optional[int]):
+        """将查询范围转换为月份键范围，用于裁剪需要读取的分区"""
+        def to_month(ts):
+            return None if ts is None else str(cls._month_keys([int(ts)])[0])
+        return to_month(start), to_month(end)
+
+    @staticmethod
+    def _temp_path(path: str) -> str:
+        """临时文件路径，包含进程号和随机后缀，多个进程同时写入同一文件时互不覆盖"""
+        return f'{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp'
+
+    def _write_file(self, path: str, df: pd.DataFrame):
+        """写入单个Parquet文件，先写临时文件再原子替换，避免读取到写了一半的文件"""
+        tmp_path = self._temp_path(path)
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_path,
+                       compression=self.compression, row_group_size=self.row_group_size)
+        os.replace(tmp_path, path)
+
+    def write(self, exchange: str, symbol: str, timeframe: str, df: pd.DataFrame) -> int:
+        """
+        写入K线数据，按 open_time 去重(保留新数据)并排序
+
+        新数据全部晚于该月已有数据时(增量同步、实时K线)直接写为追加分片，不重写整个月份；
+        否则与该月全部文件合并为一个分区文件。追加分片达到 max_parts 后同样合并
+
+        :param df: K线数据，必须包含 open_time 列
+        :return: 写入的行数
+        """
+        if df is None or df.empty:
+            return 0
+        df = df.drop(columns=[c for c in ('id', 'symbol', 'timeframe') if c in df.columns])
+        series_dir = self.series_dir(exchange, symbol, timeframe)
+        os.makedirs(series_dir, exist_ok=True)
+        months = self._month_keys(df['open_time'].to_numpy())
+        for month in np.unique(months):
+            part = df[months == month].drop_duplicates(subset=['open_time'], keep='last').sort_values('open_time')
+            files = self._month_files(series_dir, month)
+            if files and len(files) < self.max_parts \
+                    and part['open_time'].iloc[0] > self._max_open_time(files[-1]):
+                self._write_file(os.path.join(series_dir, f'{month}.{len(files)}.parquet'), part)
+                continue
+            if files:
+                existing = pq.ParquetDataset(files).read().to_pandas()
+                part = pd.concat([existing, part], ignore_index=True)
+                part = part.drop_duplicates(subset=['open_time'], keep='last').sort_values('open_time')
+            path = os.path.join(series_dir, f'{month}.parquet')
+            self._write_file(path, part)
+            # 分片已并入月份分区
+            for file in files:
+                if file != path:
+                    os.remove(file)
+        return len(df)
+
+    def read(self, exchange: str, symbol: str, timeframe: str, start: Optional[int] = None,
+             end: Optional[int] = None, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        读取指定时间范围的K线数据
+
+        仅打开与查询范围相交的月份分区，并将 open_time 范围作为过滤条件下推到Parquet行组
+
+        :param start: 开始时间戳(含)，与库中 open_time 单位一致
+        :param end: 结束时间戳(含)
+        :param columns: 需要读取的列，默认全部
+        :return: 按 open_time 升序的DataFrame，无数据时返回空DataFrame
+        """
+        start_month, end_month = self._month_bounds(start, end)
+        months = [m for m in self.list_partitions(exchange, symbol, timeframe)
+                  if (start_month is None or m >= start_month) and (end_month is None or m <= end_month)]
+        if not months:
+            return pd.DataFrame()
+        series_dir = self.series_dir(exchange, symbol, timeframe)
+        paths = [path for m in months for path in self._month_files(series_dir, m)]
+        filters = []
+        if start is not None:
+            filters.append(('open_time', '>=', int(start)))
+        if end is not None:
+            filters.append(('open_time', '<=', int(end)))
+        if columns is not None and 'open_time' not in columns:
+            columns = ['open_time'] + list(columns)
+        df = pq.ParquetDataset(paths, filters=filters or None).read(columns=columns).to_pandas()
+        # 各文件内部已排序，按月份和分片顺序拼接后整体有序；
+        # 合并中断时分片可能与分区文件重叠，此时重新去重排序
+        open_time = df['open_time'].to_numpy()
+        if len(open_time) > 1 and not (np.diff(open_time) > 0).all():
+            df = df.drop_duplicates(subset=['open_time'], keep='last').sort_values('open_time', ignore_index=True)
+        return df
+
+    def delete(self, exchange: str, symbol: str, timeframe: str):
+        """删除某个K线序列的全部分区"""
+        series_dir = self.series_dir(exchange, symbol, timeframe)
+        if not os.path.isdir(series_dir):
+            return
+        for f in os.listdir(series_dir):
+            os.remove(os.path.join(series_dir, f))
+        os.rmdir(series_dir)
+
+
+candle_store = CandleStore()
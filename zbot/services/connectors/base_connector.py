@@ -4,7 +4,7 @@ from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 import json
 import os
-from zbot.services.events import event_bus, EventType, MarketDataEvent, OrderEvent
+from zbot.services.events import event_bus, EventType, MarketDataEvent, OrderEvent, make_topic
 
 
 class AsyncExchange(ABC):
@@ -100,12 +100,12 @@ class AsyncExchange(ABC):
         pass
 
     async def _publish_market_event(self, symbol: str, interval: str, data: Dict):
-        """发布市场数据事件"""
+        """发布市场数据事件，主题为 market_data.<交易所>.<交易对>.<时间周期>"""
         event = MarketDataEvent(symbol, interval, data)
-        asyncio.create_task(event_bus.publish(EventType.MARKET_DATA, event.to_dict()))
+        event_bus.publish_nowait(make_topic(EventType.MARKET_DATA, self.exchange_name, symbol, interval), event)
 
     async def _publish_order_event(self, order: Dict):
-        """发布订单事件"""
+        """发布订单事件，主题为 <订单事件类型>.<交易所>.<交易对>"""
         event_type = {
             'created': EventType.ORDER_CREATED,
             'updated': EventType.ORDER_UPDATED,
@@ -120,10 +120,10 @@ class AsyncExchange(ABC):
             side=order.get('side'),
             price=order.get('price'),
             quantity=order.get('quantity'),
-            status=order.get('status')
+            status=order.get('status'),
+            event_type=event_type
         )
-        event.type = event_type
-        asyncio.create_task(event_bus.publish(event_type, event.to_dict()))
+        event_bus.publish_nowait(make_topic(event_type, self.exchange_name, order.get('symbol')), event)
 
     async def __aenter__(self):
         await self.initialize()
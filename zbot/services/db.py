@@ -1,4 +1,8 @@
-from playhouse.migrate import SqliteDatabase
+from contextlib import contextmanager
+import threading
+
+from peewee import DatabaseProxy
+from playhouse.pool import PooledSqliteDatabase
 
 # 项目根目录
 import os
@@ -7,25 +11,129 @@ import sys
 
 base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# SQLite连接参数，可通过 config.yml 中的 database.pragmas 覆盖
+DEFAULT_PRAGMAS = {
+    # WAL模式下读写互不阻塞，回测页面读取时不影响数据写入
+    'journal_mode': 'wal',
+    # WAL模式下只在检查点时同步磁盘，而不是每次提交都fsync
+    'synchronous': 'normal',
+    # 页缓存64MB，负数表示单位为KB
+    'cache_size': -64 * 1024,
+    # 使用256MB内存映射读取数据库文件
+    'mmap_size': 256 * 1024 * 1024,
+    # 临时表和索引放在内存中
+    'temp_store': 'memory',
+    # 数据库被锁定时最多等待10秒，而不是立即报错
+    'busy_timeout': 10000,
+}
+# 连接池参数，可通过 config.yml 中的 database 节点覆盖
+DEFAULT_POOL = {
+    # 最大连接数，每个线程同时只占用一个连接
+    'max_connections': 16,
+    # 空闲超过该秒数的连接被回收
+    'stale_timeout': 300,
+    # 连接池耗尽时等待的秒数
+    'timeout': 10,
+}
+
+
+@contextmanager
+def connection_scope(db):
+    """
+    在当前线程获取数据库连接
+
+    连接已打开时直接复用，否则从连接池取出并在退出时归还，
+    避免短生命周期的线程(如Flask请求、后台下载线程)占用连接不释放
+    """
+    opened = db.is_closed()
+    if opened:
+        db.connect()
+    try:
+        yield db.connection()
+    finally:
+        if opened:
+            db.close()
+
+
+class LazyDatabaseProxy(DatabaseProxy):
+    """
+    首次访问时才初始化的数据库代理
+
+    模型定义时绑定该代理，导入模块不会读取配置、连接数据库或检查表结构
+    """
+    __slots__ = ('obj', '_callbacks', '_Model', '_initializer')
+
+    def __init__(self, initializer):
+        super().__init__()
+        self._initializer = initializer
+
+    def __getattr__(self, attr):
+        # 未赋值的槽属性(如 _Model)不触发初始化
+        if attr not in self.__slots__:
+            self._initializer()
+        return super().__getattr__(attr)
+
 
 class Database(object):
     def __init__(self):
-        from zbot.common.config import read_config
-        config = read_config()
-        self.trading_mode = config.get('TRADING_MODE')
-        db_path = os.path.join(base_path, 'data', f'{
-                               self.trading_mode}', "zbot.db")
-        self.db: SqliteDatabase = SqliteDatabase(db_path)
+        self._ready = False
+        self._lock = threading.RLock()
+        # 模型通过 database.db 绑定数据库，实际连接池在第一次使用时创建
+        self.db = LazyDatabaseProxy(self.init)
+
+    @property
+    def trading_mode(self):
+        from zbot.common.config import load_config
+        return load_config().get('TRADING_MODE')
+
+    def init(self):
+        """
+        创建连接池并初始化表结构，每个进程只执行一次
+
+        初始化期间其他线程等待完成；当前线程在初始化过程中(执行迁移时)再次访问数据库直接返回。
+        建表或迁移失败时抛出异常，下次访问数据库时重新初始化
+        """
+        if self._ready:
+            return
+        with self._lock:
+            if self._ready or self.db.obj is not None:
+                return
+            from zbot.common.config import get_database_config
+            db_config = get_database_config()
+            pragmas = {**DEFAULT_PRAGMAS, **db_config.pragmas}
+            pool = {key: value if getattr(db_config, key) is None else getattr(db_config, key)
+                    for key, value in DEFAULT_POOL.items()}
+            db_path = os.path.join(base_path, 'data', f'{self.trading_mode}', "zbot.db")
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            # 每个线程使用独立的连接，连接关闭后归还连接池供其他线程复用
+            self.db.initialize(PooledSqliteDatabase(
+                db_path, pragmas=pragmas, check_same_thread=False, **pool))
+            try:
+                self.bootstrap()
+            except Exception:
+                # 初始化失败时丢弃连接池，下次访问重新初始化，而不是使用缺少表或迁移的数据库
+                self.db.obj.close_all()
+                self.db.initialize(None)
+                raise
+            self._ready = True
+
+    def bootstrap(self):
+        """创建缺失的表并应用未执行的迁移，失败时抛出异常"""
+        from zbot.services.migrations import MigrationManager
+        manager = MigrationManager()
+        manager.create_tables(verbose=False)
+        manager.apply_migrations(verbose=False)
 
     def closed(self):
-        if self.db is None:
+        """关闭当前线程的连接(归还连接池)"""
+        if self.db.obj is None:
             return True
-        if self.db.is_closed():
+        if not self.db.is_closed():
             self.db.close()
         return True
 
     def is_open(self) -> bool:
-        if self.db is None:
+        if self.db.obj is None:
             return False
         return not self.db.is_closed()
 
@@ -35,5 +143,19 @@ class Database(object):
         # connect to the database
         self.db.connect()
 
+    def connection(self):
+        """获取当前线程连接的上下文管理器，见 connection_scope"""
+        return connection_scope(self.db)
+
+    @contextmanager
+    def transaction(self):
+        """
+        显式事务，批量写入在一个事务内完成，只提交一次
+        嵌套调用时内层使用保存点
+        """
+        with self.connection():
+            with self.db.atomic() as txn:
+                yield txn
+
 
-database = Database()
\ No newline at end of file
+database = Database()
@@ -7,6 +7,9 @@ from zbot.services.strategy import AsyncBaseStrategy, AsyncDataProvider
 # from zbot.exchange.binance import create_async_connector
 from zbot.common.config import read_config
 
+# 策略任务意外结束后重启前的等待时间(秒)，避免策略持续出错时反复重启
+RESTART_DELAY = 5
+
 
 class Engine(object):
     """实盘交易引擎，协调连接器、数据提供器和策略的执行"""
@@ -17,7 +20,8 @@ class Engine(object):
         self.data_providers: Dict[str, AsyncDataProvider] = {}
         self.strategies: Dict[str, AsyncBaseStrategy] = {}
         self.running = False
-        self._task: Optional[asyncio.Task] = None
+        # 等待重启的策略任务
+        self._restarts: Dict[str, asyncio.Task] = {}
 
     async def initialize(self):
         """初始化交易引擎"""
@@ -117,22 +121,35 @@ class Engine(object):
         self.running = True
         # 启动所有策略
         for name, strategy in self.strategies.items():
-            await strategy.start()
+            await self._start_strategy(name, strategy)
             print(f"策略 {name} 已启动")
-
-        # 启动引擎主循环
-        self._task = asyncio.create_task(self._engine_loop())
         print("交易引擎已启动")
 
-    async def _engine_loop(self):
-        """引擎主循环"""
-        while self.running:
-            # 检查所有策略状态
-            for name, strategy in self.strategies.items():
-                if not strategy._running:
-                    print(f"策略 {name} 已停止，尝试重启...")
-                    await strategy.start()
-            await asyncio.sleep(5)  # 每5秒检查一次
+    async def _start_strategy(self, name: str, strategy: AsyncBaseStrategy):
+        """启动策略，并在策略任务结束时得到通知，不再定时轮询策略状态"""
+        task = await strategy.start()
+        if task is not None:
+            task.add_done_callback(lambda t: self._on_strategy_done(name, strategy, t))
+
+    def _on_strategy_done(self, name: str, strategy: AsyncBaseStrategy, task: asyncio.Task):
+        """策略任务结束回调，引擎运行中且策略未被移除时安排重启"""
+        if not self.running or self.strategies.get(name) is not strategy or name in self._restarts:
+            return
+        if not task.cancelled() and task.exception() is not None:
+            print(f"策略 {name} 异常退出: {task.exception()}")
+        self._restarts[name] = asyncio.create_task(self._restart_strategy(name, strategy))
+
+    async def _restart_strategy(self, name: str, strategy: AsyncBaseStrategy):
+        try:
+            await asyncio.sleep(RESTART_DELAY)
+            if not self.running or self.strategies.get(name) is not strategy:
+                return
+            print(f"策略 {name} 已停止，尝试重启...")
+            # 先清理上次运行的订阅和订单
+            await strategy.stop()
+            await self._start_strategy(name, strategy)
+        finally:
+            self._restarts.pop(name, None)
 
     async def stop(self):
         """停止交易引擎"""
@@ -140,6 +157,8 @@ class Engine(object):
             return
 
         self.running = False
+        for task in list(self._restarts.values()):
+            task.cancel()
         # 停止所有策略
         for name, strategy in self.strategies.items():
             await strategy.stop()
@@ -150,14 +169,6 @@ class Engine(object):
             await connector.close()
             print(f"连接器 {name} 已关闭")
 
-        # 取消引擎主循环任务
-        if self._task and not self._task.done():
-            self._task.cancel()
-            try:
-                await self._task
-            except asyncio.CancelledError:
-                pass
-
         print("交易引擎已停止")
 
     async def add_strategy(self, strategy_name: str, strategy_class: Type[AsyncBaseStrategy],
@@ -174,18 +185,18 @@ class Engine(object):
         strategy = strategy_class(params=params or {})
         await strategy.initialize(connector, data_provider)
         self.strategies[strategy_name] = strategy
-        await strategy.start()
+        await self._start_strategy(strategy_name, strategy)
         print(f"已动态添加策略: {strategy_name}")
         return True
 
     async def remove_strategy(self, strategy_name: str) -> bool:
         """移除策略"""
-        strategy = self.strategies.get(strategy_name)
+        # 先移除再停止，停止时的任务结束回调不会重启该策略
+        strategy = self.strategies.pop(strategy_name, None)
         if not strategy:
             return False
 
         await strategy.stop()
-        del self.strategies[strategy_name]
         print(f"已移除策略: {strategy_name}")
         return True
 
@@ -1,66 +1,488 @@
+"""
+异步事件总线
+
+发布路径不加锁、不创建任务:
+    - 订阅者列表以元组保存，订阅/取消订阅时整体替换(写时复制)，发布时直接读取当前快照
+    - 每个订阅者一个有界环形缓冲队列，队列满时按溢出策略丢弃消息，不阻塞发布者，内存占用有上限
+    - 处理函数订阅(subscribe_handler)有自己的有界队列和一个常驻的消费协程，按顺序取出事件，
+      每次唤醒最多处理 batch_size 条，并统计处理耗时，慢的订阅者表现为队列积压和丢弃计数
+    - 同步处理函数可在发布时直接调用(direct=True)；一次性处理函数(subscribe_once)触发后即被移除
+    - 每个主题统计发布、投递和丢弃的消息数，用于观察吞吐量和慢订阅者
+
+主题分层，各级以 . 分隔，如 market_data.binance.BTCUSDT.1m:
+    - 订阅的主题是前缀匹配，订阅 market_data 收到全部行情，订阅 market_data.binance.BTCUSDT 只收到该交易对的各周期
+    - * 匹配任意一级，如 market_data.*.*.1m 收到所有交易对的1m K线
+    - 每个具体主题第一次发布时计算匹配的订阅者并缓存，之后发布只需一次字典查找，
+      分发开销只与关注该主题的订阅者数量有关；订阅变化时清空缓存
+"""
 import asyncio
-from typing import Dict, List, Callable, Coroutine, Any
+import itertools
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+# 订阅者队列默认容量
+DEFAULT_QUEUE_SIZE = 1024
+
+
+class OverflowPolicy:
+    """队列满时的溢出策略"""
+    # 丢弃最早的消息，保留最新的消息(默认，适合行情)
+    DROP_OLDEST = 'drop_oldest'
+    # 丢弃新到达的消息，保留已排队的消息
+    DROP_NEWEST = 'drop_newest'
+    # 同一键(默认为 交易对+时间周期)只保留最新一条，未被消费的旧消息直接被替换
+    COALESCE_LATEST = 'coalesce_latest'
+
+    ALL = (DROP_OLDEST, DROP_NEWEST, COALESCE_LATEST)
+
+
+# 主题各级的分隔符
+TOPIC_SEPARATOR = '.'
+# 匹配任意一级的通配符
+TOPIC_WILDCARD = '*'
+
+
+def make_topic(*parts: Any) -> str:
+    """
+    由各级名称拼接主题，忽略末尾的空值，中间的空值视为通配符，交易对中的 / 被去掉
+
+    如 make_topic('market_data', 'binance', 'BTC/USDT', '1m') == 'market_data.binance.BTCUSDT.1m'
+    """
+    parts = list(parts)
+    while parts and parts[-1] in (None, ''):
+        parts.pop()
+    return TOPIC_SEPARATOR.join(TOPIC_WILDCARD if part in (None, '') else str(part).replace('/', '')
+                                for part in parts)
+
+
+def topic_matches(pattern: str, topic: str) -> bool:
+    """订阅主题 pattern 是否匹配发布的具体主题 topic(前缀匹配，* 匹配任意一级)"""
+    pattern_parts = pattern.split(TOPIC_SEPARATOR)
+    topic_parts = topic.split(TOPIC_SEPARATOR)
+    if len(pattern_parts) > len(topic_parts):
+        return False
+    return all(p == TOPIC_WILDCARD or p == t for p, t in zip(pattern_parts, topic_parts))
+
+
+def coalesce_key(message: Any) -> Hashable:
+    """合并策略默认的消息键: 交易对和时间周期"""
+    if isinstance(message, dict):
+        return message.get('symbol'), message.get('interval')
+    return getattr(message, 'symbol', None), getattr(message, 'interval', None)
+
+
+class BoundedQueue(object):
+    """订阅者的有界队列(环形缓冲)，接口与 asyncio.Queue 相近，放入消息永不阻塞"""
+
+    def __init__(self, maxsize: int = DEFAULT_QUEUE_SIZE, policy: str = OverflowPolicy.DROP_OLDEST,
+                 key: Optional[Callable[[Any], Hashable]] = None):
+        """
+        :param maxsize: 队列容量
+        :param policy: 溢出策略，OverflowPolicy 之一
+        :param key: COALESCE_LATEST 策略下计算消息键的函数，默认为 coalesce_key
+        """
+        if policy not in OverflowPolicy.ALL:
+            raise ValueError(f"不支持的溢出策略: {policy}，可选 {', '.join(OverflowPolicy.ALL)}")
+        if maxsize <= 0:
+            raise ValueError(f"队列容量必须大于0: {maxsize}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.key = key or coalesce_key
+        # 合并策略下缓冲区保存消息键，消息保存在 _latest 中
+        self._buffer = deque()
+        self._latest: Dict[Hashable, Any] = {}
+        self._getters = deque()
+        # 被丢弃或被合并的消息数
+        self.dropped = 0
+
+    def qsize(self) -> int:
+        return len(self._buffer)
+
+    def empty(self) -> bool:
+        return not self._buffer
+
+    def full(self) -> bool:
+        return len(self._buffer) >= self.maxsize
+
+    def put_nowait(self, message: Any) -> bool:
+        """放入消息，返回False表示有消息被丢弃或合并"""
+        accepted = True
+        if self.policy == OverflowPolicy.COALESCE_LATEST:
+            key = self.key(message)
+            if key in self._latest:
+                self._latest[key] = message
+                self.dropped += 1
+                return False
+            if len(self._buffer) >= self.maxsize:
+                del self._latest[self._buffer.popleft()]
+                self.dropped += 1
+                accepted = False
+            self._buffer.append(key)
+            self._latest[key] = message
+        elif len(self._buffer) >= self.maxsize:
+            self.dropped += 1
+            if self.policy == OverflowPolicy.DROP_NEWEST:
+                return False
+            self._buffer.popleft()
+            self._buffer.append(message)
+            accepted = False
+        else:
+            self._buffer.append(message)
+        self._wakeup()
+        return accepted
+
+    def get_nowait(self) -> Any:
+        if not self._buffer:
+            raise asyncio.QueueEmpty
+        item = self._buffer.popleft()
+        if self.policy == OverflowPolicy.COALESCE_LATEST:
+            return self._latest.pop(item)
+        return item
+
+    async def get(self) -> Any:
+        """等待并取出一条消息"""
+        await self._wait()
+        return self.get_nowait()
+
+    async def get_batch(self, max_items: int) -> list:
+        """等待至少一条消息，取出已排队的最多 max_items 条"""
+        await self._wait()
+        return [self.get_nowait() for _ in range(min(max_items, len(self._buffer)))]
+
+    async def _wait(self):
+        while not self._buffer:
+            getter = asyncio.get_running_loop().create_future()
+            self._getters.append(getter)
+            try:
+                await getter
+            except asyncio.CancelledError:
+                # 被取消的等待者可能已被唤醒，转交给下一个等待者
+                if getter in self._getters:
+                    self._getters.remove(getter)
+                elif self._buffer:
+                    self._wakeup()
+                raise
+
+    def clear(self):
+        self._buffer.clear()
+        self._latest.clear()
+
+    def _wakeup(self):
+        while self._getters:
+            getter = self._getters.popleft()
+            if not getter.done():
+                getter.set_result(None)
+                break
+
+
+@dataclass
+class TopicStats:
+    """主题的消息计数"""
+    # 发布到该主题的消息数
+    published: int = 0
+    # 投递给订阅者队列和处理函数的次数
+    delivered: int = 0
+    # 因队列满被丢弃或被合并的次数
+    dropped: int = 0
+    # 处理函数抛出异常的次数
+    errors: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    def throughput(self) -> float:
+        """自第一次发布以来的平均发布速率(条/秒)"""
+        elapsed = time.monotonic() - self.started_at
+        return self.published / elapsed if elapsed > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'published': self.published,
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'throughput': self.throughput(),
+        }
+
+
+@dataclass
+class HandlerStats:
+    """处理函数订阅的处理计数和耗时"""
+    # 处理的事件数
+    events: int = 0
+    # 消费协程被唤醒的次数，events / wakeups 为平均每次处理的事件数
+    wakeups: int = 0
+    # 处理函数调用次数、累计和最大耗时(秒)
+    calls: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+    # 处理函数抛出异常的次数
+    errors: int = 0
+
+    def record(self, events: int, elapsed: float):
+        self.events += events
+        self.calls += 1
+        self.total_time += elapsed
+        if elapsed > self.max_time:
+            self.max_time = elapsed
+
+    def to_dict(self) -> dict:
+        return {
+            'events': self.events,
+            'wakeups': self.wakeups,
+            'calls': self.calls,
+            'avg_time': self.total_time / self.calls if self.calls else 0.0,
+            'max_time': self.max_time,
+            'errors': self.errors,
+        }
+
+
+class Subscription(object):
+    """处理函数订阅: 一个有界队列和一个常驻的消费协程，保证同一订阅内事件按发布顺序处理"""
+
+    def __init__(self, topic: str, handler: Callable[[Any], Any], queue: BoundedQueue, batch_size: int = 1,
+                 batch: bool = False):
+        """
+        :param topic: 订阅主题
+        :param handler: 处理函数，同步函数或协程函数
+        :param queue: 订阅者队列
+        :param batch_size: 每次唤醒最多处理的事件数
+        :param batch: 为True时处理函数一次接收一批事件的列表，否则逐条接收
+        """
+        if batch_size <= 0:
+            raise ValueError(f"batch_size必须大于0: {batch_size}")
+        self.topic = topic
+        self.handler = handler
+        self.queue = queue
+        self.batch_size = batch_size
+        self.batch = batch
+        self.stats = HandlerStats()
+        self._is_async = asyncio.iscoroutinefunction(handler)
+        self._task = asyncio.get_running_loop().create_task(self._consume())
+
+    @property
+    def name(self) -> str:
+        return getattr(self.handler, '__qualname__', repr(self.handler))
+
+    async def _consume(self):
+        queue = self.queue
+        while True:
+            messages = await queue.get_batch(self.batch_size)
+            self.stats.wakeups += 1
+            if self.batch:
+                await self._call(messages, len(messages))
+            else:
+                for message in messages:
+                    await self._call(message, 1)
+            if not queue.empty():
+                # 队列仍有积压时让出事件循环，同步处理函数也不会独占循环
+                await asyncio.sleep(0)
+
+    async def _call(self, message: Any, events: int):
+        start = time.perf_counter()
+        try:
+            result = self.handler(message)
+            if self._is_async:
+                await result
+        except Exception as e:
+            self.stats.errors += 1
+            print(f"处理事件 {self.topic} 时出错: {str(e)}")
+        self.stats.record(events, time.perf_counter() - start)
+
+    async def close(self):
+        """停止消费协程，未处理的事件被丢弃"""
+        if not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self.queue.clear()
+
+    def to_dict(self) -> dict:
+        return {
+            'topic': self.topic,
+            'handler': self.name,
+            'pending': self.queue.qsize(),
+            'dropped': self.queue.dropped,
+            **self.stats.to_dict(),
+        }
 
 
 class PubSub:
-    """异步事件发布订阅系统，支持事件的异步发布和订阅"""
-    def __init__(self):
-        # 事件主题到订阅者队列的映射
-        self.subscribers: Dict[str, List[asyncio.Queue]] = {}
-        # 事件主题到处理函数的映射（用于一次性处理）
-        self.event_handlers: Dict[str, List[Callable[[Any], Coroutine]]] = {}
-        self.lock = asyncio.Lock()
-
-    async def subscribe(self, topic: str) -> asyncio.Queue:
-        """订阅指定主题，返回用于接收事件的队列"""  
-        async with self.lock:
-            if topic not in self.subscribers:
-                self.subscribers[topic] = []
-                self.event_handlers[topic] = []
-            queue = asyncio.Queue()
-            self.subscribers[topic].append(queue)
-            return queue
-
-    async def subscribe_once(self, topic: str, handler: Callable[[Any], Coroutine]):
-        """订阅指定主题一次，使用处理函数处理事件"""
-        async with self.lock:
-            if topic not in self.event_handlers:
-                self.event_handlers[topic] = []
-            self.event_handlers[topic].append(handler)
-
-    async def unsubscribe(self, topic: str, queue: asyncio.Queue):
-        """取消订阅指定主题的队列"""        
-        async with self.lock:
-            if topic in self.subscribers and queue in self.subscribers[topic]:
-                self.subscribers[topic].remove(queue)
-                if not self.subscribers[topic]:
-                    del self.subscribers[topic]
-                    del self.event_handlers[topic]
+    """异步事件发布订阅系统，发布不加锁、不阻塞，订阅者队列有界"""
+    def __init__(self, maxsize: int = DEFAULT_QUEUE_SIZE, policy: str = OverflowPolicy.DROP_OLDEST):
+        """
+        :param maxsize: 订阅者队列的默认容量
+        :param policy: 订阅者队列的默认溢出策略
+        """
+        self.maxsize = maxsize
+        self.policy = policy
+        # 订阅主题到订阅者队列的映射，值为元组，只整体替换不原地修改
+        self.subscribers: Dict[str, Tuple[BoundedQueue, ...]] = {}
+        # 订阅主题到直接调用的 (登记标识, 处理函数, 是否为协程函数, 是否只触发一次) 的映射，同上；
+        # 登记标识区分同一处理函数的多次登记，一次性处理函数按标识移除
+        self.event_handlers: Dict[str, Tuple[Tuple[int, Callable, bool, bool], ...]] = {}
+        self._tokens = itertools.count()
+        # 订阅主题到处理函数订阅的映射，其队列同时登记在 subscribers 中
+        self.handler_subscriptions: Dict[str, Tuple[Subscription, ...]] = {}
+        # 分发索引: 具体主题到匹配的 (订阅者队列, 处理函数) 的缓存，
+        # 处理函数为 (处理函数, 是否为协程函数, 是否有常驻登记, 一次性登记的标识元组)
+        self._routes: Dict[str, Tuple[tuple, tuple]] = {}
+        self._stats: Dict[str, TopicStats] = {}
 
-    async def publish(self, topic: str, message: Any):
-        """异步发布事件到指定主题"""
-        async with self.lock:
-            # 复制当前订阅者列表以避免发布时修改
-            queues = self.subscribers.get(topic, []).copy()
-            handlers = self.event_handlers.get(topic, []).copy()
+    async def subscribe(self, topic: str, maxsize: Optional[int] = None, policy: Optional[str] = None,
+                        key: Optional[Callable[[Any], Hashable]] = None) -> BoundedQueue:
+        """订阅指定主题，返回用于接收事件的有界队列"""
+        queue = BoundedQueue(maxsize or self.maxsize, policy or self.policy, key)
+        self.subscribers[topic] = self.subscribers.get(topic, ()) + (queue,)
+        self._routes = {}
+        return queue
+
+    async def subscribe_handler(self, topic: str, handler: Callable[[Any], Any], maxsize: Optional[int] = None,
+                                policy: Optional[str] = None, key: Optional[Callable[[Any], Hashable]] = None,
+                                batch_size: int = 1, batch: bool = False, direct: bool = False) -> Optional[Subscription]:
+        """
+        持续订阅指定主题，使用处理函数处理事件
+
+        默认为处理函数创建有界队列和常驻的消费协程，参数含义见 subscribe 和 Subscription；
+        direct=True 时同步处理函数在发布时直接调用，不经过队列，处理函数必须足够快，返回None
+        """
+        if direct:
+            if asyncio.iscoroutinefunction(handler):
+                raise ValueError("协程处理函数不能直接调用，请使用队列订阅")
+            self._add_handler(topic, handler, False, False)
+            return None
+        queue = await self.subscribe(topic, maxsize, policy, key)
+        subscription = Subscription(topic, handler, queue, batch_size, batch)
+        self.handler_subscriptions[topic] = self.handler_subscriptions.get(topic, ()) + (subscription,)
+        return subscription
+
+    async def subscribe_once(self, topic: str, handler: Callable[[Any], Any]):
+        """
+        订阅指定主题的下一个事件，处理函数只触发一次，同步函数在发布时直接调用
+
+        同一处理函数的多个一次性登记(包括不同的订阅主题)在同一事件上合并为一次调用并一起移除
+        """
+        self._add_handler(topic, handler, asyncio.iscoroutinefunction(handler), True)
+
+    def _add_handler(self, topic: str, handler: Callable[[Any], Any], is_async: bool, once: bool) -> int:
+        """登记直接调用的处理函数，返回登记标识"""
+        token = next(self._tokens)
+        self.event_handlers[topic] = self.event_handlers.get(topic, ()) + ((token, handler, is_async, once),)
+        self._routes = {}
+        return token
+
+    def _set_handlers(self, topic: str, entries: tuple):
+        if entries:
+            self.event_handlers[topic] = entries
+        else:
+            self.event_handlers.pop(topic, None)
+        self._routes = {}
+
+    def _remove_handler(self, topic: str, handler: Callable[[Any], Any]):
+        """移除指定主题下该处理函数的全部登记"""
+        self._set_handlers(topic, tuple(entry for entry in self.event_handlers.get(topic, ()) if entry[1] != handler))
+
+    def _remove_tokens(self, tokens: tuple) -> bool:
+        """
+        按登记标识移除处理函数
+        :return: 是否有登记被移除，标识均已被移除(例如已在嵌套发布中触发)时返回False
+        """
+        removed = False
+        for topic, entries in list(self.event_handlers.items()):
+            remaining = tuple(entry for entry in entries if entry[0] not in tokens)
+            if len(remaining) != len(entries):
+                self._set_handlers(topic, remaining)
+                removed = True
+        return removed
+
+    async def unsubscribe(self, topic: str, queue: BoundedQueue):
+        """取消订阅指定主题的队列"""
+        queues = tuple(q for q in self.subscribers.get(topic, ()) if q is not queue)
+        if queues:
+            self.subscribers[topic] = queues
+        else:
+            self.subscribers.pop(topic, None)
+        self._routes = {}
+
+    async def unsubscribe_handler(self, topic: str, handler: Callable[[Any], Any]):
+        """取消指定主题的处理函数，停止其消费协程"""
+        self._remove_handler(topic, handler)
+        subscriptions = self.handler_subscriptions.get(topic, ())
+        removed = [sub for sub in subscriptions if sub.handler == handler]
+        if len(removed) == len(subscriptions):
+            self.handler_subscriptions.pop(topic, None)
+        else:
+            self.handler_subscriptions[topic] = tuple(sub for sub in subscriptions if sub.handler != handler)
+        for subscription in removed:
+            await self.unsubscribe(topic, subscription.queue)
+            await subscription.close()
+
+    def _resolve(self, topic: str) -> Tuple[tuple, tuple]:
+        """
+        计算匹配具体主题的订阅者队列和处理函数，同一订阅者匹配多个订阅主题时只投递一次
+
+        同一处理函数的全部登记合并为一项，记录是否有常驻登记以及各一次性登记的标识
+        """
+        queues, handlers = [], []
+        for pattern, subscribed in self.subscribers.items():
+            if topic_matches(pattern, topic):
+                queues.extend(q for q in subscribed if not any(q is other for other in queues))
+        for pattern, entries in self.event_handlers.items():
+            if topic_matches(pattern, topic):
+                for token, handler, is_async, once in entries:
+                    index = next((i for i, other in enumerate(handlers) if other[0] == handler), None)
+                    if index is None:
+                        handlers.append((handler, is_async, not once, (token,) if once else ()))
+                    else:
+                        _, is_async, persistent, tokens = handlers[index]
+                        handlers[index] = (handler, is_async, persistent or not once,
+                                           tokens + (token,) if once else tokens)
+        return tuple(queues), tuple(handlers)
+
+    def publish_nowait(self, topic: str, message: Any):
+        """
+        同步发布事件到指定的具体主题，可在事件循环内的任意同步代码中调用
+
+        从分发索引取出匹配的订阅者后依次放入各队列，不加锁、不等待，由各订阅的消费协程处理；
+        直接调用的处理函数在此调用，一次性登记先按标识移除再调用，协程函数创建任务执行
+        """
+        stats = self._stats.get(topic)
+        if stats is None:
+            stats = self._stats[topic] = TopicStats()
+        stats.published += 1
+
+        route = self._routes.get(topic)
+        if route is None:
+            route = self._routes[topic] = self._resolve(topic)
+        queues, handlers = route
 
-        # 向所有队列发布消息
         for queue in queues:
+            if queue.put_nowait(message):
+                stats.delivered += 1
+            else:
+                stats.dropped += 1
+
+        for handler, is_async, persistent, once_tokens in handlers:
+            # 一次性登记已在嵌套发布中触发并移除时不再调用
+            if once_tokens and not self._remove_tokens(once_tokens) and not persistent:
+                continue
             try:
-                # 使用非阻塞put避免队列满时阻塞发布者
-                queue.put_nowait(message)
-            except asyncio.QueueFull:
-                # 队列满时记录警告
-                print(f"警告: 事件队列 {topic} 已满，丢弃消息")
-
-        # 执行所有一次性处理函数
-        for handler in handlers:
-            try:
-                # 使用create_task确保处理函数不会阻塞发布者
-                asyncio.create_task(handler(message))
+                if is_async:
+                    asyncio.create_task(handler(message))
+                else:
+                    handler(message)
+                stats.delivered += 1
             except Exception as e:
+                stats.errors += 1
                 print(f"处理事件 {topic} 时出错: {str(e)}")
 
+    async def publish(self, topic: str, message: Any):
+        """异步发布事件到指定主题，与 publish_nowait 相同，保留供已有代码 await 调用"""
+        self.publish_nowait(topic, message)
+
     async def get_event(self, topic: str, timeout: float = None) -> Any:
         """获取指定主题的事件（用于订阅者主动获取）"""
         queue = await self.subscribe(topic)
@@ -68,12 +490,32 @@ class PubSub:
             return await asyncio.wait_for(queue.get(), timeout=timeout)
         except asyncio.TimeoutError:
             return None
+        finally:
+            await self.unsubscribe(topic, queue)
+
+    def handler_stats(self) -> List[dict]:
+        """返回各处理函数订阅的积压、丢弃、处理次数和耗时"""
+        return [subscription.to_dict() for subscriptions in self.handler_subscriptions.values()
+                for subscription in subscriptions]
+
+    def stats(self, topic: Optional[str] = None) -> Dict[str, dict]:
+        """返回各具体主题的消息计数，指定 topic 时只返回与之匹配的主题"""
+        return {name: stats.to_dict() for name, stats in self._stats.items()
+                if topic is None or topic_matches(topic, name)}
 
     async def close(self):
-        """关闭PubSub系统，清理资源"""
-        async with self.lock:
-            self.subscribers.clear()
-            self.event_handlers.clear()
+        """关闭PubSub系统，停止所有消费协程，清理资源"""
+        for subscriptions in self.handler_subscriptions.values():
+            for subscription in subscriptions:
+                await subscription.close()
+        self.handler_subscriptions = {}
+        for queues in self.subscribers.values():
+            for queue in queues:
+                queue.clear()
+        self.subscribers = {}
+        self.event_handlers = {}
+        self._routes = {}
+        self._stats = {}
 
 
 # 全局事件总线实例
@@ -93,13 +535,34 @@ class EventType:
 
 
 class MarketDataEvent:
-    """市场数据事件"""
-    def __init__(self, symbol: str, interval: str, data: dict):
+    """
+    市场数据事件
+
+    事件对象直接经过事件总线传给订阅者，不再先转换为字典；
+    使用 __slots__，每条行情只分配这一个小对象，to_dict 只在序列化(如推送给前端)时调用。
+    支持 event['symbol'] 的下标访问，兼容按字典读取事件的处理函数
+    """
+    __slots__ = ('type', 'symbol', 'interval', 'data', 'timestamp')
+
+    def __init__(self, symbol: str, interval: str, data: dict, timestamp: Optional[float] = None):
+        """
+        :param data: 行情数据，如一根K线
+        :param timestamp: 事件时间，默认为当前的单调时钟时间(秒)
+        """
         self.type = EventType.MARKET_DATA
         self.symbol = symbol
         self.interval = interval
         self.data = data
-        self.timestamp = asyncio.get_event_loop().time()
+        self.timestamp = time.monotonic() if timestamp is None else timestamp
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
 
     def to_dict(self):
         return {
@@ -112,9 +575,12 @@ class MarketDataEvent:
 
 
 class OrderEvent:
-    """订单事件"""
-    def __init__(self, order_id: str, symbol: str, order_type: str, side: str, price: float, quantity: float, status: str):
-        self.type = EventType.ORDER_CREATED
+    """订单事件，同 MarketDataEvent 使用 __slots__ 并直接经过事件总线"""
+    __slots__ = ('type', 'order_id', 'symbol', 'order_type', 'side', 'price', 'quantity', 'status', 'timestamp')
+
+    def __init__(self, order_id: str, symbol: str, order_type: str, side: str, price: float, quantity: float,
+                 status: str, event_type: str = EventType.ORDER_CREATED, timestamp: Optional[float] = None):
+        self.type = event_type
         self.order_id = order_id
         self.symbol = symbol
         self.order_type = order_type
@@ -122,7 +588,10 @@ class OrderEvent:
         self.price = price
         self.quantity = quantity
         self.status = status
-        self.timestamp = asyncio.get_event_loop().time()
+        self.timestamp = time.monotonic() if timestamp is None else timestamp
+
+    __getitem__ = MarketDataEvent.__getitem__
+    get = MarketDataEvent.get
 
     def to_dict(self):
         return {
@@ -135,4 +604,4 @@ class OrderEvent:
             "quantity": self.quantity,
             "status": self.status,
             "timestamp": self.timestamp
-        }
\ No newline at end of file
+        }
@@ -1,13 +1,7 @@
-from tkinter import N
+# 各子命令只在执行时导入自身依赖的模块，
+# 避免 --help、config 或定时执行的 download-data 也加载Web UI、回测框架和交易所SDK，
+# 启动耗时见 benchmarks/cli_startup.py
 import click
-from zbot.common.config import read_config, write_config
-from zbot.exchange.exchange import ExchangeFactory
-from zbot.services.backtest import Backtest
-from zbot.ui.web.app import run_web_ui
-from zbot.utils.dateutils import parse_date_range
-import yaml
-from pathlib import Path
-import os
 
 
 @click.group()
@@ -29,11 +23,66 @@ def download_data(exchange, symbol, interval, start, end):
     click.echo(f"K线时间间隔: {interval}")
     click.echo(f"开始日期: {start}")
     click.echo(f"结束日期: {end}")
+    from zbot.common.config import read_config
+    from zbot.exchange.exchange import ExchangeFactory
     config = read_config('exchange').get(exchange)
     exchange = ExchangeFactory.create_exchange(exchange, config)
-    candles = exchange.download_data(
+    missing = exchange.download_data(
         symbol=symbol, interval=interval, start_time=start, end_time=end)
-    click.echo(f"下载完成，共获取{len(candles)}天K线数据")
+    click.echo(f"下载完成，共补齐{len(missing)}个缺失区间")
+
+
+@cli.command()
+@click.option('--exchange', default='binance', help='交易商名')
+@click.option('--symbols', default='', help='交易对列表，逗号分隔 例如 BTCUSDT,ETHUSDT')
+@click.option('--pattern', default='', help='交易对通配符，匹配交易对缓存 例如 */USDT')
+@click.option('--intervals', default='15m', help='K线时间间隔列表，逗号分隔 例如 1m,15m,1h')
+@click.option('--start', default='2025-01-01', help='开始日期 %Y-%m-%d 例如 2025-01-01')
+@click.option('--end', default='2025-01-31', help='结束日期 %Y-%m-%d 例如 2025-01-31')
+@click.option('--workers', default=4, help='同时执行的任务数')
+@click.option('--network-concurrency', default=8, help='最大并发网络请求数')
+@click.option('--write-concurrency', default=1, help='最大并发写库数')
+def download_batch(exchange, symbols, pattern, intervals, start, end, workers, network_concurrency,
+                   write_concurrency):
+    """批量下载多个交易对、多个时间周期的K线数据"""
+    from zbot.common.config import read_config
+    from zbot.exchange.binance.batch import resolve_symbols
+    from zbot.exchange.exchange import ExchangeFactory
+    config = read_config('exchange').get(exchange)
+    exchange = ExchangeFactory.create_exchange(exchange, config)
+    symbols = resolve_symbols([s for s in symbols.split(',') if s], pattern or None, exchange.markets_cache_name)
+    intervals = [i for i in intervals.split(',') if i]
+    if not symbols or not intervals:
+        click.echo("没有需要下载的交易对或时间周期")
+        return
+    click.echo(f"批量下载数据: {len(symbols)}个交易对 x {len(intervals)}个时间周期")
+
+    def on_progress(job, summary):
+        if job.status in ('completed', 'error'):
+            message = job.error if job.status == 'error' else f"补齐{job.missing}个缺失区间"
+            click.echo(f"[{summary['completed'] + summary['error']}/{summary['total']}] "
+                       f"{job.symbol} {job.interval} {job.status}: {message}")
+
+    jobs = exchange.download_batch(
+        symbols, intervals, start_time=start, end_time=end, workers=workers,
+        network_concurrency=network_concurrency, write_concurrency=write_concurrency, on_progress=on_progress)
+    failed = [job for job in jobs if job.status == 'error']
+    click.echo(f"批量下载完成，成功{len(jobs) - len(failed)}个，失败{len(failed)}个")
+
+
+@cli.command()
+@click.option('--exchange', default='binance', help='交易商名')
+@click.option('--symbol', default='BTCUSDT', help='交易对 例如 BTCUSDT')
+@click.option('--intervals', default='5m,15m,30m,1h,4h,1d', help='需要合成的K线时间间隔，逗号分隔')
+@click.option('--start', default='', help='开始日期 %Y-%m-%d，默认从最早的数据开始')
+@click.option('--end', default='', help='结束日期 %Y-%m-%d，默认到最新的数据')
+def resample_data(exchange, symbol, intervals, start, end):
+    """由1m K线合成其他时间间隔的K线并写入列式存储"""
+    from zbot.services.model import materialize_resampled_candles
+    symbol = symbol.replace('/', '')
+    for interval in [i for i in intervals.split(',') if i]:
+        count = materialize_resampled_candles(exchange, symbol, interval, start or None, end or None)
+        click.echo(f"{symbol} {interval}: 写入{count}根K线")
 
 
 @cli.command()
@@ -60,6 +109,7 @@ def config(exchange, api_key, secret_key, proxy_url, trading_mode):
     click.echo(f"secret key: {secret_key}")
     click.echo(f"代理url: {proxy_url}")
     click.echo(f"交易模式: {trading_mode}")
+    from zbot.common.config import read_config, write_config
     # 配置文件路径
     config_path = None
     # config_path = Path(os.path.dirname(os.path.abspath(__file__))).parent / 'config2.yaml'
@@ -94,18 +144,91 @@ def config(exchange, api_key, secret_key, proxy_url, trading_mode):
 @click.option('--commission', default=0.0, help='手续费')
 def backtesting(strategy, symbol, interval, cash, timerange, commission):
     """回测"""
+    from zbot.services.backtest import Backtest
+    from zbot.utils.dateutils import parse_date_range
     start, end = parse_date_range(timerange)
     backtest = Backtest(strategy, symbol, interval, start, end, cash, commission)
     stats = backtest.run()
     print(stats)
 
 
+@cli.command()
+@click.option('--strategy', help='策略名')
+@click.option('--symbol', help='交易对')
+@click.option('--interval', default='15m', help='K线时间间隔 例如 15m, 30m, 1h, 4h, 1d, 1m, 5m')
+@click.option('--cash', default=1000, help='初始资金')
+@click.option('--timerange', help='时间范围')
+@click.option('--commission', default=0.0, help='手续费')
+@click.option('--params', help='参数空间，JSON格式 例如 {"n1": [5, 10, 20], "n2": [30, 60]}')
+@click.option('--method', default='grid', type=click.Choice(['grid', 'random', 'bayes']), help='搜索方式')
+@click.option('--max-tries', default=None, type=int, help='最多尝试的参数组合数')
+@click.option('--maximize', default='Return [%]', help='最大化的统计指标')
+@click.option('--workers', default=None, type=int, help='进程数，默认为CPU核数')
+@click.option('--top', default=10, help='显示最优的结果数量')
+def optimize(strategy, symbol, interval, cash, timerange, commission, params, method, max_tries, maximize,
+             workers, top):
+    """并行优化策略参数"""
+    import json
+    from zbot.services.backtest import Backtest
+    from zbot.utils.dateutils import parse_date_range
+    start, end = parse_date_range(timerange)
+    backtest = Backtest(strategy, symbol, interval, start, end, cash, commission)
+    result = backtest.optimize(json.loads(params), method=method, max_tries=max_tries,
+                               maximize=maximize, workers=workers)
+    print(result.head(top).to_string())
+
+
+@cli.command()
+@click.option('--exchange', default=None, help='交易商名，默认为配置文件中的交易所')
+@click.option('--strategies', help='策略名列表，逗号分隔 例如 SmaCross,RsiStrategy')
+@click.option('--symbols', default='', help='交易对列表，逗号分隔 例如 BTCUSDT,ETHUSDT')
+@click.option('--pattern', default='', help='交易对通配符，匹配交易对缓存 例如 */USDT')
+@click.option('--intervals', default='15m', help='K线时间间隔列表，逗号分隔 例如 15m,1h,4h')
+@click.option('--timeranges', help='时间范围列表，逗号分隔 例如 20250101-20250301,20250301-20250601')
+@click.option('--cash', default=1000, help='初始资金')
+@click.option('--commission', default=0.0, help='手续费')
+@click.option('--workers', default=None, type=int, help='进程数，默认为CPU核数')
+@click.option('--output', default=None, help='汇总表保存路径，默认保存到 tmp/backtest_results')
+def backtesting_batch(exchange, strategies, symbols, pattern, intervals, timeranges, cash, commission, workers,
+                      output):
+    """批量回测多个策略、交易对、时间周期和时间范围"""
+    from zbot.services.batch_backtest import BatchBacktester
+    from zbot.utils.dateutils import parse_date_range
+    strategies = [s for s in strategies.split(',') if s]
+    symbols = [s for s in symbols.split(',') if s]
+    if pattern:
+        from zbot.exchange.binance.batch import resolve_symbols
+        from zbot.exchange.markets_cache import get_cache_name
+        symbols = resolve_symbols(symbols, pattern, get_cache_name(exchange))
+    intervals = [i for i in intervals.split(',') if i]
+    timeranges = [parse_date_range(t) for t in timeranges.split(',') if t]
+    if not strategies or not symbols or not intervals or not timeranges:
+        click.echo("没有需要回测的策略、交易对、时间周期或时间范围")
+        return
+
+    def on_progress(rows, done, total):
+        row = rows[0]
+        failed = sum(1 for r in rows if r['status'] == 'error')
+        click.echo(f"[{done}/{total}] {row['symbol']} {row['interval']} {row['start']}~{row['end']}: "
+                   f"{len(rows) - failed}个策略完成，{failed}个失败")
+
+    backtester = BatchBacktester(strategies, symbols, intervals, timeranges, cash, commission,
+                                 exchange=exchange, workers=workers, on_progress=on_progress)
+    click.echo(f"批量回测: {len(strategies)}个策略 x {len(symbols)}个交易对 x {len(intervals)}个时间周期 x "
+               f"{len(timeranges)}个时间范围，共{len(backtester.jobs)}个任务")
+    summary = backtester.run()
+    path = backtester.save(summary, output)
+    click.echo(summary.to_string())
+    click.echo(f"汇总表已保存: {path}")
+
+
 
 @cli.command()
 @click.option('--host', default='0.0.0.0', help='主机名')
 @click.option('--port', default=8080, help='端口号')
 def start_web_ui(host, port):
     """启动Web UI"""
+    from zbot.ui.web.app import run_web_ui
     run_web_ui(host, port)
 
 
@@ -13,10 +13,13 @@ import sys
 import argparse
 import datetime
 import json
+from importlib import import_module
 from playhouse.migrate import SqliteMigrator, migrate
+from zbot.common.config import base_path
 from zbot.services.db import database
+from zbot.models.applied_migration import AppliedMigration
 from zbot.models.backtest import BacktestRecord
-from zbot.models.candle import Candle
+from zbot.exchange.binance.models import Candle
 from zbot.models.log import Log
 
 
@@ -25,8 +28,7 @@ class MigrationManager:
     def __init__(self):
         self.db = database.db
         self.migrator = SqliteMigrator(self.db)
-        self.migrations_dir = os.path.join(
-            os.path.dirname(os.path.abspath(__file__)), 'migrations')
+        self.migrations_dir = os.path.join(base_path, 'models', 'migrations')
         self.init_migrations_dir()
         self.models = [BacktestRecord, Candle, Log]
 
@@ -76,54 +78,78 @@ class MigrationManager:
         print(f"生成迁移文件成功: {migration_path}")
         print(f"请编辑此文件添加迁移操作，然后运行 'python migrations.py migrate' 应用迁移")
 
-    def apply_migrations(self):
-        """应用所有未应用的迁移"""
-        # 读取已应用的迁移记录
-        applied_migrations_file = os.path.join(self.migrations_dir, 'applied_migrations.json')
-        applied_migrations = []
+    def load_applied_migrations(self):
+        """读取已应用的迁移记录
 
-        if os.path.exists(applied_migrations_file):
-            with open(applied_migrations_file, 'r', encoding='utf-8') as f:
-                applied_migrations = json.load(f)
+        记录保存在数据库的 applied_migrations 表中，每个数据库单独记录。
+        该表首次创建时导入旧版本保存在迁移目录 applied_migrations.json 中的记录
+
+        Returns:
+            已应用的迁移文件名集合
+        """
+        with database.connection():
+            if AppliedMigration._meta.table_name not in self.db.get_tables():
+                self.db.create_tables([AppliedMigration])
+                legacy_file = os.path.join(self.migrations_dir, 'applied_migrations.json')
+                if os.path.exists(legacy_file):
+                    with open(legacy_file, 'r', encoding='utf-8') as f:
+                        names = json.load(f)
+                    if names:
+                        AppliedMigration.insert_many(
+                            [{'name': name} for name in names]).on_conflict_ignore().execute()
+            return {migration.name for migration in AppliedMigration.select()}
+
+    def apply_migrations(self, verbose=True):
+        """应用所有未应用的迁移
+
+        Args:
+            verbose: 没有待应用的迁移时是否输出提示
+
+        Raises:
+            Exception: 迁移执行失败，失败的迁移不会记录为已应用
+        """
+        applied_migrations = self.load_applied_migrations()
 
         # 获取所有迁移文件
         migration_files = sorted([f for f in os.listdir(self.migrations_dir)
                                  if f.endswith('.py') and not f.startswith('__')])
 
+        pending = [f for f in migration_files if f not in applied_migrations]
+        if not pending:
+            if verbose:
+                print("没有需要应用的迁移")
+            return
+
         # 应用未应用的迁移
-        for migration_file in migration_files:
-            if migration_file not in applied_migrations:
-                print(f"应用迁移: {migration_file}")
-                migration_module = __import__(
-                    f"zbot.services.migrations.{migration_file[:-3]}",
-                    fromlist=['up']
-                )
-                try:
-                    database.open_connection()
+        for migration_file in pending:
+            print(f"应用迁移: {migration_file}")
+            migration_module = import_module(f"zbot.models.migrations.{migration_file[:-3]}")
+            try:
+                with database.connection():
                     migration_module.up()
-                    applied_migrations.append(migration_file)
-                    print(f"迁移 {migration_file} 应用成功")
-                except Exception as e:
-                    print(f"迁移 {migration_file} 应用失败: {str(e)}")
-                finally:
-                    database.db.close()
-
-        # 保存已应用的迁移记录
-        with open(applied_migrations_file, 'w', encoding='utf-8') as f:
-            json.dump(applied_migrations, f, ensure_ascii=False, indent=2)
+                    AppliedMigration.create(name=migration_file)
+                print(f"迁移 {migration_file} 应用成功")
+            except Exception as e:
+                # 后续迁移可能依赖该迁移，失败后不再继续
+                print(f"迁移 {migration_file} 应用失败: {str(e)}")
+                raise
 
         print("所有迁移已应用完成")
 
-    def create_tables(self):
-        """创建所有模型表"""
+    def create_tables(self, verbose=True):
+        """创建所有模型表，已存在的表跳过
+
+        Args:
+            verbose: 是否输出创建成功的提示
+        """
         try:
-            database.open_connection()
-            self.db.create_tables(self.models)
-            print("所有表创建成功")
+            with database.connection():
+                self.db.create_tables(self.models)
+            if verbose:
+                print("所有表创建成功")
         except Exception as e:
             print(f"创建表失败: {str(e)}")
-        finally:
-            database.db.close()
+            raise
 
 
 def main():
@@ -3,31 +3,9 @@ from importlib import import_module
 from typing import List, Optional, Any, Tuple, Dict
 import pandas as pd
 from datetime import timedelta
-import re
-from zbot.utils.dateutils import str_to_timestamp, timestamp_to_datetime
+from zbot.utils.dateutils import parse_timeframe, str_to_timestamp, timestamp_to_datetime
 
 
-def parse_timeframe(timeframe: str) -> timedelta:
-    """
-    将时间周期字符串转换为timedelta对象
-
-    :param timeframe: 时间周期字符串，如'1m', '5m', '1h', '1d'
-    :return: 对应的timedelta对象
-    :raises ValueError: 如果时间周期格式无效
-    """
-    match = re.match(r'^(\d+)([mhd])$', timeframe)
-    if not match:
-        raise ValueError(f"无效的时间周期格式: {timeframe}, 应为数字加单位(m/h/d)")
-    value, unit = int(match.group(1)), match.group(2)
-    if unit == 'm':
-        return timedelta(minutes=value)
-    elif unit == 'h':
-        return timedelta(hours=value)
-    elif unit == 'd':
-        return timedelta(days=value)
-    else:
-        raise ValueError(f"不支持的时间单位: {unit}, 支持的单位为m/h/d")
-
 def fill_missing_candles(candles: List[Any], timeframe: str) -> Tuple[List[Any], List[datetime]]:
     """
     识别并填充K线数据中的缺失值，使用均值填充法，并记录缺失的数据点
@@ -100,17 +78,125 @@ def fill_missing_candles(candles: List[Any], timeframe: str) -> Tuple[List[Any],
 
     return filled_candles, missing_times
 
+def get_candle_model(exchange: str):
+    """根据交易所名称动态导入对应的Candle模型
+
+    :param exchange: 交易所名称(如'binance')
+    :return: Candle模型类
+    :raises ValueError: 不支持的交易所
+    """
+    try:
+        candle_module = import_module(f"zbot.exchange.{exchange}.models")
+        return candle_module.Candle
+    except ImportError:
+        raise ValueError(f"不支持的交易所: {exchange}")
+
+
+def read_candles_from_sqlite(
+    exchange: str,
+    symbol: str,
+    timeframe: str,
+    start: Optional[int] = None,
+    end: Optional[int] = None
+) -> pd.DataFrame:
+    """直接通过SQL读取SQLite中的K线数据，不构造ORM模型实例
+
+    :param start: 开始时间戳(含)，为None时不限制
+    :param end: 结束时间戳(含)，为None时不限制
+    :return: 按open_time升序、去重后的K线数据
+    """
+    from zbot.services.db import database
+    Candle = get_candle_model(exchange)
+    columns = [field for field in Candle._meta.sorted_fields if field.name != 'id']
+    condition = (Candle.symbol == Candle.get_by_symbol(symbol)) & (Candle.timeframe == timeframe)
+    if start is not None:
+        condition &= Candle.open_time >= start
+    if end is not None:
+        condition &= Candle.open_time <= end
+    sql, params = Candle.select(*columns).where(condition).order_by(Candle.open_time).sql()
+    with database.connection() as conn:
+        df = pd.read_sql_query(sql, conn, params=params)
+    df.columns = [field.name for field in columns]
+    return df.drop_duplicates(subset=['open_time'], keep='first')
+
+
+def sync_candle_store(exchange: str, symbol: str, timeframe: str) -> int:
+    """将SQLite中某个K线序列增量导出到列式存储
+
+    只导出 open_time 大于同步水位线的K线，首次同步时导出全部数据。
+    早于水位线补写的K线由 save_candles_to_store 直接写入列式存储
+
+    :return: 导出的行数，没有新数据时返回0
+    """
+    from zbot.services.candle_store import candle_store
+    synced_until = candle_store.synced_until(exchange, symbol, timeframe)
+    start = None if synced_until is None else synced_until + 1
+    df = read_candles_from_sqlite(exchange, symbol, timeframe, start=start)
+    if df.empty:
+        return 0
+    count = candle_store.write(exchange, symbol, timeframe, df)
+    candle_store.mark_synced(exchange, symbol, timeframe, df['open_time'].iloc[-1])
+    return count
+
+
+def save_candles_to_store(exchange: str, symbol: str, timeframe: str, df: pd.DataFrame) -> int:
+    """将新写入数据库的K线同步写入列式存储
+
+    df 已写入数据库，晚于同步水位线的部分由增量导出写入，早于水位线补写的部分直接写入，
+    每行只写入一次；写入基础周期(1m)K线后，重新合成受影响的物化周期K线
+    """
+    from zbot.services.candle_store import candle_store
+    from zbot.services.resample import BASE_TIMEFRAME
+    if df is None or df.empty:
+        return 0
+    synced_until = candle_store.synced_until(exchange, symbol, timeframe)
+    sync_candle_store(exchange, symbol, timeframe)
+    count = len(df)
+    if synced_until is not None:
+        # 增量导出只包含水位线之后的数据，补写的历史K线需要合并到已有分区
+        candle_store.write(exchange, symbol, timeframe, df[df['open_time'] <= synced_until])
+    if timeframe == BASE_TIMEFRAME:
+        open_time = df['open_time'].to_numpy()
+        refresh_resampled_candles(exchange, symbol, int(open_time.min()), int(open_time.max()))
+    return count
+
+
+def refresh_resampled_candles(exchange: str, symbol: str, start: int, end: int) -> int:
+    """重新合成包含指定时间范围的物化周期K线
+
+    新的1m数据可能补齐了之前不完整而被丢弃的K线，或使最新一根K线收盘，
+    因此覆盖该范围的每根物化K线都重新合成并写入
+
+    :param start: 新写入1m数据的最小开盘时间戳(微秒)
+    :param end: 新写入1m数据的最大开盘时间戳(微秒)
+    :return: 写入的K线数量
+    """
+    from zbot.services.candle_store import candle_store
+    from zbot.services.resample import BASE_TIMEFRAME, get_bucket_bounds
+    count = 0
+    for timeframe in candle_store.list_timeframes(exchange, symbol):
+        if timeframe == BASE_TIMEFRAME or not candle_store.is_resampled(exchange, symbol, timeframe):
+            continue
+        # 对齐到包含start的K线开盘时间，否则该K线会被开盘时间过滤掉
+        bucket_start = int(get_bucket_bounds([start], timeframe)[0][0])
+        df = resample_candles_from_db(exchange, symbol, timeframe, bucket_start, end)
+        count += candle_store.write(exchange, symbol, timeframe, df)
+    return count
+
+
 def get_candles_from_db(
     exchange: str,
     symbol: str,
     timeframe: str,
     start: str,
-    end: str
+    end: str,
+    resample: Optional[bool] = None
 ) -> pd.DataFrame:
-    """从数据库读取指定交易所的K线数据并进行排序和去重
+    """读取指定交易所的K线数据，结果按时间戳升序排序并去重
 
-    根据交易所动态导入对应的Candle模型，查询指定时间范围内的K线数据，
-    按时间戳升序排序并去除重复数据后返回
+    优先从列式存储(Parquet)读取，open_time范围下推到文件行组，不经过ORM；
+    读取前先将SQLite中新增的K线增量导出到列式存储。
+    非基础周期的数据可由基础周期(1m)的K线实时合成
 
     参数:
         exchange: 交易所名称(如'binance')
@@ -118,6 +204,8 @@ def get_candles_from_db(
         timeframe: K线周期(如'1m')
         start: 开始时间
         end: 结束时间
+        resample: 是否由1m数据合成，None时仅在该周期没有数据时合成，
+            True时总是合成，False时只读取已存储的数据
 
     返回:
         pd.DataFrame: 去重并排序后的K线数据，包含以下列:
@@ -129,33 +217,72 @@ def get_candles_from_db(
             - volume: 成交量
             其他列根据交易所模型可能有所不同
     """
-    # 动态导入对应交易所的Candle模型
-    try:
-        candle_module = import_module(f"zbot.exchange.{exchange}.models")
-        Candle = candle_module.Candle
-    except ImportError:
-        raise ValueError(f"不支持的交易所: {exchange}")
-    start = str_to_timestamp(start, 'us')
-    end = str_to_timestamp(end, 'us')
-    symbol = Candle.get_by_symbol(symbol)
-    # 查询指定条件的K线数据并按时间戳排序
-    candles = list(
-        Candle.select().where(
-            (Candle.symbol == symbol)
-            & (Candle.timeframe == timeframe)
-            & Candle.open_time.between(start, end)
-        ).order_by(Candle.open_time)
-    )
-
-    # 基于时间戳去重，保留第一个出现的记录
-    seen_timestamps = set()
-    unique_candles = []
-    for candle in candles:
-        if candle.open_time not in seen_timestamps:
-            seen_timestamps.add(candle.open_time)
-            unique_candles.append(candle)
-    pd_candles = pd.DataFrame([candle.__data__ for candle in candles])
-    return pd_candles
+    from zbot.services.candle_store import candle_store
+    from zbot.services.resample import BASE_TIMEFRAME
+    get_candle_model(exchange)
+    start = str_to_timestamp(start, 'us') if start else None
+    end = str_to_timestamp(end, 'us') if end else None
+    if timeframe == BASE_TIMEFRAME:
+        resample = False
+    if not resample:
+        sync_candle_store(exchange, symbol, timeframe)
+        df = candle_store.read(exchange, symbol, timeframe, start, end)
+        if resample is False or not df.empty:
+            return df
+    return resample_candles_from_db(exchange, symbol, timeframe, start, end)
+
+
+def resample_candles_from_db(
+    exchange: str,
+    symbol: str,
+    timeframe: str,
+    start: Optional[int] = None,
+    end: Optional[int] = None
+) -> pd.DataFrame:
+    """读取基础周期(1m)K线并合成为目标周期
+
+    :param start: 开始时间戳(微秒，含)，按目标周期的开盘时间过滤
+    :param end: 结束时间戳(微秒，含)
+    :return: 目标周期K线，不包含1m数据不完整的K线
+    """
+    from zbot.services.candle_store import candle_store
+    from zbot.services.resample import BASE_TIMEFRAME, get_bucket_bounds, resample_candles
+    # 读取范围扩展到目标周期K线的完整边界
+    base_start = int(get_bucket_bounds([start], timeframe)[0][0]) if start is not None else None
+    base_end = int(get_bucket_bounds([end], timeframe)[1][0]) - 1 if end is not None else None
+    sync_candle_store(exchange, symbol, BASE_TIMEFRAME)
+    base = candle_store.read(exchange, symbol, BASE_TIMEFRAME, base_start, base_end)
+    df = resample_candles(base, timeframe)
+    if df.empty:
+        return df
+    if start is not None:
+        df = df[df['open_time'] >= start]
+    if end is not None:
+        df = df[df['open_time'] <= end]
+    return df.reset_index(drop=True)
+
+
+def materialize_resampled_candles(
+    exchange: str,
+    symbol: str,
+    timeframe: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None
+) -> int:
+    """由1m数据合成目标周期K线并写入列式存储，之后读取该周期时无需再实时计算，
+    该周期随之后写入的1m数据自动更新
+
+    :param start: 开始时间，为None时从最早的数据开始
+    :param end: 结束时间，为None时到最新的数据
+    :return: 写入的K线数量
+    """
+    from zbot.services.candle_store import candle_store
+    start = str_to_timestamp(start, 'us') if start else None
+    end = str_to_timestamp(end, 'us') if end else None
+    df = resample_candles_from_db(exchange, symbol, timeframe, start, end)
+    # 标记为物化序列，之后写入1m数据时自动重新合成
+    candle_store.mark_resampled(exchange, symbol, timeframe)
+    return candle_store.write(exchange, symbol, timeframe, df)
 
 
 def analyze_candle_data_completeness(
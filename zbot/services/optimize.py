@@ -0,0 +1,186 @@
+# coding=utf-8
+"""
+回测参数优化
+
+候选参数在主进程中生成(网格/随机/贝叶斯)，回测在进程池中并行执行:
+    - K线只从数据库读取一次，保存为临时目录下的 .npy 文件，子进程以写时复制的内存映射方式打开，
+      所有进程共享同一份页缓存，任务之间不再序列化K线数据
+    - 每个子进程只在启动时构造一次 DataFrame 和策略类，任务只传递参数字典
+    - 子进程只返回标量统计指标，主进程汇总后按批写入 BacktestRecord
+
+贝叶斯搜索使用简化的TPE(Tree-structured Parzen Estimator):
+已完成的结果按目标值分为较好和较差两组，按各参数取值在两组中出现的频率估计概率，
+在未尝试的组合中选取 较好组概率/较差组概率 最大的组合。
+"""
+import itertools
+import logging
+import math
+import os
+import random
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 传给策略的K线列
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+# 未指定 max_tries 时随机/贝叶斯搜索的尝试次数
+DEFAULT_MAX_TRIES = 100
+# 贝叶斯搜索先随机尝试的次数，之后才按已有结果建模
+TPE_INITIAL_TRIES = 10
+# 较好组占已完成结果的比例
+TPE_GAMMA = 0.25
+# 每次建议时参与评估的候选组合数量
+TPE_CANDIDATES = 256
+
+# 子进程中的回测实例，由 _init_worker 创建
+_worker = {}
+
+
+def _init_worker(data_dir: str, strategy: str, cash: float, commission: float):
+    """子进程初始化: 映射共享的K线文件并创建回测实例"""
+    from zbot.services.backtest import CustomBacktest
+    from zbot.strategies.strategy_loader import load_strategy_class
+    # mmap_mode='c' 为写时复制，未修改的页面在所有进程间共享
+    values = np.load(os.path.join(data_dir, 'ohlcv.npy'), mmap_mode='c')
+    index = np.load(os.path.join(data_dir, 'index.npy'), mmap_mode='c')
+    candles = pd.DataFrame(values, index=pd.DatetimeIndex(index), columns=OHLCV_COLUMNS, copy=False)
+    _worker['bt'] = CustomBacktest(candles, load_strategy_class(strategy), cash=cash,
+                                   commission=commission, exclusive_orders=True)
+
+
+def _run_task(params: dict):
+    """在子进程中按参数运行一次回测，返回 (参数, 标量统计指标)"""
+    stats = _worker['bt'].run(**params)
+    return params, {key: value for key, value in stats.items() if not key.startswith('_')}
+
+
+def share_candles(candles: pd.DataFrame, data_dir: str):
+    """将回测K线写入 data_dir，供子进程内存映射"""
+    np.save(os.path.join(data_dir, 'ohlcv.npy'),
+            np.ascontiguousarray(candles[OHLCV_COLUMNS].to_numpy(dtype=np.float64)))
+    np.save(os.path.join(data_dir, 'index.npy'), candles.index.to_numpy(dtype='datetime64[ns]'))
+
+
+class ParameterOptimizer(object):
+    """候选参数生成器，method 为 grid(网格)、random(随机) 或 bayes(TPE)"""
+
+    METHODS = ('grid', 'random', 'bayes')
+
+    def __init__(self, space: Dict[str, Iterable], method: str = 'grid', max_tries: Optional[int] = None,
+                 constraint: Optional[Callable[[dict], bool]] = None, random_state: Optional[int] = None):
+        """
+        :param space: 参数空间，如 {'n1': range(5, 30, 5), 'n2': [20, 40, 60]}
+        :param method: 搜索方式
+        :param max_tries: 最多尝试的组合数，网格搜索默认尝试全部组合
+        :param constraint: 参数约束，返回False的组合被跳过，如 lambda p: p['n1'] < p['n2']
+        :param random_state: 随机种子
+        """
+        if method not in self.METHODS:
+            raise ValueError(f"不支持的优化方式: {method}，可选 {', '.join(self.METHODS)}")
+        self.names = list(space)
+        self.values = {name: list(values) for name, values in space.items()}
+        empty = [name for name, values in self.values.items() if not values]
+        if not self.names or empty:
+            raise ValueError(f"参数空间不能为空: {empty or space}")
+        self.method = method
+        self.random = random.Random(random_state)
+        # 满足约束的全部组合，以取值元组表示
+        self.combinations = [combo for combo in itertools.product(*self.values.values())
+                             if constraint is None or constraint(dict(zip(self.names, combo)))]
+        if not self.combinations:
+            raise ValueError("没有满足约束的参数组合")
+        if max_tries is None:
+            max_tries = len(self.combinations) if method == 'grid' else DEFAULT_MAX_TRIES
+        self.max_tries = min(max_tries, len(self.combinations))
+        self._untried = list(self.combinations)
+        if method != 'grid':
+            self.random.shuffle(self._untried)
+        self._suggested = 0
+        # 已完成的 (组合, 目标值)
+        self._observations = []
+
+    def has_next(self) -> bool:
+        return self._suggested < self.max_tries and bool(self._untried)
+
+    def suggest(self) -> dict:
+        """返回下一组待尝试的参数"""
+        if self.method == 'bayes' and len(self._observations) >= TPE_INITIAL_TRIES:
+            combo = self._suggest_tpe()
+        else:
+            combo = self._untried.pop(0)
+        self._suggested += 1
+        return dict(zip(self.names, combo))
+
+    def observe(self, params: dict, score: float):
+        """记录一组参数的目标值，NaN视为最差"""
+        score = float(score)
+        if math.isnan(score):
+            score = -math.inf
+        self._observations.append((tuple(params[name] for name in self.names), score))
+
+    def _suggest_tpe(self) -> tuple:
+        ranked = sorted(self._observations, key=lambda item: item[1], reverse=True)
+        n_good = max(1, int(len(ranked) * TPE_GAMMA))
+        good = [combo for combo, _ in ranked[:n_good]]
+        bad = [combo for combo, _ in ranked[n_good:]]
+
+        def density(group, i, value):
+            # 加1平滑，未出现的取值保留被选中的机会
+            hits = sum(1 for combo in group if combo[i] == value)
+            return (hits + 1) / (len(group) + len(self.values[self.names[i]]))
+
+        candidates = self._untried[:TPE_CANDIDATES]
+        best = max(candidates, key=lambda combo: sum(
+            math.log(density(good, i, value) / density(bad, i, value)) for i, value in enumerate(combo)))
+        self._untried.remove(best)
+        return best
+
+
+def run_optimization(candles: pd.DataFrame, strategy: str, cash: float, commission: float,
+                     optimizer: ParameterOptimizer, maximize='Return [%]', workers: Optional[int] = None,
+                     on_result: Optional[Callable[[dict, dict], None]] = None) -> pd.DataFrame:
+    """
+    在进程池中运行参数优化
+
+    :param candles: 回测K线，索引为时间，包含 OHLCV_COLUMNS 列
+    :param maximize: 最大化的统计指标名称，或接收统计指标字典返回数值的函数(在主进程中调用)
+    :param workers: 进程数，默认为CPU核数
+    :param on_result: 每完成一组参数时在主进程中调用 on_result(params, stats)
+    :return: 全部结果，每行为一组参数及其统计指标，按目标值降序排列
+    """
+    workers = workers or os.cpu_count() or 1
+    score = maximize if callable(maximize) else (lambda stats: stats[maximize])
+    rows = []
+    with tempfile.TemporaryDirectory(prefix='zbot-optimize-') as data_dir:
+        share_candles(candles, data_dir)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(data_dir, strategy, cash, commission)) as pool:
+            pending = {}
+            while optimizer.has_next() or pending:
+                # 贝叶斯搜索依赖已完成的结果，只保持每个进程一个任务在运行
+                while optimizer.has_next() and len(pending) < workers:
+                    params = optimizer.suggest()
+                    pending[pool.submit(_run_task, params)] = params
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    params = pending.pop(future)
+                    try:
+                        _, stats = future.result()
+                    except Exception as e:
+                        logger.warning(f"参数 {params} 回测失败: {e}")
+                        optimizer.observe(params, math.nan)
+                        continue
+                    value = score(stats)
+                    optimizer.observe(params, value)
+                    if on_result is not None:
+                        on_result(params, stats)
+                    rows.append({**params, **stats, '_score': value})
+    if not rows:
+        return pd.DataFrame(columns=optimizer.names)
+    result = pd.DataFrame(rows).sort_values('_score', ascending=False, na_position='last')
+    return result.drop(columns='_score').reset_index(drop=True)
@@ -0,0 +1,119 @@
+"""
+K线周期重采样模块
+
+由基础周期(1m)的K线合成任意更大周期的K线，按目标周期的起始时间分桶后，
+用 NumPy 的 reduceat 对每列一次性完成聚合，不逐行循环。
+这样每个交易对只需下载一个1m序列，其余周期均可按需计算或物化到列式存储。
+
+分桶规则与币安一致:
+    - 分钟/小时/天: 从UTC 1970-01-01 00:00 起按固定长度对齐
+    - 周: 从周一 00:00 起对齐
+    - 月: 按自然月对齐
+"""
+import re
+from typing import Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from zbot.utils.dateutils import parse_timeframe
+
+
+# 默认的基础周期
+BASE_TIMEFRAME = '1m'
+# 1970-01-01 为周四，周K线从周一(1970-01-05)开始对齐
+WEEK_OFFSET_US = 4 * 86400 * 10 ** 6
+# 各列的聚合方式，未列出的列取桶内最后一根K线的值
+AGGREGATIONS = {
+    'open': 'first',
+    'high': 'max',
+    'low': 'min',
+    'close': 'last',
+    'volume': 'sum',
+    'quote_volume': 'sum',
+    'count': 'sum',
+    'taker_buy_volume': 'sum',
+    'taker_buy_quote_volume': 'sum',
+    'ignore': 'first',
+}
+
+
+def timeframe_to_us(timeframe: str) -> int:
+    """将时间周期转换为微秒数，月按30天计算"""
+    return int(parse_timeframe(timeframe).total_seconds()) * 10 ** 6
+
+
+def get_bucket_bounds(open_time: np.ndarray, timeframe: str):
+    """
+    计算每个时间戳所属目标周期K线的起止时间
+
+    :param open_time: 开盘时间戳数组(微秒)
+    :param timeframe: 目标周期
+    :return: (桶开始时间, 下一个桶开始时间) 两个微秒时间戳数组
+    """
+    open_time = np.asarray(open_time, dtype=np.int64)
+    value, unit = re.match(r'^(\d+)([smhdwM])$', timeframe).groups()
+    if unit == 'M':
+        months = open_time.astype('datetime64[us]').astype('datetime64[M]').astype(np.int64)
+        months -= months % int(value)
+        start = months.astype('datetime64[M]').astype('datetime64[us]').astype(np.int64)
+        end = (months + int(value)).astype('datetime64[M]').astype('datetime64[us]').astype(np.int64)
+        return start, end
+    step = timeframe_to_us(timeframe)
+    offset = WEEK_OFFSET_US if unit == 'w' else 0
+    start = (open_time - offset) // step * step + offset
+    return start, start + step
+
+
+def resample_candles(
+    candles: Union[pd.DataFrame, Dict[str, np.ndarray]],
+    timeframe: str,
+    base_timeframe: str = BASE_TIMEFRAME,
+    drop_partial: bool = True
+) -> pd.DataFrame:
+    """
+    将基础周期K线合成为目标周期K线
+
+    :param candles: 按 open_time 升序且无重复的基础周期K线，open_time 为微秒时间戳
+    :param timeframe: 目标周期，如 '5m', '1h', '1d', '1w', '1M'
+    :param base_timeframe: 基础周期
+    :param drop_partial: 是否丢弃基础周期K线不完整的桶(中间缺失数据、数据范围从桶中间开始或最后一根尚未结束)
+    :return: 目标周期K线，close_time 为桶结束时间减1微秒
+    """
+    df = candles if isinstance(candles, pd.DataFrame) else pd.DataFrame(candles, copy=False)
+    if df.empty:
+        return df.copy()
+    if timeframe == base_timeframe:
+        return df.reset_index(drop=True)
+
+    open_time = df['open_time'].to_numpy(dtype=np.int64)
+    bucket_start, bucket_end = get_bucket_bounds(open_time, timeframe)
+    # 每个桶第一根K线的下标，reduceat 按这些下标分段聚合
+    first = np.flatnonzero(np.r_[True, bucket_start[1:] != bucket_start[:-1]])
+    last = np.r_[first[1:] - 1, len(open_time) - 1]
+
+    result = {'open_time': bucket_start[first]}
+    for name in df.columns:
+        if name in ('open_time', 'close_time'):
+            continue
+        values = df[name].to_numpy()
+        how = AGGREGATIONS.get(name, 'last')
+        if how == 'first':
+            result[name] = values[first]
+        elif how == 'last':
+            result[name] = values[last]
+        elif how == 'max':
+            result[name] = np.maximum.reduceat(values, first)
+        elif how == 'min':
+            result[name] = np.minimum.reduceat(values, first)
+        else:
+            result[name] = np.add.reduceat(values, first)
+    if 'close_time' in df.columns:
+        result['close_time'] = bucket_end[first] - 1
+    resampled = pd.DataFrame(result)[list(df.columns)]
+
+    if drop_partial:
+        # 输入无重复，桶内K线数少于桶长度对应的基础周期K线数即为不完整
+        expected = (bucket_end[first] - bucket_start[first]) // timeframe_to_us(base_timeframe)
+        resampled = resampled[last - first + 1 >= expected]
+    return resampled.reset_index(drop=True)
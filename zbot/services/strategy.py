@@ -1,8 +1,9 @@
 from abc import abstractmethod
 import asyncio
-from typing import Dict, List, Optional, Any
+import functools
+from typing import Dict, List, Optional, Any, Callable
 from zbot.strategies.base_strategy import BaseStrategy
-from zbot.services.events import event_bus, EventType
+from zbot.services.events import event_bus, EventType, MarketDataEvent, OrderEvent, make_topic
 from zbot.common.config import read_config
 from zbot.exchange.exchange import ExchangeFactory
 
@@ -27,7 +28,16 @@ class AsyncDataProvider:
 
 
 class AsyncBaseStrategy(BaseStrategy):
-    """异步策略基类，继承自BaseStrategy，添加异步支持"""
+    """
+    异步策略基类，继承自BaseStrategy，添加异步支持
+
+    执行方式由参数控制:
+        tick_interval: 定时调用 on_strategy_tick 的间隔(秒)，为0或None时不定时调用；
+                       默认轮询模式为1秒，事件驱动模式为None
+        event_driven: 为True时收到本策略交易对的行情或订单事件后立即唤醒主循环，
+                      对有新事件的每个交易对调用 on_strategy_event，延迟只取决于处理耗时
+        debounce: 事件驱动模式下，同一交易对收到事件后等待的秒数，期间的事件合并为一次唤醒，默认0
+    """
 
     def __init__(self, params: Dict = None):
         super().__init__(params)
@@ -44,6 +54,24 @@ class AsyncBaseStrategy(BaseStrategy):
             EventType.ORDER_CANCELLED: self.on_order_cancelled,
             EventType.ACCOUNT_UPDATE: self.on_account_update
         }
+        # 已订阅的 (主题, 处理函数)
+        self._subscriptions = []
+        # 事件驱动模式下待处理的交易对、唤醒主循环的事件和各交易对的合并计时器
+        self._pending_symbols = set()
+        self._wakeup = None
+        self._debounce_timers: Dict[str, asyncio.TimerHandle] = {}
+
+    @property
+    def event_driven(self) -> bool:
+        return bool(self.params.get('event_driven', False))
+
+    @property
+    def tick_interval(self) -> Optional[float]:
+        return self.params.get('tick_interval', None if self.event_driven else 1)
+
+    @property
+    def debounce(self) -> float:
+        return self.params.get('debounce', 0) or 0
 
     async def initialize(self, connector: 'AsyncExchange', data_provider: Any):
         """异步初始化策略"""
@@ -58,9 +86,14 @@ class AsyncBaseStrategy(BaseStrategy):
         self._exchange.set_account_config(self.params)
 
         self._running = True
-        # 订阅事件
-        for event_type, handler in self._event_handlers.items():
-            await event_bus.subscribe_once(event_type, handler)
+        self._wakeup = asyncio.Event()
+        # 只订阅本策略交易对的事件，每个处理函数由各自的消费协程按顺序调用
+        self._subscriptions = self.get_subscriptions()
+        if self.event_driven:
+            self._subscriptions = [(topic, self._wake_after(handler)) for topic, handler in self._subscriptions]
+        batch_size = self.params.get('event_batch_size', 1)
+        for topic, handler in self._subscriptions:
+            await event_bus.subscribe_handler(topic, handler, batch_size=batch_size)
 
         # 启动主策略任务
         self._task = asyncio.create_task(self._run_strategy())
@@ -80,17 +113,92 @@ class AsyncBaseStrategy(BaseStrategy):
             except asyncio.CancelledError:
                 pass
 
+        for topic, handler in self._subscriptions:
+            await event_bus.unsubscribe_handler(topic, handler)
+        self._subscriptions = []
+        for timer in self._debounce_timers.values():
+            timer.cancel()
+        self._debounce_timers.clear()
+        self._pending_symbols.clear()
+
         # 取消所有未完成订单
         await self.cancel_all_orders()
         await self.on_strategy_stop()
 
+    @property
+    def symbols(self) -> List[str]:
+        """策略交易的交易对，取自参数 symbols 或 symbol"""
+        symbols = self.params.get('symbols') or self.params.get('symbol') or []
+        return [symbols] if isinstance(symbols, str) else list(symbols)
+
+    def get_subscriptions(self) -> List[tuple]:
+        """
+        返回策略需要订阅的 (主题, 处理函数) 列表，子类可重写
+
+        配置了交易对时，行情只订阅 market_data.<交易所>.<交易对>[.<时间周期>]，
+        订单事件只订阅 <订单事件类型>.<交易所>.<交易对>；未配置交易对时订阅全部事件
+        """
+        symbols = self.symbols
+        if not symbols:
+            return list(self._event_handlers.items())
+        exchange = getattr(self._connector, 'exchange_name', None)
+        subscriptions = []
+        for event_type, handler in self._event_handlers.items():
+            if event_type == EventType.MARKET_DATA:
+                subscriptions.extend((make_topic(event_type, exchange, symbol, self.params.get('interval')), handler)
+                                     for symbol in symbols)
+            elif event_type == EventType.ACCOUNT_UPDATE:
+                subscriptions.append((event_type, handler))
+            else:
+                subscriptions.extend((make_topic(event_type, exchange, symbol), handler) for symbol in symbols)
+        return subscriptions
+
+    def _wake_after(self, handler: Callable) -> Callable:
+        """包装事件处理函数，处理完成后唤醒事件所属交易对"""
+        @functools.wraps(handler)
+        async def handle(event):
+            await handler(event)
+            self.notify(event.get('symbol'))
+        return handle
+
+    def notify(self, symbol: Optional[str]):
+        """标记交易对有新事件并唤醒主循环，尚未处理的同一交易对只唤醒一次"""
+        if symbol is None or symbol in self._pending_symbols or symbol in self._debounce_timers:
+            return
+        if self.debounce > 0:
+            self._debounce_timers[symbol] = asyncio.get_running_loop().call_later(
+                self.debounce, self._ready, symbol)
+        else:
+            self._ready(symbol)
+
+    def _ready(self, symbol: str):
+        self._debounce_timers.pop(symbol, None)
+        self._pending_symbols.add(symbol)
+        self._wakeup.set()
+
     async def _run_strategy(self):
-        """策略主循环"""
+        """策略主循环，按 tick_interval 定时调用 on_strategy_tick，被事件唤醒时调用 on_strategy_event"""
+        loop = asyncio.get_running_loop()
+        tick_interval = self.tick_interval
+        next_tick = loop.time()
         while self._running:
             try:
-                await self.on_strategy_tick()
-                # 根据策略需求调整循环间隔
-                await asyncio.sleep(self.params.get('tick_interval', 1))
+                if tick_interval:
+                    timeout = next_tick - loop.time()
+                    if timeout <= 0:
+                        next_tick = loop.time() + tick_interval
+                        await self.on_strategy_tick()
+                        continue
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        continue
+                else:
+                    await self._wakeup.wait()
+                self._wakeup.clear()
+                symbols, self._pending_symbols = self._pending_symbols, set()
+                for symbol in symbols:
+                    await self.on_strategy_event(symbol)
             except Exception as e:
                 print(f"策略运行错误: {str(e)}")
                 await asyncio.sleep(1)  # 出错后延迟一秒再试
@@ -111,23 +219,27 @@ class AsyncBaseStrategy(BaseStrategy):
         """策略主循环回调"""
         pass
 
-    async def on_market_data(self, data: Dict):
+    async def on_strategy_event(self, symbol: str):
+        """事件驱动模式下交易对有新事件时的回调，默认调用 on_strategy_tick"""
+        await self.on_strategy_tick()
+
+    async def on_market_data(self, data: MarketDataEvent):
         """市场数据事件处理"""
         pass
 
-    async def on_order_created(self, order: Dict):
+    async def on_order_created(self, order: OrderEvent):
         """订单创建事件处理"""
         pass
 
-    async def on_order_updated(self, order: Dict):
+    async def on_order_updated(self, order: OrderEvent):
         """订单更新事件处理"""
         pass
 
-    async def on_order_filled(self, order: Dict):
+    async def on_order_filled(self, order: OrderEvent):
         """订单成交事件处理"""
         pass
 
-    async def on_order_cancelled(self, order: Dict):
+    async def on_order_cancelled(self, order: OrderEvent):
         """订单取消事件处理"""
         pass
 
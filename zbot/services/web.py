@@ -1,6 +1,6 @@
 import click
 from zbot.ui.web.app import run_web_ui
-from zbot.common.config import read_config
+from zbot.common.config import get_server_config
 
 # 1. 创建命令组
 @click.group()
@@ -11,9 +11,8 @@ def cli():
 @cli.command()
 def run():
     click.echo(f"运行服务")
-    host = read_config('server').get('server_host', '0.0.0.0')
-    port = read_config('server').get('server_port', 8000)
-    run_web_ui(host, port)
+    server = get_server_config()
+    run_web_ui(server.host, server.port)
 
 
 if __name__ == "__main__":
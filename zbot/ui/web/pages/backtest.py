@@ -12,6 +12,7 @@ import feffery_antd_components as fac
 from zbot.strategies.strategy_loader import get_strategy_class_names
 from zbot.services.backtest import Backtest
 from zbot.models.backtest import BacktestRecord
+from zbot.services.backtest_artifacts import backtest_artifacts
 from zbot.ui.web.utils.feedback import MessageManager
 from zbot.ui.web.utils.candlestick_chart import create_candlestick_chart
 # 注册pages
@@ -22,24 +23,64 @@ strategy_params = []
 strategy_metrics = []
 strategy_trades = []
 strategy_strategy = []
+# 当前加载的回测记录，策略K线在打开可视化页面时才读取
+strategy_record = None
+# 可视化页面用到的策略K线列
+CHART_COLUMNS = ['close_time', 'Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def load_trades(record):
+    """读取回测记录的交易记录"""
+    if record.artifact_path:
+        return Backtest.format_trades(backtest_artifacts.load(record.artifact_path, 'trades'))
+    # 旧版本的回测记录，交易记录以JSON文本保存在数据库中
+    trades = BacktestRecord.select(BacktestRecord.trades).where(
+        BacktestRecord.id == record.id).scalar()
+    return json.loads(trades) if trades else []
+
+
+def load_strategy_data(record):
+    """读取回测记录的策略K线，只读取图表需要的列"""
+    if record.artifact_path:
+        df = backtest_artifacts.load(record.artifact_path, 'strategy', CHART_COLUMNS)
+        return df.reset_index(drop=True).to_dict(orient='records')
+    strategy = BacktestRecord.select(BacktestRecord.strategy).where(
+        BacktestRecord.id == record.id).scalar()
+    return json.loads(strategy) if strategy else []
+
+# 回测记录每页数量
+RECORDS_PAGE_SIZE = 20
+# 回测记录排序字段
+RECORDS_SORT_OPTIONS = [
+    {'label': '回测时间', 'value': 'created_at'},
+    {'label': '总收益率', 'value': 'total_return'},
+    {'label': '最大回撤', 'value': 'max_drawdown'},
+    {'label': '策略', 'value': 'strategy_name'},
+]
+
+
+def default_records_query():
+    """回测记录列表的查询状态，cursors 为已访问各页的起始游标，最后一个为当前页"""
+    return {'cursors': [None], 'next': None, 'sort': 'created_at', 'descending': True, 'strategy_name': ''}
 
-# 获取回测记录
-def get_backtest_results():
-    backtest_records = BacktestRecord.select().order_by(
-        BacktestRecord.created_at.desc())
-    backtest_records = [record.to_dict() for record in backtest_records]
-    # print(backtest_records)
 
-    return backtest_records
+# 获取回测记录
+def get_backtest_results(query: dict):
+    """按查询状态获取当前页的回测记录摘要，返回 (记录列表, 下一页游标)"""
+    return BacktestRecord.list_summaries(
+        limit=RECORDS_PAGE_SIZE, cursor=query['cursors'][-1], sort=query['sort'],
+        descending=query['descending'], strategy_name=query['strategy_name'] or None)
 
 
 # 刷新表格控件数据
-def refresh_table_data():
-    backtest_results = get_backtest_results()
+def refresh_table_data(query: dict = None):
+    """返回 (表格数据, 更新了下一页游标的查询状态)"""
+    query = dict(query or default_records_query())
+    backtest_results, query['next'] = get_backtest_results(query)
     backtest_tab_data = [{
         'id': record['id'],
         'strategy_name': record['strategy_name'],
-        'created_at': record['created_at'],
+        'created_at': record['created_at'].isoformat() if isinstance(record['created_at'], datetime) else record['created_at'],
         'max_drawdown': record['max_drawdown'],
         'total_return': record['total_return'],
         'action': [
@@ -54,7 +95,7 @@ def refresh_table_data():
                 'custom': {"deleted": f"{record['id']}"}},
         ]
     } for record in backtest_results]
-    return backtest_tab_data
+    return backtest_tab_data, query
 
 
 def get_strategy():
@@ -105,7 +146,7 @@ layout = html.Div(
 def render_content_backtest():
     symbols = ctx.global_vars['symbols']
     strategy_options = get_strategy()
-    backtest_results = refresh_table_data()
+    backtest_results, records_query = refresh_table_data()
     return html.Div(
         children=[
             fac.AntdCenter(
@@ -172,6 +213,18 @@ def render_content_backtest():
                 ]
             ),
             html.H1('回测记录'),
+            dcc.Store(id='backtest_records_query', data=records_query),
+            fac.AntdSpace([
+                fac.AntdInput(id='records_filter', placeholder='按策略名称过滤', allowClear=True,
+                              debounceWait=300, style={'width': '200px'}),
+                fac.AntdSelect(id='records_sort', options=RECORDS_SORT_OPTIONS, value='created_at',
+                               allowClear=False, style={'width': '120px'}),
+                fac.AntdSelect(id='records_order', options=[{'label': '降序', 'value': 'desc'},
+                                                            {'label': '升序', 'value': 'asc'}],
+                               value='desc', allowClear=False, style={'width': '90px'}),
+                fac.AntdButton('上一页', id='records_prev', disabled=True),
+                fac.AntdButton('下一页', id='records_next', disabled=records_query['next'] is None),
+            ], style={'padding': 5}),
             html.Div(
                 children=[
                     fac.AntdTable(
@@ -184,7 +237,7 @@ def render_content_backtest():
                             {'title': '总收益率', 'dataIndex': 'total_return'},
                             {'title': '动作', 'dataIndex': 'action',
                              'renderOptions': {'renderType': 'button'}},
-                        ], data=backtest_results, style={'padding': 5}
+                        ], data=backtest_results, pagination=False, style={'padding': 5}
                     ),
                 ], id='candle_table_div'
             ),
@@ -379,8 +432,37 @@ def gen_metric_table(data):
 # 加载,删除回测记录
 
 
+@callback(
+    Output('candle_table', 'data', allow_duplicate=True),
+    Output('backtest_records_query', 'data', allow_duplicate=True),
+    Output('records_prev', 'disabled'),
+    Output('records_next', 'disabled'),
+    Input('records_filter', 'debounceValue'),
+    Input('records_sort', 'value'),
+    Input('records_order', 'value'),
+    Input('records_prev', 'nClicks'),
+    Input('records_next', 'nClicks'),
+    State('backtest_records_query', 'data'),
+    prevent_initial_call=True,
+)
+def page_backtest_records(filter_value, sort, order, prev_clicks, next_clicks, query):
+    """回测记录翻页、排序和过滤，只查询当前页的摘要字段"""
+    query = dict(query or default_records_query())
+    if ctx.triggered_id == 'records_next' and query.get('next'):
+        query['cursors'] = query['cursors'] + [query['next']]
+    elif ctx.triggered_id == 'records_prev' and len(query['cursors']) > 1:
+        query['cursors'] = query['cursors'][:-1]
+    else:
+        # 排序或过滤条件变化时回到第一页
+        query.update(cursors=[None], sort=sort or 'created_at', descending=order != 'asc',
+                     strategy_name=filter_value or '')
+    table_data, query = refresh_table_data(query)
+    return table_data, query, len(query['cursors']) <= 1, query['next'] is None
+
+
 @callback(
     Output('candle_table', 'data'),
+    Output('backtest_records_query', 'data'),
     Output('analyze-result-btn', 'disabled', allow_duplicate=True),
     Output('visualize-result-btn', 'disabled', allow_duplicate=True),
     # Output('strategy_params_table', 'data'),
@@ -388,25 +470,31 @@ def gen_metric_table(data):
     Input(f'candle_table', 'nClicksButton'),
     [
         State(f'candle_table', 'clickedCustom'),
+        State('backtest_records_query', 'data'),
     ],
     prevent_initial_call=True,
 )
-def action_backtest(nClicksButton, clickedCustom):
+def action_backtest(nClicksButton, clickedCustom, records_query):
     message = ''
     disabled = True
     global strategy_params
     global strategy_metrics
     global strategy_trades
     global strategy_strategy
+    global strategy_record
     strategy_metrics = []
     strategy_params = []
     strategy_metrics = []
     strategy_strategy = []
+    strategy_record = None
     if nClicksButton:
         if clickedCustom.get('load'):
             print(f"加载回测记录: {clickedCustom['load']}")
-            backtest_record = BacktestRecord.get(
-                BacktestRecord.id == clickedCustom['load'])
+            # 不读取旧版本记录中的大文本字段，交易记录和策略K线单独按需读取
+            backtest_record = BacktestRecord.select(
+                BacktestRecord.id, BacktestRecord.strategy_name, BacktestRecord.results,
+                BacktestRecord.parameters, BacktestRecord.artifact_path).where(
+                BacktestRecord.id == clickedCustom['load']).get()
             print(backtest_record)
             message = f'加载回测记录: {backtest_record.strategy_name}'
             disabled = False
@@ -418,16 +506,15 @@ def action_backtest(nClicksButton, clickedCustom):
             backtest_params = json.loads(backtest_record.parameters)
             for i in backtest_params.items():
                 strategy_params.append({'param': i[0], 'value': i[1]})
-            strategy_trades = json.loads(backtest_record.trades)
-            strategy_strategy = json.loads(backtest_record.strategy)
+            strategy_trades = load_trades(backtest_record)
+            strategy_record = backtest_record
         if clickedCustom.get('deleted'):
             print(f"删除回测记录: {clickedCustom['deleted']}")
-            BacktestRecord.delete().where(BacktestRecord.id ==
-                                          clickedCustom['deleted']).execute()
+            BacktestRecord.delete_record(clickedCustom['deleted'])
             message = f'删除成功'
         MessageManager.success(content=message)
-    table_data = refresh_table_data()
-    return table_data, disabled, disabled
+    table_data, records_query = refresh_table_data(records_query)
+    return table_data, records_query, disabled, disabled
 
 
 # @callback(
@@ -470,6 +557,8 @@ def show_visualize_result_view(n_clicks):
     global strategy_metrics
     global strategy_strategy
     if n_clicks:
+        if not strategy_strategy and strategy_record is not None:
+            strategy_strategy = load_strategy_data(strategy_record)
         return render_content_visualize(strategy_trades, strategy_strategy)
     return render_content_analyze(strategy_params, strategy_metrics, strategy_trades)
 
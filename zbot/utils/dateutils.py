@@ -1,8 +1,17 @@
+import re
 import pytz
 import time
 from datetime import datetime, timedelta
 from typing import Optional, Union
 
+import numpy as np
+
+# 按数值大小区分时间戳单位，与 timestamp_to_datetime 按位数判断一致:
+# 小于1e11为秒(10位)，小于1e14为毫秒(13位)，小于1e17为微秒(16位)，否则为纳秒(19位)
+TIMESTAMP_UNITS = ('s', 'ms', 'us', 'ns')
+_UNIT_THRESHOLDS = np.array([10 ** 11, 10 ** 14, 10 ** 17], dtype=np.int64)
+_NS_PER_UNIT = np.array([10 ** 9, 10 ** 6, 10 ** 3, 1], dtype=np.int64)
+
 
 def timestamp_to_datetime(timestamp: Union[int, float, str], unit: Optional[str] = None, tz: str = 'UTC') -> Optional[datetime]:
     """
@@ -64,6 +73,70 @@ def timestamp_to_datetime(timestamp: Union[int, float, str], unit: Optional[str]
         return None
 
 
+def detect_timestamp_unit(timestamp: Union[int, float, np.ndarray]) -> str:
+    """
+    根据数值大小判断时间戳单位，数组按其中绝对值最大的元素判断
+    :return: 's'、'ms'、'us' 或 'ns'
+    """
+    values = np.abs(np.asarray(timestamp, dtype=np.float64))
+    value = np.nanmax(values) if values.size else 0
+    return TIMESTAMP_UNITS[int(np.searchsorted(_UNIT_THRESHOLDS, value, side='right'))]
+
+
+def timestamps_to_datetime64(timestamps, unit: Optional[str] = None, tz: str = 'UTC') -> np.ndarray:
+    """
+    将时间戳数组批量转换为 datetime64[ns] 数组，结果与逐个调用 timestamp_to_datetime 相同
+
+    未指定unit时按数组的最小值和最大值判断一次单位；两者单位不同时(如币安毫秒和微秒混存的数据)
+    再按元素分别换算，整个过程均为向量化计算
+    :param timestamps: 时间戳数组，可以是整数、浮点数或字符串，NaN转换为NaT
+    :param unit: 时间单位，可选值为's'、'ms'、'us'、'ns'，若为None则自动识别
+    :param tz: 时区，结果为该时区的本地时间(不带时区信息)，默认为 'UTC'
+    :return: datetime64[ns] 数组
+    """
+    values = np.asarray(timestamps)
+    if values.dtype.kind == 'M':
+        return values.astype('datetime64[ns]')
+    if values.dtype.kind not in 'iu':
+        values = values.astype(np.float64)
+    missing = np.isnan(values) if values.dtype.kind == 'f' else None
+    if missing is not None:
+        values = np.where(missing, 0, values)
+    values = values.astype(np.int64)
+
+    if unit is not None:
+        if unit not in TIMESTAMP_UNITS:
+            raise ValueError(f"无效的时间单位: {unit}，必须是's', 'ms', 'us'或'ns'")
+        scale = _NS_PER_UNIT[TIMESTAMP_UNITS.index(unit)]
+    elif values.size:
+        magnitude = np.abs(values)
+        low, high = np.searchsorted(_UNIT_THRESHOLDS, [magnitude.min(), magnitude.max()], side='right')
+        if low == high:
+            scale = _NS_PER_UNIT[low]
+        else:
+            scale = _NS_PER_UNIT[np.searchsorted(_UNIT_THRESHOLDS, magnitude, side='right')]
+    else:
+        scale = 1
+
+    result = (values * scale).view('datetime64[ns]')
+    if missing is not None and missing.any():
+        result[missing] = np.datetime64('NaT')
+    if tz != 'UTC':
+        import pandas as pd
+        result = pd.DatetimeIndex(result).tz_localize('UTC').tz_convert(tz).tz_localize(None).to_numpy()
+    return result
+
+
+def timestamps_to_datetime_index(timestamps, unit: Optional[str] = None, tz: str = 'UTC', name: Optional[str] = None):
+    """
+    将时间戳数组批量转换为 pandas.DatetimeIndex，参数同 timestamps_to_datetime64
+    :param name: 索引名称
+    :return: 不带时区信息的 DatetimeIndex
+    """
+    import pandas as pd
+    return pd.DatetimeIndex(timestamps_to_datetime64(timestamps, unit, tz), name=name)
+
+
 def datetime_to_timestamp(dt: datetime, unit: Optional[str] = None) -> int:
     """
     将datetime对象转换为时间戳，支持手动指定或自动识别单位
@@ -266,6 +339,32 @@ def parse_date_range(date_str: str):
     return start_date, end_date
 
 
+def parse_timeframe(timeframe: str) -> timedelta:
+    """
+    将时间周期字符串转换为timedelta对象
+
+    :param timeframe: 时间周期字符串，如'1s', '1m', '5m', '1h', '1d', '1w', '1M'，其中月(M)按30天计算
+    :return: 对应的timedelta对象
+    :raises ValueError: 如果时间周期格式无效
+    """
+    match = re.match(r'^(\d+)([smhdwM])$', timeframe)
+    if not match:
+        raise ValueError(f"无效的时间周期格式: {timeframe}, 应为数字加单位(s/m/h/d/w/M)")
+    value, unit = int(match.group(1)), match.group(2)
+    if unit == 's':
+        return timedelta(seconds=value)
+    elif unit == 'm':
+        return timedelta(minutes=value)
+    elif unit == 'h':
+        return timedelta(hours=value)
+    elif unit == 'd':
+        return timedelta(days=value)
+    elif unit == 'w':
+        return timedelta(weeks=value)
+    else:
+        return timedelta(days=30 * value)
+
+
 def timedelta_to_localized_string(td: timedelta, lang: str = 'zh') -> str:
     """
     将timedelta对象转换为本地化的字符串表示